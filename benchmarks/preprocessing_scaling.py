@@ -0,0 +1,75 @@
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.preprocessing import preprocess_listings, dedupe_dataset, fit_encoder
+
+# run from the project root: python benchmarks/preprocessing_scaling.py --workers 1,2,4,8
+
+
+def write_synthetic_listings(path, n_rows):
+    """Synthetic listings around Edmonton over a year; vehicles are relisted within ~6 weeks of their first listing."""
+    rng = np.random.default_rng(42)
+    vehicle = rng.integers(0, n_rows // 3, n_rows)
+    first_day = rng.integers(0, 365, n_rows // 3)
+    makes = np.array(['Toyota', 'Honda', 'Ford', 'Chevrolet', 'Nissan', 'Hyundai', 'Kia', 'BMW', 'Dodge', 'GMC', 'Jeep', 'Mazda'])
+    pd.DataFrame({
+        "dealer_id": rng.integers(1, 400, n_rows),
+        "listing_type": rng.choice(["Dealer", "Private"], n_rows),
+        "listing_first_date": (pd.Timestamp("2024-01-01") + pd.to_timedelta(first_day[vehicle] + rng.integers(0, 45, n_rows), unit="D")).strftime("%Y-%m-%d"),
+        "Latitude": rng.uniform(53.35, 53.75, n_rows),
+        "Longitude": rng.uniform(-113.75, -113.25, n_rows),
+        "stock_type": rng.choice(["Used", "New"], n_rows),
+        "vin": np.char.add("VIN", vehicle.astype(str)),
+        "make": makes[vehicle % len(makes)],
+        "model": "Model",
+        "mileage": (vehicle % 250_000).astype(float),
+        "price": rng.uniform(2_000, 90_000, n_rows).round(),
+        "model_year": 2000 + vehicle % 25,
+    }).to_csv(path, index=False)
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark preprocessing and dedupe across worker counts.")
+    parser.add_argument("--csv", default="data/CBB_Listings_LongLat.csv")
+    parser.add_argument("--rows", type=int, default=2_000_000, help="Synthetic rows when the CSV is missing")
+    parser.add_argument("--chunk-size", type=int, default=200_000)
+    parser.add_argument("--workers", default=f"1,2,4,{os.cpu_count()}", help="Comma-separated worker counts")
+    args = parser.parse_args()
+
+    worker_counts = sorted({int(count) for count in args.workers.split(",")})
+    with tempfile.TemporaryDirectory() as tmp:
+        source = args.csv
+        if not os.path.exists(source):
+            source = os.path.join(tmp, "listings.csv")
+            write_synthetic_listings(source, args.rows)
+
+        # The encoder pass is shared by every run, it is not part of what is being scaled
+        encoder = fit_encoder(source, args.chunk_size)
+        print(f"CPU cores: {os.cpu_count()}")
+        print(f"{'workers':>7} {'prepare':>9} {'dedupe':>9} {'total':>9} {'speedup':>8}")
+        baseline = None
+        for workers in worker_counts:
+            output_dir = os.path.join(tmp, f"out_{workers}")
+            deduped_dir = os.path.join(tmp, f"deduped_{workers}")
+            _, prepare_s = timed(lambda: preprocess_listings(source, output_dir, args.chunk_size, encoder, workers=workers))
+            summary, dedupe_s = timed(lambda: dedupe_dataset(output_dir, deduped_dir, workers=workers))
+            total = prepare_s + dedupe_s
+            baseline = baseline or total
+            print(f"{workers:>7} {prepare_s:>8.2f}s {dedupe_s:>8.2f}s {total:>8.2f}s {baseline / total:>7.2f}x")
+        print(f"Rows: {summary['rows_in']:,} -> {summary['rows_out']:,} after dedupe "
+              f"({summary['boundary_rows']:,} in the cross-partition pass)")
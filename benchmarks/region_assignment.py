@@ -0,0 +1,63 @@
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.regions import label_regions
+
+# run from the project root: python benchmarks/region_assignment.py
+
+
+# Row-wise version from the notebook, kept as the baseline
+def assign_region(latitude, longitude):
+    if 53.53 <= latitude <= 53.58 and -113.52 <= longitude <= -113.45:
+        return 'Central'
+    elif latitude > 53.58:
+        return 'North'
+    elif latitude < 53.53:
+        return 'South'
+    elif longitude > -113.45:
+        return 'East'
+    elif longitude < -113.52:
+        return 'West'
+    else:
+        return 'Unknown'
+
+
+def load_points(csv_file, n_rows):
+    """Listing coordinates from the dataset if available, otherwise synthetic points around Edmonton."""
+    if os.path.exists(csv_file):
+        return pd.read_csv(csv_file, usecols=["Latitude", "Longitude"])
+    rng = np.random.default_rng(42)
+    return pd.DataFrame({
+        "Latitude": rng.uniform(53.35, 53.75, n_rows),
+        "Longitude": rng.uniform(-113.75, -113.25, n_rows),
+    })
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark row-wise vs vectorized region assignment.")
+    parser.add_argument("--csv", default="data/CBB_Listings_LongLat.csv")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Synthetic rows when the CSV is missing")
+    args = parser.parse_args()
+
+    df = load_points(args.csv, args.rows)
+    rowwise, rowwise_s = timed(lambda: df.apply(lambda row: assign_region(row['Latitude'], row['Longitude']), axis=1))
+    vectorized, vectorized_s = timed(lambda: label_regions(df))
+
+    assert (rowwise == vectorized).all(), "vectorized labels differ from the row-wise version"
+    print(f"Rows:       {len(df):,}")
+    print(f"Row-wise:   {rowwise_s:.3f}s")
+    print(f"Vectorized: {vectorized_s:.3f}s ({rowwise_s / vectorized_s:.0f}x faster)")
@@ -0,0 +1,244 @@
+import copy
+import glob
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+import yaml
+from sklearn.cluster import KMeans, MiniBatchKMeans
+from sklearn.preprocessing import MinMaxScaler
+
+from model.export import export_model, EXPORT_PATH
+
+# Load configuration
+with open("configs/config.yaml", "r") as f:
+    config = yaml.safe_load(f)
+
+N_CLUSTERS = config["clustering"]["n_clusters"]
+RANDOM_STATE = config["clustering"]["random_state"]
+BACKEND = config["clustering"]["backend"]
+BATCH_SIZE = config["clustering"]["batch_size"]
+CHUNK_SIZE = config["clustering"]["chunk_size"]
+FEATURES = config["clustering"]["features"]
+MODEL_PATH = config["clustering"]["model_path"]
+SCALER_PATH = config["clustering"]["scaler_path"]
+WARM_START_MAX_ITER = config["clustering"]["warm_start"]["max_iter"]
+WARM_START_SAMPLE_SIZE = config["clustering"]["warm_start"]["sample_size"]
+ARTIFACT_ROOT = config["mlflow"]["artifact_root"]
+
+BACKENDS = ("kmeans", "minibatch", "streaming")
+
+
+def iter_feature_chunks(path, features=FEATURES, chunk_size=CHUNK_SIZE):
+    """Yields `features` of a CSV file or Parquet file/dataset in chunks of `chunk_size` rows."""
+    if path.endswith(".csv"):
+        with pd.read_csv(path, usecols=features, dtype="float64", chunksize=chunk_size) as reader:
+            yield from reader
+        return
+
+    import pyarrow.dataset as ds
+    dataset = ds.dataset(path, format="parquet", partitioning="hive")
+    for batch in dataset.to_batches(columns=list(features), batch_size=chunk_size):
+        yield batch.to_pandas()
+
+
+def reservoir_sample(chunks, size, random_state=RANDOM_STATE):
+    """
+    Uniform sample of `size` rows from an iterator of DataFrames of unknown total length:
+    every row gets a random key and the `size` smallest keys seen so far are kept.
+    """
+    rng = np.random.default_rng(random_state)
+    reservoir, keys = None, np.empty(0)
+    for chunk in chunks:
+        chunk_keys = rng.random(len(chunk))
+        candidates = chunk if reservoir is None else pd.concat([reservoir, chunk], ignore_index=True)
+        keys = np.concatenate([keys, chunk_keys])
+        if len(keys) > size:
+            keep = np.argpartition(keys, size)[:size]
+            candidates, keys = candidates.iloc[keep].reset_index(drop=True), keys[keep]
+        reservoir = candidates
+    return reservoir if reservoir is not None else pd.DataFrame()
+
+
+def run_artifact_paths(run_id, artifact_root=ARTIFACT_ROOT):
+    """Model and scaler pickles logged by an MLflow run (kmeans_model[_k].pkl, scaler[_k].pkl)."""
+    artifacts = os.path.join(artifact_root, "*", run_id, "artifacts")
+    models = sorted(glob.glob(os.path.join(artifacts, "kmeans_model*.pkl")))
+    scalers = sorted(glob.glob(os.path.join(artifacts, "scaler*.pkl")))
+    if not models or not scalers:
+        raise FileNotFoundError(f"No kmeans_model/scaler artifacts for run {run_id} under {artifact_root}")
+    return models[0], scalers[0]
+
+
+class ClusteringModel:
+    """
+    KMeans over min-max scaled features (the setup of the Car_Clustering_Experiment runs).
+    Back-ends:
+      - "kmeans": full Lloyd KMeans, the whole matrix in memory
+      - "minibatch": MiniBatchKMeans, the whole matrix in memory but each step costs one batch
+      - "streaming": MiniBatchKMeans.partial_fit over chunks read from disk, see train_stream
+    """
+
+    def __init__(self, n_clusters=N_CLUSTERS, random_state=RANDOM_STATE, backend=BACKEND, batch_size=BATCH_SIZE):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown clustering backend {backend!r}, expected one of {BACKENDS}")
+        self.n_clusters = n_clusters
+        self.random_state = random_state
+        self.backend = backend
+        self.batch_size = batch_size
+        self.features = None
+        self.scaler = MinMaxScaler()
+        self.model = self._make_model()
+
+    def _make_model(self, init=None, max_iter=None):
+        """A fresh estimator; `init` warm-starts it from given centroids with a single initialisation."""
+        options = {"n_clusters": self.n_clusters, "random_state": self.random_state}
+        if init is not None:
+            options.update(init=init, n_init=1)
+        if max_iter is not None:
+            options["max_iter"] = max_iter
+        if self.backend == "kmeans":
+            return KMeans(**{"n_init": 10, **options})
+        return MiniBatchKMeans(**{"batch_size": self.batch_size, "n_init": 3, **options})
+
+    @classmethod
+    def from_checkpoint(cls, model_path=MODEL_PATH, scaler_path=SCALER_PATH, features=FEATURES):
+        """Loads a saved model and scaler, e.g. the artifacts of a previous MLflow run (see run_artifact_paths)."""
+        model = joblib.load(model_path)
+        backend = "kmeans" if isinstance(model, KMeans) else "minibatch"
+        clustering = cls(n_clusters=model.n_clusters, random_state=model.random_state, backend=backend)
+        clustering.model = model
+        clustering.scaler = joblib.load(scaler_path)
+        clustering.features = list(getattr(clustering.scaler, "feature_names_in_", features))
+        return clustering
+
+    def _matrix(self, data):
+        # Kept as a frame so the scaler records the feature names, like the logged scalers
+        return data[self.features].astype(np.float64)
+
+    def train(self, data, features=FEATURES):
+        """Fits the scaler and the model on `data` and returns a copy of it with a `cluster` column."""
+        self.features = list(features)
+        X = self.scaler.fit_transform(self._matrix(data))
+        if self.backend == "streaming":
+            # In-memory data goes through the same partial_fit path, one shuffled batch at a time
+            order = np.random.default_rng(self.random_state).permutation(len(X))
+            for start in range(0, len(X), self.batch_size):
+                self.model.partial_fit(X[order[start:start + self.batch_size]])
+        else:
+            self.model.fit(X)
+        labels = self.model.predict(X)
+        self.model.cluster_sizes_ = np.bincount(labels, minlength=self.n_clusters).astype(np.float64)
+        return data.assign(cluster=labels)
+
+    def train_stream(self, make_chunks, features=FEATURES):
+        """
+        Streaming training: `make_chunks` is a zero-argument callable returning a fresh iterator of
+        DataFrames (e.g. lambda: iter_feature_chunks(path)). A first pass fits the scaler, a second
+        pass feeds every chunk to partial_fit, so memory is bounded by the chunk size.
+        The first chunk seeds the centroids, so files sorted by a feature should be shuffled first.
+        Needs the "streaming" or "minibatch" back-end (full KMeans has no partial_fit).
+        """
+        if self.backend == "kmeans":
+            raise ValueError('train_stream needs the "streaming" or "minibatch" backend, not "kmeans"')
+        self.features = list(features)
+        for chunk in make_chunks():
+            self.scaler.partial_fit(self._matrix(chunk.dropna(subset=self.features)))
+
+        pending = None
+        sizes = np.zeros(self.n_clusters)
+        for chunk in make_chunks():
+            X = self.scaler.transform(self._matrix(chunk.dropna(subset=self.features)))
+            if pending is not None:
+                X, pending = np.vstack([pending, X]), None
+            # The first partial_fit call initialises the centroids and needs at least n_clusters rows
+            if not hasattr(self.model, "cluster_centers_") and len(X) < self.n_clusters:
+                pending = X
+                continue
+            for start in range(0, len(X), self.batch_size):
+                self.model.partial_fit(X[start:start + self.batch_size])
+                sizes += np.bincount(self.model.labels_, minlength=self.n_clusters)
+        if pending is not None:
+            self.model.partial_fit(pending)
+            sizes += np.bincount(self.model.labels_, minlength=self.n_clusters)
+        # Assignments at the time each batch was seen, close enough to weight warm starts
+        self.model.cluster_sizes_ = sizes
+        return self
+
+    @property
+    def cluster_sizes(self):
+        """
+        Training rows per cluster: recorded by train/train_stream/warm_start, or counted from the
+        labels_ of a logged estimator. None when neither is available.
+        """
+        if getattr(self.model, "cluster_sizes_", None) is not None:
+            return np.asarray(self.model.cluster_sizes_, dtype=np.float64)
+        if getattr(self.model, "labels_", None) is not None:
+            return np.bincount(self.model.labels_, minlength=self.n_clusters).astype(np.float64)
+        return None
+
+    def warm_start(self, data, features=None, max_iter=WARM_START_MAX_ITER, sample_size=WARM_START_SAMPLE_SIZE):
+        """
+        Incremental retraining: a few iterations on `data` (the new or changed listings, or a
+        reservoir sample of them) starting from the current centroids instead of k-means++.
+        The refit is anchored to the previous model: every previous centroid takes part as a
+        pseudo-point weighted by its training rows, so clusters the new data does not cover
+        stay where they were. The previous scaler is kept, so centroids stay in the same
+        feature space and cluster numbers keep their meaning.
+        Returns the centroid drift against the previous version.
+        """
+        if features is not None:
+            self.features = list(features)
+        X = self.scaler.transform(self._matrix(data.dropna(subset=self.features)))
+        n_rows = len(X)
+        if sample_size and len(X) > sample_size:
+            X = X[np.random.default_rng(self.random_state).choice(len(X), sample_size, replace=False)]
+
+        previous = self.model.cluster_centers_.copy()
+        sizes = self.cluster_sizes
+        if sizes is None:
+            # No training counts recorded: give the previous model as much weight as the new data
+            sizes = np.full(self.n_clusters, n_rows / self.n_clusters)
+        # Sampled rows stand for all the new rows
+        weights = np.concatenate([np.full(len(X), n_rows / len(X)), sizes])
+        self.model = self._make_model(init=previous, max_iter=max_iter)
+        self.model.fit(np.vstack([X, previous]), sample_weight=weights)
+        self.model.cluster_sizes_ = np.bincount(self.model.labels_, weights=weights, minlength=self.n_clusters)
+        return self.centroid_drift(previous)
+
+    def centroid_drift(self, previous_centers):
+        """Per-cluster centroid shift (in scaled units) and the centroids before/after in original units."""
+        current = self.model.cluster_centers_
+        before = self.scaler.inverse_transform(previous_centers)
+        after = self.scaler.inverse_transform(current)
+        drift = pd.DataFrame({
+            "cluster": np.arange(len(current)),
+            "shift": np.linalg.norm(current - previous_centers, axis=1),
+        })
+        for i, feature in enumerate(self.features):
+            drift[f"{feature}_before"] = before[:, i]
+            drift[f"{feature}_after"] = after[:, i]
+        return drift
+
+    def predict(self, data):
+        return self.model.predict(self.scaler.transform(self._matrix(data)))
+
+    @property
+    def inertia(self):
+        return self.model.inertia_
+
+    def export(self, path=EXPORT_PATH, cluster_regions=None, metadata=None):
+        """Slim inference export (centroids, scaler parameters, cluster regions), see model.export."""
+        return export_model(self.model, self.scaler, path, self.features, cluster_regions, metadata)
+
+    def save(self, model_path=MODEL_PATH, scaler_path=SCALER_PATH):
+        for path in (model_path, scaler_path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # labels_ holds one entry per training row and is not needed to predict;
+        # the per-cluster counts are kept for warm starts
+        model = copy.copy(self.model)
+        model.cluster_sizes_ = self.cluster_sizes
+        model.__dict__.pop("labels_", None)
+        joblib.dump(model, model_path)
+        joblib.dump(self.scaler, scaler_path)
@@ -0,0 +1,135 @@
+import numpy as np
+import yaml
+from scipy import stats
+from sklearn.metrics import davies_bouldin_score, pairwise_distances_chunked, silhouette_score
+
+from model.clustering import RANDOM_STATE
+
+# Load configuration
+with open("configs/config.yaml", "r") as f:
+    config = yaml.safe_load(f)
+
+SILHOUETTE_METHOD = config["evaluation"]["silhouette_method"]
+SILHOUETTE_SAMPLE_SIZE = config["evaluation"]["silhouette_sample_size"]
+SIMPLIFIED_SAMPLE_SIZE = config["evaluation"]["simplified_sample_size"]
+CONFIDENCE = config["evaluation"]["confidence"]
+
+SILHOUETTE_METHODS = ("auto", "exact", "sampled", "simplified")
+
+
+def _estimate(values, estimator, sample_size, confidence):
+    """Mean of per-point silhouettes with a normal confidence interval on it."""
+    value = float(values.mean())
+    if estimator == "exact" or len(values) < 2:
+        low = high = value
+    else:
+        half_width = stats.norm.ppf(0.5 + confidence / 2) * values.std(ddof=1) / np.sqrt(len(values))
+        low, high = value - half_width, value + half_width
+    return {
+        "value": value,
+        "ci_low": float(low),
+        "ci_high": float(high),
+        "estimator": estimator,
+        "sample_size": int(sample_size),
+    }
+
+
+def _pointwise(a, b):
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.nan_to_num((b - a) / np.maximum(a, b))
+
+
+def _sample(n, sample_size, random_state):
+    if not sample_size or sample_size >= n:
+        return np.arange(n)
+    return np.random.default_rng(random_state).choice(n, sample_size, replace=False)
+
+
+def sampled_silhouette(X, labels, sample_size=SILHOUETTE_SAMPLE_SIZE, random_state=RANDOM_STATE,
+                       confidence=CONFIDENCE):
+    """
+    Silhouette of a random sample of points, each one computed exactly against the full data
+    (distance rows are reduced per cluster chunk by chunk). The points are an i.i.d. sample, so the
+    mean comes with a confidence interval. Costs O(sample_size * n) instead of O(n²).
+    """
+    X = np.asarray(X, dtype=np.float64)
+    labels = np.asarray(labels)
+    order = np.argsort(labels, kind="stable")
+    X_sorted, labels_sorted = X[order], labels[order]
+    clusters, starts, sizes = np.unique(labels_sorted, return_index=True, return_counts=True)
+
+    sample = _sample(len(X), sample_size, random_state)
+    own = np.searchsorted(clusters, labels[sample])
+    values = np.empty(len(sample))
+    done = 0
+    for distances in pairwise_distances_chunked(X[sample], X_sorted):
+        rows = slice(done, done + len(distances))
+        # Mean distance from every sampled point to every cluster
+        mean_to_cluster = np.add.reduceat(distances, starts, axis=1) / sizes
+        own_rows = own[rows]
+        own_size = sizes[own_rows]
+        index = np.arange(len(distances))
+        a = mean_to_cluster[index, own_rows] * own_size / np.maximum(own_size - 1, 1)
+        mean_to_cluster[index, own_rows] = np.inf
+        b = mean_to_cluster.min(axis=1)
+        # Points alone in their cluster score 0, like sklearn
+        values[rows] = np.where(own_size > 1, _pointwise(a, b), 0.0)
+        done += len(distances)
+    return _estimate(values, "sampled", len(sample), confidence)
+
+
+def simplified_silhouette(X, labels, centers, sample_size=None, random_state=RANDOM_STATE, confidence=CONFIDENCE):
+    """
+    Centroid-based silhouette: a is the distance to the own centroid, b to the nearest other
+    centroid. O(n * k), so by default every point is used.
+    """
+    X = np.asarray(X, dtype=np.float64)
+    sample = _sample(len(X), sample_size, random_state)
+    points = X[sample]
+    distances = np.column_stack([np.sqrt(((points - center) ** 2).sum(axis=1)) for center in np.asarray(centers)])
+    own = np.asarray(labels)[sample]
+    index = np.arange(len(sample))
+    a = distances[index, own]
+    distances[index, own] = np.inf
+    b = distances.min(axis=1)
+    estimator = "simplified" if len(sample) == len(X) else "simplified_sampled"
+    return _estimate(_pointwise(a, b), estimator, len(sample), confidence)
+
+
+def silhouette(X, labels, centers=None, method=SILHOUETTE_METHOD, sample_size=SILHOUETTE_SAMPLE_SIZE,
+               random_state=RANDOM_STATE, confidence=CONFIDENCE, simplified_sample_size=SIMPLIFIED_SAMPLE_SIZE):
+    """
+    Silhouette estimate with the estimator that produced it. "auto" is exact up to `sample_size`
+    rows and sampled above it, so evaluation time is bounded whatever the data size.
+    """
+    if method not in SILHOUETTE_METHODS:
+        raise ValueError(f"Unknown silhouette method {method!r}, expected one of {SILHOUETTE_METHODS}")
+    if method == "auto":
+        method = "exact" if not sample_size or len(X) <= sample_size else "sampled"
+    if method == "exact":
+        value = float(silhouette_score(X, labels))
+        return {"value": value, "ci_low": value, "ci_high": value, "estimator": "exact", "sample_size": len(X)}
+    if method == "sampled":
+        return sampled_silhouette(X, labels, sample_size, random_state, confidence)
+    if centers is None:
+        raise ValueError("The simplified silhouette needs the cluster centres")
+    return simplified_silhouette(X, labels, centers, simplified_sample_size, random_state, confidence)
+
+
+def evaluate_clustering(X, labels, centers, method=SILHOUETTE_METHOD, sample_size=SILHOUETTE_SAMPLE_SIZE,
+                        random_state=RANDOM_STATE, confidence=CONFIDENCE):
+    """
+    Metrics logged for a clustering run, and a report saying how each one was computed.
+    """
+    estimate = silhouette(X, labels, centers, method, sample_size, random_state, confidence)
+    metrics = {
+        "silhouette_score": estimate["value"],
+        "silhouette_ci_low": estimate["ci_low"],
+        "silhouette_ci_high": estimate["ci_high"],
+        "davies_bouldin_index": float(davies_bouldin_score(X, labels)),
+    }
+    report = {
+        "silhouette_score": f"{estimate['estimator']} (n={estimate['sample_size']}, confidence={confidence})",
+        "davies_bouldin_index": f"exact (n={len(X)})",
+    }
+    return metrics, report
@@ -0,0 +1,144 @@
+import argparse
+import json
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+import yaml
+
+# Load configuration
+with open("configs/config.yaml", "r") as f:
+    config = yaml.safe_load(f)
+
+EXPORT_PATH = config["clustering"]["export_path"]
+FORMAT_VERSION = 1
+
+REGION_COLUMNS = ["region_label", "total_sales"]
+
+
+def cluster_region_table(agg_data, cluster_column="cluster"):
+    """
+    Regions of every cluster ranked by total sales, from the aggregated training data
+    (one row per region and cluster with `region_label` and `total_sales`).
+    """
+    ranked = (
+        agg_data.groupby([cluster_column, "region_label"], as_index=False)["total_sales"].sum()
+        .sort_values([cluster_column, "total_sales", "region_label"], ascending=[True, False, True])
+    )
+    return {
+        str(int(cluster)): rows[REGION_COLUMNS].to_dict(orient="records")
+        for cluster, rows in ranked.groupby(cluster_column)
+    }
+
+
+def export_model(model, scaler, path=EXPORT_PATH, features=None, cluster_regions=None, metadata=None):
+    """
+    Writes only what inference needs as JSON: the centroids, the scaler's affine parameters
+    (scaled = X * scale + min) and the per-cluster region table. The fitted estimator, with its
+    training labels, is not stored.
+    """
+    features = list(features if features is not None else getattr(scaler, "feature_names_in_", []))
+    state = {
+        "format_version": FORMAT_VERSION,
+        "n_clusters": int(model.n_clusters),
+        "features": [str(feature) for feature in features],
+        "centroids": np.asarray(model.cluster_centers_, dtype=float).tolist(),
+        "scaler": {
+            "scale": np.asarray(scaler.scale_, dtype=float).tolist(),
+            "min": np.asarray(scaler.min_, dtype=float).tolist(),
+        },
+        "cluster_regions": cluster_regions or {},
+        "metadata": metadata or {},
+    }
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=1)
+    return path
+
+
+class SlimClusteringModel:
+    """
+    Inference-only clustering model: nearest centroid with the min-max scaler folded in.
+    For scaled = X * s + m and centroids c, the squared distance to c_j ranks like
+    X @ W[:, j] + b[j] with W = -2 * s * (c - m).T and b = |c - m|², so a whole batch is
+    assigned with one matrix product and an argmin. Region tables are ranked once per cluster.
+    """
+
+    def __init__(self, centroids, scale, offset, features=(), cluster_regions=None, metadata=None):
+        self.centroids = np.asarray(centroids, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self.offset = np.asarray(offset, dtype=np.float64)
+        self.features = list(features)
+        self.cluster_regions = {int(cluster): rows for cluster, rows in (cluster_regions or {}).items()}
+        self.metadata = metadata or {}
+
+        shifted = self.centroids - self.offset
+        self.weights = -2.0 * self.scale[:, None] * shifted.T
+        self.bias = (shifted ** 2).sum(axis=1)
+        self.region_tables = {
+            cluster: pd.DataFrame(self.cluster_regions.get(cluster, []), columns=REGION_COLUMNS)
+            for cluster in range(self.n_clusters)
+        }
+
+    @property
+    def n_clusters(self):
+        return len(self.centroids)
+
+    @classmethod
+    def load(cls, path=EXPORT_PATH):
+        with open(path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        if state.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported model export format {state.get('format_version')!r} in {path}")
+        return cls(
+            state["centroids"],
+            state["scaler"]["scale"],
+            state["scaler"]["min"],
+            state["features"],
+            state["cluster_regions"],
+            state["metadata"],
+        )
+
+    @classmethod
+    def from_checkpoint(cls, model_path, scaler_path, region_table_path=None):
+        """Loads a joblib model and scaler, and the aggregated cluster/region table if present."""
+        model = joblib.load(model_path)
+        scaler = joblib.load(scaler_path)
+        regions = None
+        if region_table_path and os.path.exists(region_table_path):
+            regions = cluster_region_table(pd.read_csv(region_table_path))
+        return cls(model.cluster_centers_, scaler.scale_, scaler.min_, getattr(scaler, "feature_names_in_", ()),
+                   regions)
+
+    def transform(self, X):
+        return np.asarray(X, dtype=np.float64) * self.scale + self.offset
+
+    def predict(self, X):
+        """Nearest centroid of every row of X (raw feature values, one column per feature)."""
+        return np.argmin(np.atleast_2d(np.asarray(X, dtype=np.float64)) @ self.weights + self.bias, axis=1)
+
+    def assign(self, prices, mileages):
+        return self.predict(np.column_stack([np.ravel(prices), np.ravel(mileages)]))
+
+    def regions(self, cluster):
+        """Ranked region table of a cluster (empty when the export carries no region metadata)."""
+        return self.region_tables[int(cluster)].copy()
+
+
+if __name__ == "__main__":
+    # run from the project root: python -m model.export --model <kmeans.pkl> --scaler <scaler.pkl> --output model/checkpoints/kmeans_v1.json
+    parser = argparse.ArgumentParser(description="Export a fitted KMeans model and scaler to the slim JSON format.")
+    parser.add_argument("--model", required=True, help="Pickled KMeans estimator, e.g. an MLflow kmeans_model_6.pkl artifact")
+    parser.add_argument("--scaler", required=True, help="Pickled MinMaxScaler")
+    parser.add_argument("--regions", help="CSV of aggregated data with cluster, region_label and total_sales")
+    parser.add_argument("--output", default=EXPORT_PATH)
+    args = parser.parse_args()
+
+    regions = cluster_region_table(pd.read_csv(args.regions)) if args.regions else None
+    export_model(joblib.load(args.model), joblib.load(args.scaler), args.output, cluster_regions=regions,
+                 metadata={"source_model": args.model})
+    print(f"Exported {args.model} ({os.path.getsize(args.model):,} bytes) to {args.output} "
+          f"({os.path.getsize(args.output):,} bytes)")
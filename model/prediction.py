@@ -0,0 +1,53 @@
+import glob
+import os
+from functools import lru_cache
+
+import yaml
+
+from model.clustering import ARTIFACT_ROOT
+from model.export import SlimClusteringModel, EXPORT_PATH
+
+# Load configuration
+with open("configs/config.yaml", "r") as f:
+    config = yaml.safe_load(f)
+
+REGION_TABLE_PATH = config["clustering"]["region_table_path"]
+
+
+def load_run_predictor(run_id, artifact_root=ARTIFACT_ROOT):
+    """
+    Predictor of a logged MLflow run, from its slim JSON export. Raises FileNotFoundError when
+    the run has none; the pickles are not loaded as a fallback, convert them with model.export.
+    """
+    exports = sorted(glob.glob(os.path.join(artifact_root, "*", run_id, "artifacts", "kmeans_model*.json")))
+    if not exports:
+        raise FileNotFoundError(
+            f"No slim kmeans_model*.json export for run {run_id} under {artifact_root}: "
+            "create it with python -m model.export --model <kmeans_model.pkl> --scaler <scaler.pkl> "
+            f"--output {os.path.join(artifact_root, '<experiment>', run_id, 'artifacts', 'kmeans_model.json')}"
+        )
+    return SlimClusteringModel.load(exports[0])
+
+
+@lru_cache(maxsize=None)
+def load_predictor(export_path=EXPORT_PATH):
+    """
+    The predictor used by predict_used_car_region, from the slim export written by
+    model.train.register. Raises FileNotFoundError without an export and ValueError when it
+    carries no region metadata (register the model with the listings, e.g.
+    python -m model.train --from-run <run_id>).
+    """
+    if not os.path.exists(export_path):
+        raise FileNotFoundError(f"No slim model export at {export_path}: "
+                                "register a model (python -m model.train [--from-run <run_id>])")
+    predictor = SlimClusteringModel.load(export_path)
+    if not predictor.cluster_regions:
+        raise ValueError(f"No cluster/region table in {export_path}: "
+                         "register the model with the listings (python -m model.train --from-run <run_id>)")
+    return predictor
+
+
+def predict_used_car_region(price, mileage):
+    """Regions (region_label, total_sales) of the cluster a used car with this price and mileage falls in."""
+    predictor = load_predictor()
+    return predictor.regions(predictor.assign(price, mileage)[0])
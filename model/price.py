@@ -0,0 +1,250 @@
+import argparse
+import os
+import pickle
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+import yaml
+from scipy import sparse
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+from sklearn.model_selection import HalvingRandomSearchCV, train_test_split
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.dedupe import dedupe_listings, KEY_COLUMNS, DATE_COLUMN, TIME_WINDOW
+from src.encoding import ListingEncoder, TOP_MAKES
+from src.preprocessing import SOURCE_FILE
+from src.regions import label_regions, load_polygon_index, REGION_RULES, REGION_POLYGONS
+from model.clustering import RANDOM_STATE
+from model.train import build_stages, source_fingerprint, CACHE_DIR
+from model.tracking import get_client, get_experiment_id, log_artifacts, tracked_run, ARTIFACT_ROOT
+
+# Load configuration
+with open("configs/config.yaml", "r") as f:
+    config = yaml.safe_load(f)
+
+CATEGORICAL_COLUMNS = [tuple(pair) for pair in config["price_model"]["categorical"]]
+NUMERIC_COLUMNS = config["price_model"]["numeric"]
+TARGET = config["price_model"]["target"]
+STOCK_TYPE = config["price_model"]["stock_type"]
+N_ESTIMATORS = config["price_model"]["n_estimators"]
+N_CANDIDATES = config["price_model"]["search"]["n_candidates"]
+FACTOR = config["price_model"]["search"]["factor"]
+CV = config["price_model"]["search"]["cv"]
+N_JOBS = config["price_model"]["search"]["n_jobs"]
+TEST_SIZE = config["price_model"]["test_size"]
+PRICE_MODEL_PATH = config["price_model"]["model_path"]
+EXPERIMENT_NAME = config["price_model"]["experiment_name"]
+TRACKING_URI = config["mlflow"]["tracking_uri"]
+
+# Searched around the forests of models/create_dummy_models.py
+PARAM_DISTRIBUTIONS = {
+    "max_depth": [None, 10, 20, 30],
+    "min_samples_leaf": [1, 2, 5, 10],
+    "max_features": ["sqrt", 0.3, 0.6, 1.0],
+    "max_samples": [None, 0.5, 0.8],
+}
+
+
+def clean_price_listings(listings, stock_type=STOCK_TYPE, polygon_index=None):
+    """
+    Priced listings for the price model, labelled with their region and deduplicated. Unlike the
+    clustering's clean stage, listings of every stock type are kept unless `stock_type` is given
+    (the stock type is a feature), and so are listings without coordinates (default region).
+    """
+    listings = listings.dropna(subset=[TARGET])
+    listings = listings[listings[TARGET] > 0]
+    if stock_type:
+        listings = listings[listings["stock_type"] == stock_type]
+    listings = listings.assign(region=label_regions(listings, polygon_index=polygon_index).astype(str))
+    return dedupe_listings(listings)
+
+
+class PriceModel:
+    """
+    Price regression over make, model, stock type, year, mileage, drivetrain, fuel type and region.
+    Categoricals go through a ListingEncoder (one-hot, sparse) next to the numeric columns,
+    so the whole feature matrix is one CSR matrix built once per dataset.
+    """
+
+    def __init__(self, estimator=None, encoder=None, numeric_columns=NUMERIC_COLUMNS, fill_values=None, metadata=None):
+        self.estimator = estimator
+        self.encoder = encoder or ListingEncoder(top_makes=TOP_MAKES, columns=CATEGORICAL_COLUMNS)
+        self.numeric_columns = list(numeric_columns)
+        self.fill_values = fill_values or {}
+        self.metadata = metadata or {}
+
+    @property
+    def feature_names(self):
+        return self.numeric_columns + self.encoder.feature_names
+
+    def _numeric(self, df):
+        return df[self.numeric_columns].apply(pd.to_numeric, errors="coerce").astype(np.float64)
+
+    def fit_features(self, df):
+        """Fits the encoder vocabularies and the numeric fill values (training medians) on `df`."""
+        self.encoder.fit(df)
+        self.fill_values = {column: float(value) for column, value in self._numeric(df).median().fillna(0).items()}
+        return self.features(df)
+
+    def features(self, df):
+        """Numeric columns (missing values filled) followed by the one-hot block, as float32 CSR."""
+        numeric = self._numeric(df).fillna(self.fill_values).to_numpy(dtype=np.float32)
+        return sparse.hstack([sparse.csr_matrix(numeric), self.encoder.transform(df)], format="csr", dtype=np.float32)
+
+    def predict(self, df):
+        return self.estimator.predict(self.features(df))
+
+    def save(self, path=PRICE_MODEL_PATH):
+        """
+        One uncompressed pickle (protocol 5) with the estimator, the encoder vocabularies and
+        the fill values. For a 100-tree forest it loads ~3x faster than a joblib file and ~8x
+        faster than a compressed one, so the API starts quickly.
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        state = {
+            "estimator": self.estimator,
+            "encoder": {"top_makes": self.encoder.top_makes, "columns": self.encoder.columns,
+                        "vocabularies": self.encoder.vocabularies},
+            "numeric_columns": self.numeric_columns,
+            "fill_values": self.fill_values,
+            "metadata": self.metadata,
+        }
+        with open(path, "wb") as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        return path
+
+    @classmethod
+    def load(cls, path=PRICE_MODEL_PATH):
+        with open(path, "rb") as f:
+            state = pickle.load(f)
+        encoder = ListingEncoder(top_makes=state["encoder"]["top_makes"],
+                                 columns=[tuple(pair) for pair in state["encoder"]["columns"]])
+        encoder.vocabularies = state["encoder"]["vocabularies"]
+        return cls(state["estimator"], encoder, state["numeric_columns"], state["fill_values"], state["metadata"])
+
+
+def search_price_model(listings, n_candidates=N_CANDIDATES, factor=FACTOR, cv=CV, n_jobs=N_JOBS,
+                       n_estimators=N_ESTIMATORS, test_size=TEST_SIZE, random_state=RANDOM_STATE):
+    """
+    Successive-halving random search: every candidate is cross-validated on a small sample,
+    and only the best 1/factor go on to `factor` times more rows, so most of the budget goes
+    to promising candidates. Folds and candidates run in parallel on `n_jobs` cores.
+    The encoder and fill values are fitted on the training split and the matrix is encoded
+    once; the search slices it per fold (joblib memory-maps it for the workers instead of
+    re-encoding).
+    Returns the refitted PriceModel, the search and the hold-out metrics.
+    """
+    listings = listings.dropna(subset=[TARGET]).reset_index(drop=True)
+    train, test = train_test_split(listings, test_size=test_size, random_state=random_state)
+    model = PriceModel()
+    X_train, y_train = model.fit_features(train), train[TARGET].to_numpy(dtype=np.float64)
+
+    search = HalvingRandomSearchCV(
+        RandomForestRegressor(n_estimators=n_estimators, random_state=random_state, n_jobs=1),
+        PARAM_DISTRIBUTIONS,
+        n_candidates=n_candidates,
+        factor=factor,
+        cv=cv,
+        scoring="neg_mean_absolute_error",
+        n_jobs=n_jobs,
+        random_state=random_state,
+    )
+    start = time.perf_counter()
+    search.fit(X_train, y_train)
+    search_seconds = time.perf_counter() - start
+
+    model.estimator = search.best_estimator_
+    predicted = model.predict(test)
+    y_test = test[TARGET].to_numpy(dtype=np.float64)
+    metrics = {
+        "cv_mae": float(-search.best_score_),
+        "test_mae": float(mean_absolute_error(y_test, predicted)),
+        "test_rmse": float(np.sqrt(mean_squared_error(y_test, predicted))),
+        "test_r2": float(r2_score(y_test, predicted)),
+        "search_seconds": search_seconds,
+        "n_iterations": float(search.n_iterations_),
+        "n_candidates_evaluated": float(len(search.cv_results_["params"])),
+    }
+    model.metadata = {"best_params": search.best_params_, "metrics": metrics,
+                      "n_train": len(train), "n_features": X_train.shape[1]}
+    return model, search, metrics
+
+
+def log_price_search(model, search, metrics, model_path, experiment_name=EXPERIMENT_NAME, tracking_uri=TRACKING_URI,
+                     artifact_root=ARTIFACT_ROOT):
+    """Logs the winning parameters, the metrics, the full cv_results_ table and the exported model."""
+    from mlflow.entities import Metric, Param, RunTag
+
+    client = get_client(tracking_uri)
+    experiment_id = get_experiment_id(client, experiment_name)
+    with tracked_run(client, experiment_id, "PriceRegression_HalvingSearch") as run_id:
+        timestamp = int(time.time() * 1000)
+        client.log_batch(
+            run_id,
+            metrics=[Metric(key, value, timestamp, 0) for key, value in metrics.items()],
+            params=[Param(key, str(value)) for key, value in search.best_params_.items()]
+            + [Param(key, str(value)) for key, value in (("factor", search.factor), ("cv", search.cv),
+                                                         ("n_features", model.metadata["n_features"]))],
+            tags=[RunTag("estimator_name", type(model.estimator).__name__), RunTag("search", "HalvingRandomSearchCV")],
+        )
+        with tempfile.TemporaryDirectory() as tmp:
+            results_path = os.path.join(tmp, "cv_results.csv")
+            pd.DataFrame(search.cv_results_).drop(columns="params").to_csv(results_path, index=False)
+            log_artifacts(client, run_id, [results_path, model_path], artifact_root)
+    return run_id
+
+
+def train_price_model(source=SOURCE_FILE, cache_dir=CACHE_DIR, model_path=PRICE_MODEL_PATH, stock_type=STOCK_TYPE,
+                      log=True, experiment_name=EXPERIMENT_NAME, tracking_uri=TRACKING_URI, **search_params):
+    """
+    Loads the listings through the cached load stage of model.train, cleans them for pricing
+    (a cached stage of its own, see clean_price_listings), runs the search, exports the winner
+    to `model_path` and logs it to MLflow.
+    """
+    cache, stages = build_stages(source, cache_dir)
+    load = stages["load"]
+    clean = cache.stage(
+        "price_clean",
+        lambda: clean_price_listings(load.output, stock_type, load_polygon_index()),
+        {
+            "stock_type": stock_type,
+            "target": TARGET,
+            "regions": REGION_POLYGONS and source_fingerprint(REGION_POLYGONS) or REGION_RULES,
+            "key_columns": KEY_COLUMNS,
+            "date_column": DATE_COLUMN,
+            "window": TIME_WINDOW,
+        },
+        load,
+        code=[clean_price_listings],
+    )
+    model, search, metrics = search_price_model(clean.output, **search_params)
+    model.metadata["stock_type"] = stock_type
+    model.save(model_path)
+    run_id = log_price_search(model, search, metrics, model_path, experiment_name, tracking_uri) if log else None
+    return model, metrics, run_id
+
+
+if __name__ == "__main__":
+    # run from the project root: python -m model.price [--source data/processed/listings_deduped]
+    parser = argparse.ArgumentParser(description="Train the price model with a successive-halving search.")
+    parser.add_argument("--source", default=SOURCE_FILE, help="Listings CSV or preprocessed Parquet dataset")
+    parser.add_argument("--stock-type", default=STOCK_TYPE, help="Train on one stock type only, e.g. Used")
+    parser.add_argument("--n-jobs", type=int, default=N_JOBS)
+    parser.add_argument("--no-mlflow", action="store_true", help="Do not log the search to MLflow")
+    args = parser.parse_args()
+
+    _, metrics, run_id = train_price_model(args.source, stock_type=args.stock_type, n_jobs=args.n_jobs,
+                                          log=not args.no_mlflow)
+    for key, value in metrics.items():
+        print(f"{key:<24} {value:.4f}")
+    if run_id:
+        print(f"Logged MLflow run {run_id}")
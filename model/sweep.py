@@ -0,0 +1,147 @@
+import argparse
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import joblib
+import numpy as np
+import pandas as pd
+import yaml
+from sklearn.preprocessing import MinMaxScaler
+
+from model.clustering import ClusteringModel, FEATURES, RANDOM_STATE, BACKEND
+from model.export import export_model
+from model.evaluation import evaluate_clustering, SILHOUETTE_METHOD, SILHOUETTE_SAMPLE_SIZE
+from model.tracking import get_client, get_experiment_id, log_artifacts, tracked_run, ARTIFACT_ROOT
+
+# Load configuration
+with open("configs/config.yaml", "r") as f:
+    config = yaml.safe_load(f)
+
+SWEEP_N_CLUSTERS = config["sweep"]["n_clusters"]
+SWEEP_WORKERS = config["sweep"]["workers"]
+TRACKING_URI = config["mlflow"]["tracking_uri"]
+EXPERIMENT_NAME = config["mlflow"]["experiment_name"]
+
+
+def share_matrix(X, directory):
+    """Writes the scaled matrix once as .npy; workers map it read-only instead of receiving a copy."""
+    path = os.path.join(directory, "features.npy")
+    np.save(path, np.ascontiguousarray(X, dtype=np.float64))
+    return path
+
+
+def fit_candidate(n_clusters, matrix_path, random_state=RANDOM_STATE, backend=BACKEND,
+                  silhouette_method=SILHOUETTE_METHOD, silhouette_sample_size=SILHOUETTE_SAMPLE_SIZE):
+    """
+    Fits and evaluates one candidate k on the shared (memory-mapped) matrix. Only the minibatch
+    back-end reads the map in place: full KMeans centres its input first, so every worker holds
+    its own copy of the matrix (copy_x=False would centre the read-only map in place and fail).
+    """
+    X = np.load(matrix_path, mmap_mode="r")
+    start = time.perf_counter()
+    clustering = ClusteringModel(n_clusters=n_clusters, random_state=random_state, backend=backend)
+    labels = clustering.model.fit_predict(X)
+    fit_seconds = time.perf_counter() - start
+
+    metrics, report = evaluate_clustering(
+        X, labels, clustering.model.cluster_centers_, silhouette_method, silhouette_sample_size, random_state
+    )
+    return {
+        "n_clusters": n_clusters,
+        "params": {"backend": backend, **clustering.model.get_params()},
+        "metrics": {"inertia": float(clustering.model.inertia_), **metrics, "fit_seconds": fit_seconds},
+        "report": {"inertia": f"exact (n={len(X)})", **report},
+        "model": clustering.model,
+    }
+
+
+def log_sweep(results, scaler, experiment_name=EXPERIMENT_NAME, tracking_uri=TRACKING_URI, artifact_root=ARTIFACT_ROOT):
+    """
+    Logs every candidate as its own run (KMeans_Run_<k>clusters, like the existing runs):
+    params, metrics and tags in a single log_batch call per run, plus the model and scaler pickles
+    and the slim JSON export used for inference.
+    The estimator behind each metric is recorded as an `estimator.<metric>` tag.
+    Returns the run ids by n_clusters.
+    """
+    from mlflow.entities import Metric, Param, RunTag
+
+    client = get_client(tracking_uri)
+    experiment_id = get_experiment_id(client, experiment_name)
+
+    run_ids = {}
+    timestamp = int(time.time() * 1000)
+    with tempfile.TemporaryDirectory() as tmp:
+        for result in results:
+            k = result["n_clusters"]
+            with tracked_run(client, experiment_id, f"KMeans_Run_{k}clusters") as run_id:
+                client.log_batch(
+                    run_id,
+                    metrics=[Metric(key, value, timestamp, 0) for key, value in result["metrics"].items()],
+                    params=[Param(key, str(value)) for key, value in result["params"].items()],
+                    tags=[
+                        RunTag("estimator_name", type(result["model"]).__name__),
+                        RunTag("sweep", "n_clusters"),
+                        *[RunTag(f"estimator.{key}", value) for key, value in result["report"].items()],
+                    ],
+                )
+                paths = []
+                for name, obj in ((f"kmeans_model_{k}.pkl", result["model"]), (f"scaler_{k}.pkl", scaler)):
+                    paths.append(os.path.join(tmp, name))
+                    joblib.dump(obj, paths[-1])
+                paths.append(export_model(result["model"], scaler, os.path.join(tmp, f"kmeans_model_{k}.json")))
+                log_artifacts(client, run_id, paths, artifact_root)
+            run_ids[k] = run_id
+    return run_ids
+
+
+def run_sweep(data, features=FEATURES, n_clusters_values=SWEEP_N_CLUSTERS, workers=SWEEP_WORKERS,
+              random_state=RANDOM_STATE, backend=BACKEND, silhouette_method=SILHOUETTE_METHOD,
+              silhouette_sample_size=SILHOUETTE_SAMPLE_SIZE, log=True, experiment_name=EXPERIMENT_NAME,
+              tracking_uri=TRACKING_URI, artifact_root=ARTIFACT_ROOT):
+    """
+    Scales `data[features]` once, shares the scaled matrix with a process pool through a
+    memory-mapped file and fits every candidate k in parallel. Results come back in the order of
+    `n_clusters_values` and are logged to MLflow at the end when `log` is set.
+    """
+    scaler = MinMaxScaler()
+    X = scaler.fit_transform(data[list(features)].dropna().astype(np.float64))
+    workers = max(1, min(workers or os.cpu_count() or 1, len(n_clusters_values)))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        fit = partial(
+            fit_candidate,
+            matrix_path=share_matrix(X, tmp),
+            random_state=random_state,
+            backend=backend,
+            silhouette_method=silhouette_method,
+            silhouette_sample_size=silhouette_sample_size,
+        )
+        if workers == 1:
+            results = [fit(k) for k in n_clusters_values]
+        else:
+            with ProcessPoolExecutor(workers) as pool:
+                results = list(pool.map(fit, n_clusters_values))
+
+    if log:
+        run_ids = log_sweep(results, scaler, experiment_name, tracking_uri, artifact_root)
+        for result in results:
+            result["run_id"] = run_ids[result["n_clusters"]]
+    return results, scaler
+
+
+if __name__ == "__main__":
+    # run from the project root: python -m model.sweep --data data/cluster_features.csv
+    parser = argparse.ArgumentParser(description="Fit and log one clustering run per n_clusters in parallel.")
+    parser.add_argument("--data", required=True, help="CSV or Parquet file with the clustering features")
+    parser.add_argument("--workers", type=int, default=SWEEP_WORKERS)
+    args = parser.parse_args()
+
+    data = pd.read_csv(args.data) if args.data.endswith(".csv") else pd.read_parquet(args.data)
+    results, _ = run_sweep(data, workers=args.workers)
+    for result in results:
+        print(f"k={result['n_clusters']}:")
+        for key, value in result["metrics"].items():
+            print(f"  {key:<22} {value:.4f}  {result['report'].get(key, '')}")
@@ -0,0 +1,54 @@
+import os
+import shutil
+from contextlib import contextmanager
+
+import yaml
+
+# Load configuration
+with open("configs/config.yaml", "r") as f:
+    config = yaml.safe_load(f)
+
+TRACKING_URI = config["mlflow"]["tracking_uri"]
+ARTIFACT_ROOT = config["mlflow"]["artifact_root"]
+
+PROXIED_SCHEME = "mlflow-artifacts:"
+
+
+def get_client(tracking_uri=TRACKING_URI):
+    from mlflow.tracking import MlflowClient
+    return MlflowClient(tracking_uri=tracking_uri)
+
+
+def get_experiment_id(client, experiment_name):
+    experiment = client.get_experiment_by_name(experiment_name)
+    return experiment.experiment_id if experiment else client.create_experiment(experiment_name)
+
+
+@contextmanager
+def tracked_run(client, experiment_id, run_name):
+    """Creates a run and terminates it as FINISHED, or FAILED if the body raises, so no run is left RUNNING."""
+    run_id = client.create_run(experiment_id, run_name=run_name).info.run_id
+    try:
+        yield run_id
+    except BaseException:
+        client.set_terminated(run_id, "FAILED")
+        raise
+    client.set_terminated(run_id)
+
+
+def log_artifacts(client, run_id, paths, artifact_root=ARTIFACT_ROOT):
+    """
+    Logs files to a run. Experiments created through the MLflow server store artifacts under
+    mlflow-artifacts:/<experiment>/<run>/artifacts, which only the server can resolve; when
+    logging straight to the database they are written where the server keeps them
+    (`artifact_root`, i.e. mlartifacts/<experiment>/<run>/artifacts).
+    """
+    artifact_uri = client.get_run(run_id).info.artifact_uri
+    proxied = artifact_uri.startswith(PROXIED_SCHEME) and not client.tracking_uri.startswith(("http://", "https://"))
+    for path in paths:
+        if proxied:
+            destination = os.path.join(artifact_root, artifact_uri[len(PROXIED_SCHEME):].lstrip("/"))
+            os.makedirs(destination, exist_ok=True)
+            shutil.copy(path, destination)
+        else:
+            client.log_artifact(run_id, path)
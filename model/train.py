@@ -0,0 +1,387 @@
+import argparse
+import glob
+import hashlib
+import inspect
+import json
+import os
+import sys
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+import yaml
+from sklearn.cluster import KMeans
+from sklearn.preprocessing import MinMaxScaler
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.aggregation import ListingAggregator, VALUE_COLUMNS, PERCENTILES
+from src.dedupe import dedupe_listings, KEY_COLUMNS, DATE_COLUMN, TIME_WINDOW
+from src.preprocessing import read_listing_chunks, read_processed, SOURCE_FILE
+from src.regions import label_regions, load_polygon_index, REGION_RULES, REGION_POLYGONS
+from model.clustering import (
+    ClusteringModel, run_artifact_paths, N_CLUSTERS, RANDOM_STATE, BACKEND, BATCH_SIZE, FEATURES,
+    MODEL_PATH, SCALER_PATH,
+)
+from model.evaluation import evaluate_clustering, SILHOUETTE_METHOD, SILHOUETTE_SAMPLE_SIZE, CONFIDENCE
+from model.export import SlimClusteringModel, cluster_region_table, EXPORT_PATH
+from model.prediction import REGION_TABLE_PATH
+from model.tracking import get_client, get_experiment_id, log_artifacts, tracked_run, ARTIFACT_ROOT
+
+# Load configuration
+with open("configs/config.yaml", "r") as f:
+    config = yaml.safe_load(f)
+
+CACHE_DIR = config["training"]["cache_dir"]
+CACHE_KEEP = config["training"]["cache_keep"]
+STOCK_TYPE = config["training"]["stock_type"]
+GROUP_BY = config["training"]["group_by"]
+LOG_TO_MLFLOW = config["training"]["log_to_mlflow"]
+TRACKING_URI = config["mlflow"]["tracking_uri"]
+EXPERIMENT_NAME = config["mlflow"]["experiment_name"]
+DRIFT_PATH = config["clustering"]["warm_start"]["drift_path"]
+
+# Source columns the clustering pipeline needs
+LOAD_COLUMNS = [
+    "dealer_id", "stock_type", "listing_first_date", "days_on_market", "Latitude", "Longitude",
+    "vin", "make", "model", "model_year", "mileage", "price", "listing_Active",
+    "drivetrain_from_vin", "fuel_type_from_vin",
+]
+
+# Model with the configured settings, as in the notebook; register works on its own instances
+clustering = ClusteringModel(n_clusters=N_CLUSTERS, random_state=RANDOM_STATE, backend=BACKEND)
+
+
+def source_fingerprint(path):
+    """Path, size and modification time of a file, or of every file of a dataset directory."""
+    files = [path]
+    if os.path.isdir(path):
+        files = sorted(os.path.join(root, name) for root, _, names in os.walk(path) for name in names)
+    return [[os.path.abspath(file), os.path.getsize(file), os.stat(file).st_mtime_ns] for file in files]
+
+
+def code_version(functions):
+    """Hash of the source of the functions a stage runs, so editing one invalidates its outputs."""
+    source = "".join(inspect.getsource(function) for function in functions)
+    return hashlib.sha256(source.encode("utf-8")).hexdigest()[:16]
+
+
+def stage_key(name, params, upstream=None, code=None):
+    """Hash of a stage's name, parameters, code version and the key of the stage it reads from."""
+    payload = json.dumps({"stage": name, "params": params, "upstream": upstream, "code": code},
+                         sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+class Stage:
+    """
+    One cached pipeline stage. The key is known without running anything; the output is
+    computed (or loaded from `cache_dir`) only when it is first read, so a stage whose
+    downstream stages are all cached is never loaded at all.
+    """
+
+    def __init__(self, cache, name, compute, params, upstream=None, code=()):
+        self.cache = cache
+        self.name = name
+        self.compute = compute
+        self.key = stage_key(name, params, upstream.key if upstream is not None else None, code_version(code))
+        self.path = os.path.join(cache.cache_dir, f"{name}-{self.key}.joblib")
+        self._output = None
+        self._loaded = False
+
+    @property
+    def output(self):
+        if not self._loaded:
+            if os.path.exists(self.path):
+                self._output = joblib.load(self.path)
+                # Marks the entry as recently used for StageCache.prune
+                os.utime(self.path)
+                self.cache.status[self.name] = "cached"
+            else:
+                start = time.perf_counter()
+                self._output = self.compute()
+                os.makedirs(self.cache.cache_dir, exist_ok=True)
+                joblib.dump(self._output, self.path)
+                self.cache.prune(self.name)
+                self.cache.status[self.name] = f"computed in {time.perf_counter() - start:.1f}s"
+            self._loaded = True
+        return self._output
+
+
+class StageCache:
+    """
+    Stage outputs on disk, one joblib file per stage and key. Only the `keep` most recently
+    used outputs of each stage are kept (the load stage holds the full raw listings).
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, keep=CACHE_KEEP):
+        self.cache_dir = cache_dir
+        self.keep = keep
+        self.status = {}
+
+    def stage(self, name, compute, params, upstream=None, code=()):
+        """`code` are the functions the stage runs; their source is part of the key."""
+        self.status.setdefault(name, "skipped")
+        return Stage(self, name, compute, params, upstream, code)
+
+    def prune(self, name):
+        """Deletes the least recently used outputs of a stage beyond `keep`."""
+        paths = sorted(glob.glob(os.path.join(self.cache_dir, f"{name}-*.joblib")), key=os.path.getmtime, reverse=True)
+        for path in paths[self.keep:]:
+            os.remove(path)
+
+
+def load_listings(source=SOURCE_FILE, columns=LOAD_COLUMNS):
+    """Listings of the raw CSV, or of a preprocessed Parquet dataset (see src.preprocessing)."""
+    if os.path.isdir(source):
+        return read_processed(source, columns=[column for column in columns if column != "listing_Active"])
+    return pd.concat(read_listing_chunks(source, columns=columns), ignore_index=True)
+
+
+def clean_listings(listings, stock_type=STOCK_TYPE, polygon_index=None):
+    """Priced, located listings of `stock_type`, labelled with their region and deduplicated."""
+    listings = listings.dropna(subset=["price", "mileage", "Latitude", "Longitude"])
+    listings = listings[listings["price"] > 0]
+    if stock_type:
+        listings = listings[listings["stock_type"] == stock_type]
+    listings = listings.assign(region_label=label_regions(listings, polygon_index=polygon_index).astype(str))
+    return dedupe_listings(listings)
+
+
+def aggregate_listings(listings, group_by=GROUP_BY, columns=VALUE_COLUMNS, percentiles=PERCENTILES):
+    """
+    One row per group with the clustering features (avg_price, mileage), total_sales and the
+    other statistics of src.aggregation (medians, percentiles, days on market).
+    """
+    aggregator = ListingAggregator(group_by, [column for column in columns if column in listings], percentiles)
+    stats = aggregator.update(listings).result()
+    return stats.rename(columns={"price_mean": "avg_price", "mileage_mean": "mileage", "listings": "total_sales"})
+
+
+def scale_features(agg_data, features=FEATURES):
+    """Min-max scaler fitted on the features, and the scaled matrix."""
+    scaler = MinMaxScaler()
+    X = scaler.fit_transform(agg_data[list(features)].astype(np.float64))
+    return {"scaler": scaler, "X": X}
+
+
+def fit_model(X, n_clusters=N_CLUSTERS, random_state=RANDOM_STATE, backend=BACKEND, batch_size=BATCH_SIZE):
+    model = ClusteringModel(n_clusters, random_state, backend, batch_size).model
+    model.fit(X)
+    return model
+
+
+def register(model, scaler, features, agg_data=None, metrics=None, report=None, params=None,
+             model_path=MODEL_PATH, scaler_path=SCALER_PATH, export_path=EXPORT_PATH,
+             region_table_path=REGION_TABLE_PATH, log_to_mlflow=False, metadata=None, artifacts=()):
+    """
+    Writes the checkpoints (model and scaler pickles, slim JSON export and, when the aggregated
+    data is given, the cluster/region table) and optionally logs them, with the extra
+    `artifacts` files, as an MLflow run.
+    Returns the registered predictor (the SlimClusteringModel of the export) and the MLflow
+    run id, or None.
+    """
+    backend = "kmeans" if isinstance(model, KMeans) else "minibatch"
+    registered = ClusteringModel(model.n_clusters, model.random_state, backend)
+    registered.model, registered.scaler, registered.features = model, scaler, list(features)
+    registered.save(model_path, scaler_path)
+
+    regions = None
+    if agg_data is not None:
+        # Assigned with the registered model, so logged models get the clusters they would predict
+        labels = model.predict(scaler.transform(agg_data[list(features)].astype(np.float64)))
+        table = agg_data[["region_label", "total_sales"]].assign(cluster=labels)
+        table = table.groupby(["cluster", "region_label"], as_index=False)["total_sales"].sum()
+        if os.path.dirname(region_table_path):
+            os.makedirs(os.path.dirname(region_table_path), exist_ok=True)
+        table.to_csv(region_table_path, index=False)
+        regions = cluster_region_table(table)
+    registered.export(export_path, regions, metadata)
+
+    run_id = None
+    if log_to_mlflow:
+        run_id = log_training_run(model, [model_path, scaler_path, export_path, *artifacts], metrics or {},
+                                  report or {}, params or {})
+    return SlimClusteringModel.load(export_path), run_id
+
+
+def log_training_run(model, artifacts, metrics, report, params, experiment_name=EXPERIMENT_NAME,
+                     tracking_uri=TRACKING_URI, artifact_root=ARTIFACT_ROOT):
+    """Logs a training run (KMeans_Run_<k>clusters, like the sweep) with log_batch and its checkpoints."""
+    from mlflow.entities import Metric, Param, RunTag
+
+    client = get_client(tracking_uri)
+    experiment_id = get_experiment_id(client, experiment_name)
+    with tracked_run(client, experiment_id, f"KMeans_Run_{model.n_clusters}clusters") as run_id:
+        timestamp = int(time.time() * 1000)
+        client.log_batch(
+            run_id,
+            metrics=[Metric(key, value, timestamp, 0) for key, value in metrics.items()],
+            params=[Param(key, str(value)) for key, value in params.items()],
+            tags=[
+                RunTag("estimator_name", type(model).__name__),
+                RunTag("pipeline", "model.train"),
+                *[RunTag(f"estimator.{key}", value) for key, value in report.items()],
+            ],
+        )
+        log_artifacts(client, run_id, artifacts, artifact_root)
+    return run_id
+
+
+def build_stages(source=SOURCE_FILE, cache_dir=CACHE_DIR, stock_type=STOCK_TYPE, group_by=GROUP_BY,
+                 features=FEATURES, n_clusters=N_CLUSTERS, random_state=RANDOM_STATE, backend=BACKEND,
+                 batch_size=BATCH_SIZE, silhouette_method=SILHOUETTE_METHOD,
+                 silhouette_sample_size=SILHOUETTE_SAMPLE_SIZE, confidence=CONFIDENCE):
+    """
+    The cached stages load -> clean -> aggregate -> scale -> fit -> evaluate. Every key chains
+    the key of the previous stage, so changing a parameter only invalidates its stage and the
+    ones after it.
+    """
+    cache = StageCache(cache_dir)
+    load = cache.stage(
+        "load", lambda: load_listings(source), {"source": source_fingerprint(source), "columns": LOAD_COLUMNS},
+        code=[load_listings],
+    )
+    clean = cache.stage(
+        "clean",
+        lambda: clean_listings(load.output, stock_type, load_polygon_index()),
+        {
+            "stock_type": stock_type,
+            "regions": REGION_POLYGONS and source_fingerprint(REGION_POLYGONS) or REGION_RULES,
+            "key_columns": KEY_COLUMNS,
+            "date_column": DATE_COLUMN,
+            "window": TIME_WINDOW,
+        },
+        load,
+        code=[clean_listings],
+    )
+    aggregate = cache.stage(
+        "aggregate",
+        lambda: aggregate_listings(clean.output, group_by),
+        {"group_by": group_by, "columns": VALUE_COLUMNS, "percentiles": PERCENTILES},
+        clean,
+        code=[aggregate_listings],
+    )
+    scale = cache.stage(
+        "scale", lambda: scale_features(aggregate.output, features), {"features": features}, aggregate,
+        code=[scale_features],
+    )
+    fit = cache.stage(
+        "fit",
+        lambda: fit_model(scale.output["X"], n_clusters, random_state, backend, batch_size),
+        {"n_clusters": n_clusters, "random_state": random_state, "backend": backend, "batch_size": batch_size},
+        scale,
+        code=[fit_model],
+    )
+    evaluate = cache.stage(
+        "evaluate",
+        lambda: evaluate_clustering(
+            scale.output["X"], fit.output.labels_, fit.output.cluster_centers_,
+            silhouette_method, silhouette_sample_size, random_state, confidence,
+        ),
+        {"method": silhouette_method, "sample_size": silhouette_sample_size, "confidence": confidence},
+        fit,
+        code=[evaluate_clustering],
+    )
+    return cache, {"load": load, "clean": clean, "aggregate": aggregate, "scale": scale, "fit": fit,
+                   "evaluate": evaluate}
+
+
+def run_pipeline(source=SOURCE_FILE, cache_dir=CACHE_DIR, log_to_mlflow=LOG_TO_MLFLOW, features=FEATURES,
+                 model_path=MODEL_PATH, scaler_path=SCALER_PATH, export_path=EXPORT_PATH,
+                 region_table_path=REGION_TABLE_PATH, **params):
+    """
+    Runs the stages (see build_stages, `params` are its keyword arguments) and registers the
+    result. Returns the metrics, the evaluation report, the MLflow run id, the registered
+    predictor and the status of every stage ("cached", "computed in ...s" or "skipped").
+    """
+    cache, stages = build_stages(source, cache_dir, features=features, **params)
+    metrics, report = stages["evaluate"].output
+    model, scaler = stages["fit"].output, stages["scale"].output["scaler"]
+    predictor, run_id = register(
+        model, scaler, features, stages["aggregate"].output, metrics, report,
+        params={"pipeline_key": stages["evaluate"].key, **model.get_params()},
+        model_path=model_path, scaler_path=scaler_path, export_path=export_path,
+        region_table_path=region_table_path, log_to_mlflow=log_to_mlflow,
+        metadata={"pipeline_key": stages["evaluate"].key, "source": source},
+    )
+    return {"metrics": metrics, "report": report, "run_id": run_id, "predictor": predictor, "stages": cache.status}
+
+
+def register_run(run_id, source=SOURCE_FILE, cache_dir=CACHE_DIR, stock_type=STOCK_TYPE, group_by=GROUP_BY,
+                 model_path=MODEL_PATH, scaler_path=SCALER_PATH, export_path=EXPORT_PATH,
+                 region_table_path=REGION_TABLE_PATH, artifact_root=ARTIFACT_ROOT):
+    """
+    Makes the model and scaler logged by an MLflow run the current checkpoint. Logged runs carry
+    no region metadata, so the cluster/region table is rebuilt from the aggregated listings of
+    `source` (the cached load, clean and aggregate stages) assigned to the logged clusters.
+    Returns the registered predictor.
+    """
+    logged = ClusteringModel.from_checkpoint(*run_artifact_paths(run_id, artifact_root))
+    _, stages = build_stages(source, cache_dir, stock_type=stock_type, group_by=group_by, features=logged.features)
+    predictor, _ = register(logged.model, logged.scaler, logged.features, stages["aggregate"].output, model_path=model_path,
+             scaler_path=scaler_path, export_path=export_path, region_table_path=region_table_path,
+             metadata={"mlflow_run_id": run_id, "source": source})
+    return predictor
+
+
+def warm_start_run(run_id, source=SOURCE_FILE, cache_dir=CACHE_DIR, stock_type=STOCK_TYPE, group_by=GROUP_BY,
+                   log_to_mlflow=LOG_TO_MLFLOW, model_path=MODEL_PATH, scaler_path=SCALER_PATH,
+                   export_path=EXPORT_PATH, region_table_path=REGION_TABLE_PATH, drift_path=DRIFT_PATH,
+                   artifact_root=ARTIFACT_ROOT):
+    """
+    Retrains the model of a logged MLflow run on the aggregated listings of `source` starting
+    from its centroids (ClusteringModel.warm_start) and registers the result. The centroid
+    drift table is written to `drift_path` and logged with the new run.
+    Returns the drift table, the registered predictor and the MLflow run id.
+    """
+    logged = ClusteringModel.from_checkpoint(*run_artifact_paths(run_id, artifact_root))
+    _, stages = build_stages(source, cache_dir, stock_type=stock_type, group_by=group_by, features=logged.features)
+    drift = logged.warm_start(stages["aggregate"].output)
+    if os.path.dirname(drift_path):
+        os.makedirs(os.path.dirname(drift_path), exist_ok=True)
+    drift.to_csv(drift_path, index=False)
+
+    predictor, new_run_id = register(
+        logged.model, logged.scaler, logged.features, stages["aggregate"].output,
+        metrics={"inertia": logged.inertia, "max_centroid_shift": float(drift["shift"].max())},
+        params={"warm_start_from": run_id, **logged.model.get_params()},
+        model_path=model_path, scaler_path=scaler_path, export_path=export_path,
+        region_table_path=region_table_path, log_to_mlflow=log_to_mlflow,
+        metadata={"warm_start_from": run_id, "source": source}, artifacts=[drift_path],
+    )
+    return {"drift": drift, "predictor": predictor, "run_id": new_run_id}
+
+
+if __name__ == "__main__":
+    # run from the project root: python -m model.train [--source data/processed/listings_deduped]
+    parser = argparse.ArgumentParser(description="Train the clustering model with cached pipeline stages.")
+    parser.add_argument("--source", default=SOURCE_FILE, help="Listings CSV or preprocessed Parquet dataset")
+    parser.add_argument("--n-clusters", type=int, default=N_CLUSTERS)
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    parser.add_argument("--no-mlflow", action="store_true", help="Do not log the run to MLflow")
+    parser.add_argument("--from-run", help="Register the model of a logged MLflow run instead of training")
+    parser.add_argument("--warm-start-from", metavar="RUN_ID",
+                        help="Retrain the model of a logged MLflow run from its centroids instead of from scratch")
+    args = parser.parse_args()
+
+    if args.warm_start_from:
+        result = warm_start_run(args.warm_start_from, args.source, args.cache_dir,
+                                log_to_mlflow=LOG_TO_MLFLOW and not args.no_mlflow)
+        print(result["drift"].to_string(index=False))
+        if result["run_id"]:
+            print(f"Logged MLflow run {result['run_id']}")
+    elif args.from_run:
+        register_run(args.from_run, args.source, args.cache_dir)
+        print(f"Registered run {args.from_run} as {MODEL_PATH} and {SCALER_PATH}")
+    else:
+        result = run_pipeline(args.source, args.cache_dir, log_to_mlflow=LOG_TO_MLFLOW and not args.no_mlflow,
+                              n_clusters=args.n_clusters)
+        for stage, status in result["stages"].items():
+            print(f"{stage:<10} {status}")
+        for key, value in result["metrics"].items():
+            print(f"{key:<22} {value:.4f}  {result['report'].get(key, '')}")
+        if result["run_id"]:
+            print(f"Logged MLflow run {result['run_id']}")
@@ -1,162 +1,197 @@
 from flask import Flask, request, jsonify
-import pickle
 import os
+import sys
 import numpy as np
-from datetime import datetime
-from sklearn.ensemble import RandomForestRegressor
+import pandas as pd
+import yaml
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from model.prediction import load_run_predictor
+from model.price import PriceModel, PRICE_MODEL_PATH
 
 app = Flask(__name__)
 
 # Project name
 PROJECT_NAME = "dealership_insights"
 
-# Create models directory if it doesn't exist
-os.makedirs("models", exist_ok=True)
-
-# Create dummy models if they don't exist
-def create_dummy_models():
-    # Create a dummy model v1
-    if not os.path.exists('models/model_v1.pkl'):
-        model_v1 = RandomForestRegressor(n_estimators=10, random_state=42)
-        # Fit with dummy data
-        X = np.random.rand(100, 5)
-        y = np.random.rand(100) * 50000  # Random car prices
-        model_v1.fit(X, y)
-        # Save model v1
-        with open('models/model_v1.pkl', 'wb') as f:
-            pickle.dump(model_v1, f)
-        print("Created dummy model v1")
-    
-    # Create a slightly different model v2
-    if not os.path.exists('models/model_v2.pkl'):
-        model_v2 = RandomForestRegressor(n_estimators=20, random_state=42)
-        # Fit with dummy data
-        X = np.random.rand(100, 5)
-        y = np.random.rand(100) * 50000  # Random car prices
-        model_v2.fit(X, y)
-        # Save model v2
-        with open('models/model_v2.pkl', 'wb') as f:
-            pickle.dump(model_v2, f)
-        print("Created dummy model v2")
-
-# Load models
-def load_model(version):
+# Load configuration
+with open("configs/config.yaml", "r") as f:
+    config = yaml.safe_load(f)
+
+MODEL_RUNS = config["api"]["models"]
+MAX_BATCH_SIZE = config["api"]["max_batch_size"]
+PORT = config["api"]["port"]
+
+
+# Load models once at startup and keep them in memory
+def load_models():
+    """Slim JSON exports of the configured runs; a run without one is reported and served as a 404."""
+    models, errors = {}, {}
+    for version, settings in MODEL_RUNS.items():
+        try:
+            models[version] = load_run_predictor(settings["run_id"])
+        except FileNotFoundError as e:
+            models[version], errors[version] = None, str(e)
+            print(f"Model {version} not loaded: {e}", file=sys.stderr)
+    return models, errors
+
+
+MODELS, MODEL_ERRORS = load_models()
+
+
+def load_price_model():
     try:
-        model_path = f"models/model_v{version}.pkl"
-        with open(model_path, 'rb') as f:
-            model = pickle.load(f)
-        return model
+        return PriceModel.load(PRICE_MODEL_PATH)
     except FileNotFoundError:
         return None
 
+
+PRICE_MODEL = load_price_model()
+
+
+def parse_features(data):
+    """
+    Returns (avg_price, mileage) arrays and whether the request was a batch.
+    A request is either one pair of numbers or two lists of the same length.
+    """
+    if "avg_price" not in data or "mileage" not in data:
+        raise ValueError("Missing avg_price or mileage")
+    batch = isinstance(data["avg_price"], list) or isinstance(data["mileage"], list)
+    for key in ("avg_price", "mileage"):
+        values = data[key] if isinstance(data[key], list) else [data[key]]
+        # bool is an int subclass and numeric strings would convert, neither is a number here
+        if not all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in values):
+            raise ValueError("avg_price and mileage must be numbers or lists of numbers")
+    prices = np.atleast_1d(np.asarray(data["avg_price"], dtype=np.float64))
+    mileages = np.atleast_1d(np.asarray(data["mileage"], dtype=np.float64))
+    if prices.ndim != 1 or prices.shape != mileages.shape:
+        raise ValueError("avg_price and mileage must have the same length")
+    if len(prices) == 0 or len(prices) > MAX_BATCH_SIZE:
+        raise ValueError(f"A batch must contain between 1 and {MAX_BATCH_SIZE} listings")
+    if not (np.isfinite(prices).all() and np.isfinite(mileages).all()):
+        raise ValueError("avg_price and mileage must be finite")
+    return prices, mileages, batch
+
+
+def parse_listings(data, model):
+    """
+    Returns the listings of a price request as a DataFrame with the model's columns, and whether
+    the request was a batch. A request is one listing (a JSON object) or a list of them; fields
+    the model does not use, non-numeric numbers and non-string categories are rejected.
+    Missing fields are allowed (the model fills them in).
+    """
+    batch = isinstance(data, list)
+    listings = data if batch else [data]
+    categorical = [column for column, _ in model.encoder.columns]
+    if not data or not all(isinstance(listing, dict) and listing for listing in listings):
+        raise ValueError("No input data provided")
+    if len(listings) > MAX_BATCH_SIZE:
+        raise ValueError(f"A batch must contain between 1 and {MAX_BATCH_SIZE} listings")
+    for listing in listings:
+        unknown = sorted(set(listing) - set(categorical) - set(model.numeric_columns))
+        if unknown:
+            raise ValueError(f"Unknown fields {unknown}, expected {categorical + model.numeric_columns}")
+        for column in model.numeric_columns:
+            value = listing.get(column)
+            if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float))
+                                      or not np.isfinite(value)):
+                raise ValueError(f"{column} must be a finite number")
+        for column in categorical:
+            if listing.get(column) is not None and not isinstance(listing[column], str):
+                raise ValueError(f"{column} must be a string")
+    return pd.DataFrame(listings, columns=categorical + model.numeric_columns), batch
+
+
+def predict_cluster(version):
+    model = MODELS.get(version)
+
+    # If model doesn't exist, return an error
+    if model is None:
+        return jsonify({"error": f"Model {version} not found. {MODEL_ERRORS[version]}"}), 404
+
+    # Get data from request
+    data = request.get_json(silent=True)
+
+    if not data or not isinstance(data, dict):
+        return jsonify({"error": "No input data provided"}), 400
+
+    try:
+        prices, mileages, batch = parse_features(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # Nearest centroid of every listing in one vectorized call
+    clusters = model.assign(prices, mileages)
+
+    return jsonify({
+        "model_version": version,
+        "predicted_cluster": clusters.tolist() if batch else int(clusters[0])
+    })
+
+
+# Price prediction endpoint
+@app.route("/price/predict", methods=["POST"])
+def predict_price():
+    if PRICE_MODEL is None:
+        return jsonify({
+            "error": f"Price model not found. Train it with `python -m model.price` to create {PRICE_MODEL_PATH}."
+        }), 404
+
+    data = request.get_json(silent=True)
+    try:
+        frame, batch = parse_listings(data, PRICE_MODEL)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    prices = PRICE_MODEL.predict(frame)
+    return jsonify({"predicted_price": prices.tolist() if batch else float(prices[0])})
+
+
 # Home endpoint
 @app.route(f"/{PROJECT_NAME}_home", methods=["GET"])
 def home():
     return jsonify({
         "message": f"Welcome to the {PROJECT_NAME} API",
-        "description": "This API provides car price prediction services",
+        "description": "This API serves the KMeans clustering models that group used cars by average price and mileage",
         "endpoints": {
-            "/v1/predict": "Prediction using model version 1",
-            "/v2/predict": "Prediction using model version 2",
+            "/v1/predict": f"Predict cluster using model V1 ({MODEL_RUNS['V1']['n_clusters']} clusters)",
+            "/v2/predict": f"Predict cluster using model V2 ({MODEL_RUNS['V2']['n_clusters']} clusters)",
+            "/price/predict": "Predict the price of a listing (or a list of listings)",
             "/health_status": "Check if the API is running"
         },
-        "sample_payload": {
-            "make": "Toyota",
-            "model": "Camry",
-            "year": 2018,
-            "mileage": 35000,
-            "condition": "Excellent"
-        },
+        "sample_payload": {"avg_price": 30000, "mileage": 50000},
+        "sample_batch_payload": {"avg_price": [30000, 10000], "mileage": [50000, 200000]},
+        "sample_price_payload": {"make": "Toyota", "model": "Camry", "stock_type": "Used", "model_year": 2018,
+                                 "mileage": 35000, "drivetrain_from_vin": "FWD", "fuel_type_from_vin": "Gasoline",
+                                 "region": "North"},
         "usage": "Send a POST request to /v1/predict or /v2/predict with the sample payload format"
     })
 
+
 # Health status endpoint
 @app.route("/health_status", methods=["GET"])
 def health_status():
     return jsonify({
         "status": "healthy",
-        "message": "API is running"
+        "message": "API is running",
+        "models_loaded": {version: model is not None for version, model in MODELS.items()},
+        "price_model_loaded": PRICE_MODEL is not None
     })
 
+
 # V1 predict endpoint
 @app.route("/v1/predict", methods=["POST"])
 def predict_v1():
-    model = load_model(1)
-    
-    # If model doesn't exist, return an error
-    if model is None:
-        return jsonify({
-            "error": "Model v1 not found. Please ensure model_v1.pkl exists in the models directory."
-        }), 404
-    
-    # Get data from request
-    data = request.get_json()
-    
-    if not data:
-        return jsonify({"error": "No input data provided"}), 400
-    
-    try:
-        # Process input data - convert strings to numerical values
-        features = [
-            float(hash(data.get('make', '')) % 100),  # Convert make to a number
-            float(hash(data.get('model', '')) % 100),  # Convert model to a number
-            float(data.get('year', 0)),
-            float(data.get('mileage', 0)),
-            float(hash(data.get('condition', '')) % 10)  # Convert condition to a number
-        ]
-        
-        # Make prediction
-        prediction = model.predict([features])[0]
-        
-        return jsonify({
-            "model_version": "v1",
-            "prediction": float(prediction),
-            "input_data": data
-        })
-    
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+    return predict_cluster("V1")
+
 
 # V2 predict endpoint
 @app.route("/v2/predict", methods=["POST"])
 def predict_v2():
-    model = load_model(2)
-    
-    # If model doesn't exist, return an error
-    if model is None:
-        return jsonify({
-            "error": "Model v2 not found. Please ensure model_v2.pkl exists in the models directory."
-        }), 404
-    
-    # Get data from request
-    data = request.get_json()
-    
-    if not data:
-        return jsonify({"error": "No input data provided"}), 400
-    
-    try:
-        # Process input data - convert strings to numerical values
-        features = [
-            float(hash(data.get('make', '')) % 100),  # Convert make to a number
-            float(hash(data.get('model', '')) % 100),  # Convert model to a number
-            float(data.get('year', 0)),
-            float(data.get('mileage', 0)),
-            float(hash(data.get('condition', '')) % 10)  # Convert condition to a number
-        ]
-        
-        # Make prediction
-        prediction = model.predict([features])[0]
-        
-        return jsonify({
-            "model_version": "v2",
-            "prediction": float(prediction),
-            "input_data": data
-        })
-    
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+    return predict_cluster("V2")
+
 
 if __name__ == "__main__":
-    # Create dummy models if they don't exist
-    create_dummy_models()
-    app.run(debug=True, host="0.0.0.0", port=5000)
\ No newline at end of file
+    app.run(debug=True, host="0.0.0.0", port=PORT)
@@ -1,8 +1,47 @@
+import os
+import sys
+
 import streamlit as st
 
-st.title("Advanced App")
-st.write("This is the advanced version of the app.")
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+from src.app import DealershipInsightsApp
 
+# Multipage version of the dashboard: only the sections of the selected page are executed.
 # run using streamlit run src/advanced_app.py
 
+app = DealershipInsightsApp()
+app.query_engine.refresh(app.incoming_dir)
+filters = app.render_filters()
+
+
+def dealership_map():
+    st.title("🗺️ Dealership Map")
+    app.render_map()
+
+
+def regional_sales():
+    st.title("🚗 Regional Sales")
+    app.render_sales_comparison(filters)
+
+
+def price_trends():
+    st.title("📈 Price Trends")
+    app.render_price_vs_year(filters)
+    app.render_price_vs_mileage(filters)
+
+
+def top_makes():
+    st.title("📊 Top Makes")
+    app.render_top_10_makes(filters)
+
+
+page = st.navigation([
+    st.Page(dealership_map, title="Dealership Map", icon="🗺️"),
+    st.Page(regional_sales, title="Regional Sales", icon="🚗"),
+    st.Page(price_trends, title="Price Trends", icon="📈"),
+    st.Page(top_makes, title="Top Makes", icon="📊"),
+])
+page.run()
+app.render_debug_panel()
@@ -0,0 +1,137 @@
+import numpy as np
+import pandas as pd
+import yaml
+
+# Load configuration
+with open("configs/config.yaml", "r") as f:
+    config = yaml.safe_load(f)
+
+VALUE_COLUMNS = config["aggregation"]["columns"]
+PERCENTILES = config["aggregation"]["percentiles"]
+
+
+def percentile_name(q):
+    return f"p{q * 100:g}"
+
+
+def sorted_segment_stats(codes, values, n_groups, percentiles=PERCENTILES):
+    """
+    Count, mean, median and percentiles of every group from values sorted by (code, value),
+    NaNs removed. Counts and sums are bincounts; order statistics are read at each segment's
+    offset with linear interpolation (pandas' default), so all of them cost one pass.
+    Empty groups get NaN.
+    """
+    count = np.bincount(codes, minlength=n_groups)
+    total = np.bincount(codes, weights=values, minlength=n_groups)
+    starts = np.concatenate([[0], np.cumsum(count)[:-1]])
+    nonempty = count > 0
+    stats = {"count": count}
+    with np.errstate(invalid="ignore", divide="ignore"):
+        stats["mean"] = total / count
+
+    for name, q in [("median", 0.5)] + [(percentile_name(q), q) for q in percentiles]:
+        position = q * (count[nonempty] - 1)
+        lower = np.floor(position).astype(np.int64)
+        upper = np.minimum(lower + 1, count[nonempty] - 1)
+        low = values[starts[nonempty] + lower]
+        high = values[starts[nonempty] + upper]
+        result = np.full(n_groups, np.nan)
+        result[nonempty] = low + (high - low) * (position - lower)
+        stats[name] = result
+    return stats
+
+
+def sort_by_group(codes, values, n_groups):
+    """
+    Order of the rows by (code, value): values are sorted once, then a stable sort on the codes
+    cast to the narrowest integer type (a radix sort below 65536 groups) groups them.
+    """
+    by_value = np.argsort(values)
+    by_group = np.argsort(codes[by_value].astype(np.min_scalar_type(n_groups)), kind="stable")
+    return by_value[by_group]
+
+
+def merge_by_group(codes, values, new_codes, new_values, n_groups):
+    """
+    Merges a batch into `codes`/`values` already sorted by (code, value). Only the batch is
+    sorted; each new row's slot is then found with a binary search inside its group's segment
+    (all rows bisected together, one vectorized step per halving) and np.insert writes the
+    merged arrays in a single pass, so the history is never re-sorted.
+    """
+    order = sort_by_group(new_codes, new_values, n_groups)
+    new_codes, new_values = new_codes[order], new_values[order]
+    lo = np.searchsorted(codes, new_codes, side="left")
+    hi = np.searchsorted(codes, new_codes, side="right")
+    while True:
+        active = lo < hi
+        if not active.any():
+            break
+        mid = (lo + hi) // 2
+        # Equal values go after the existing ones, like a stable sort of the concatenation
+        right = active & (values[np.minimum(mid, len(values) - 1)] <= new_values)
+        lo = np.where(right, mid + 1, lo)
+        hi = np.where(active & ~right, mid, hi)
+    return np.insert(codes, lo, new_codes), np.insert(values, lo, new_values)
+
+
+class ListingAggregator:
+    """
+    Per-group statistics (count, mean, median, percentiles) of the value columns, e.g. price,
+    mileage and days on market per dealer or per region, with incremental updates.
+    The state is the group index and, per column, the values sorted by (group, value), so a
+    new batch of listings is merged into it instead of regrouping the full table and the
+    results stay exact (they match pandas' groupby).
+    """
+
+    def __init__(self, by, columns=VALUE_COLUMNS, percentiles=PERCENTILES):
+        self.by = list(by)
+        self.columns = list(columns)
+        self.percentiles = list(percentiles)
+        self.groups = None
+        self.sizes = np.zeros(0, dtype=np.int64)
+        self.codes = {column: np.zeros(0, dtype=np.int64) for column in self.columns}
+        self.values = {column: np.zeros(0) for column in self.columns}
+
+    def _group_codes(self, df):
+        keys = pd.MultiIndex.from_frame(df[self.by])
+        if self.groups is None:
+            self.groups = keys.unique()
+        else:
+            new = keys[self.groups.get_indexer(keys) == -1].unique()
+            if len(new):
+                self.groups = self.groups.append(new)
+        return self.groups.get_indexer(keys)
+
+    def update(self, df):
+        """Adds a batch of listings. Rows with a missing group key are ignored, like in groupby."""
+        df = df.dropna(subset=self.by)
+        if df.empty:
+            return self
+        codes = self._group_codes(df)
+        self.sizes = np.bincount(codes, minlength=len(self.groups)) + np.pad(
+            self.sizes, (0, len(self.groups) - len(self.sizes))
+        )
+        for column in self.columns:
+            values = df[column].to_numpy(dtype=np.float64, na_value=np.nan)
+            valid = ~np.isnan(values)
+            self.codes[column], self.values[column] = merge_by_group(
+                self.codes[column], self.values[column], codes[valid], values[valid], len(self.groups)
+            )
+        return self
+
+    def result(self):
+        """One row per group, sorted by the group keys: listings, then <column>_<statistic>."""
+        if self.groups is None:
+            return pd.DataFrame(columns=self.by + ["listings"])
+        frame = self.groups.to_frame(index=False)
+        frame["listings"] = self.sizes
+        for column in self.columns:
+            stats = sorted_segment_stats(self.codes[column], self.values[column], len(self.groups), self.percentiles)
+            for name, values in stats.items():
+                frame[f"{column}_{name}"] = values
+        return frame.sort_values(self.by, ignore_index=True)
+
+
+def aggregate_listings(df, by, columns=VALUE_COLUMNS, percentiles=PERCENTILES):
+    """Statistics of `columns` per group of `by`, e.g. by=["dealer_id"] or by=["region"]."""
+    return ListingAggregator(by, columns, percentiles).update(df).result()
@@ -1,96 +1,187 @@
+import os
+import sys
+import time
+from contextlib import contextmanager
+
 import streamlit as st
 import pandas as pd
 import altair as alt
 
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.query_engine import ListingsQueryEngine, ListingFilters
+from src.chart_data import prepare_line_data, prepare_scatter_data, cap_payload
+
+
+@st.cache_resource
+def load_query_engine(used_cars_file, new_cars_file):
+    """Loads the listings into the query engine once per server process (shared by all sessions, see its docstring)."""
+    return ListingsQueryEngine(used_cars_file, new_cars_file)
+
+
+@st.cache_data
+def load_map_html(html_file_path):
+    with open(html_file_path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+@contextmanager
+def timed_section(name):
+    """Records how long a section took to render (ms) for the debug panel."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        st.session_state.setdefault("section_timings", {})[name] = {
+            "render_ms": round((time.perf_counter() - start) * 1000, 1),
+            "rendered_at": time.strftime("%H:%M:%S"),
+        }
+
 
 class DealershipInsightsApp:
+    """
+    Each section is a Streamlit fragment: widgets inside a section only rerun that section,
+    while the sidebar filters rerun the whole page (sections are cached per filter combination).
+    """
+
     def __init__(self):
         self.html_file_path = "app_files/Dealership-map.html"
         self.used_cars_file = "app_files/used_cars.csv"
         self.new_cars_file = "app_files/new_cars.csv"
+        # Daily listing partitions land in incoming/used/ and incoming/new/
+        self.incoming_dir = "app_files/incoming"
+        self.query_engine = load_query_engine(self.used_cars_file, self.new_cars_file)
 
-    def render_map(self):
-        st.subheader("🗺️ Dealership Locations")
-        try:
-            with open(self.html_file_path, "r", encoding="utf-8") as f:
-                map_html = f.read()
-            st.components.v1.html(map_html, height=600, scrolling=True)
-        except FileNotFoundError:
-            st.error("The HTML file containing the map was not found. Please check the file path.")
-
-    def render_sales_comparison(self):
-        df_used = pd.read_csv(self.used_cars_file)
-        df_new = pd.read_csv(self.new_cars_file)
-
-        df_used["car_type"] = "Used"
-        df_new["car_type"] = "New"
-
-        df_combined = pd.concat([df_used, df_new], ignore_index=True)
-        sales_data = df_combined.groupby(["region_label", "car_type"]).size().reset_index(name="cars_sold")
-
-        st.subheader("🚗 Used vs New Cars Sold in Edmonton Regions")
-        chart = alt.Chart(sales_data).mark_bar().encode(
-            x=alt.X('region_label:N', title='Region'),
-            y=alt.Y('cars_sold:Q', title='Number of Cars Sold'),
-            color=alt.Color('car_type:N', title='Car Type', scale=alt.Scale(domain=["Used", "New"], range=["#FF6F61", "#C0392B"])),
-            tooltip=['region_label', 'car_type', 'cars_sold']
-        ).properties(
-            width=800,
-            height=500
-        )
-        st.altair_chart(chart, use_container_width=True)
-
-    def render_price_vs_year(self, df_combined):
-        price_by_year = df_combined.groupby("model_year")["price"].mean().reset_index().sort_values(by="model_year")
-
-        st.subheader("📈 Average Price vs Model Year")
-        line_chart = alt.Chart(price_by_year).mark_line(color="#C0392B").encode(
-            x=alt.X('model_year:Q', title='Model Year'),
-            y=alt.Y('price:Q', title='Average Price'),
-            tooltip=['model_year', 'price']
-        ).properties(
-            width=800,
-            height=500
-        )
-        st.altair_chart(line_chart, use_container_width=True)
+    def render_filters(self):
+        options = self.query_engine.filter_options()
+        min_year, max_year = options["year_range"]
 
-    def render_top_10_makes(self, df_combined):
-        sales_data_makes = (
-            df_combined.groupby(["make", "car_type"])["vin"]
-            .count()
-            .reset_index(name="cars_sold")
-        )
-        total_sales_per_make = (
-            sales_data_makes.groupby("make")["cars_sold"]
-            .sum()
-            .reset_index(name="total_cars_sold")
-        )
-        top_10_makes = total_sales_per_make.sort_values(by="total_cars_sold", ascending=False).head(10)["make"]
-        top_sales_data = sales_data_makes[sales_data_makes["make"].isin(top_10_makes)]
-
-        st.subheader("📊 Top 10 Car Makes (Used vs New)")
-        chart = alt.Chart(top_sales_data).mark_bar().encode(
-            x=alt.X('make:N', sort=top_10_makes, title='Make'),
-            y=alt.Y('cars_sold:Q', title='Number of Cars Sold'),
-            color=alt.Color('car_type:N', title='Stock Type', scale=alt.Scale(domain=["Used", "New"], range=["#FF6F61", "#C0392B"])),
-            tooltip=['make', 'car_type', 'cars_sold']
-        ).properties(
-            width=800,
-            height=500
+        st.sidebar.header("🔎 Filters")
+        regions = st.sidebar.multiselect("Region", options["regions"])
+        makes = st.sidebar.multiselect("Make", options["makes"])
+        stock_types = st.sidebar.multiselect("Stock Type", options["stock_types"])
+        year_range = st.sidebar.slider("Model Year", min_year, max_year, (min_year, max_year))
+
+        return ListingFilters(
+            regions=tuple(regions),
+            makes=tuple(makes),
+            year_range=None if year_range == (min_year, max_year) else tuple(year_range),
+            stock_types=tuple(stock_types),
         )
-        st.altair_chart(chart, use_container_width=True)
+
+    @st.fragment
+    def render_map(self):
+        with timed_section("Dealership map"):
+            st.subheader("🗺️ Dealership Locations")
+            try:
+                map_html = load_map_html(self.html_file_path)
+                st.components.v1.html(map_html, height=600, scrolling=True)
+            except FileNotFoundError:
+                st.error("The HTML file containing the map was not found. Please check the file path.")
+
+    @st.fragment
+    def render_sales_comparison(self, filters):
+        with timed_section("Sales comparison"):
+            sales_data = cap_payload(self.query_engine.sales_by_region(filters))
+
+            st.subheader("🚗 Used vs New Cars Sold in Edmonton Regions")
+            chart = alt.Chart(sales_data).mark_bar().encode(
+                x=alt.X('region_label:N', title='Region'),
+                y=alt.Y('cars_sold:Q', title='Number of Cars Sold'),
+                color=alt.Color('car_type:N', title='Car Type', scale=alt.Scale(domain=["Used", "New"], range=["#FF6F61", "#C0392B"])),
+                tooltip=['region_label', 'car_type', 'cars_sold']
+            ).properties(
+                width=800,
+                height=500
+            )
+            st.altair_chart(chart, use_container_width=True)
+
+    @st.fragment
+    def render_price_vs_year(self, filters):
+        with timed_section("Price vs year"):
+            price_by_year = prepare_line_data(self.query_engine.price_by_year(filters), "model_year", "price")
+
+            st.subheader("📈 Average Price vs Model Year")
+            line_chart = alt.Chart(price_by_year).mark_line(color="#C0392B").encode(
+                x=alt.X('model_year:Q', title='Model Year'),
+                y=alt.Y('price:Q', title='Average Price'),
+                tooltip=['model_year', 'price']
+            ).properties(
+                width=800,
+                height=500
+            )
+            st.altair_chart(line_chart, use_container_width=True)
+
+    @st.fragment
+    def render_price_vs_mileage(self, filters):
+        if not {"price", "mileage"} <= set(self.query_engine.columns):
+            return
+        with timed_section("Price vs mileage"):
+            # Listing-level data is binned to a fixed point budget before it is embedded in the chart
+            points = self.query_engine.cached(
+                "price_vs_mileage",
+                filters,
+                lambda: prepare_scatter_data(self.query_engine.listing_points(["mileage", "price"], filters), "mileage", "price"),
+            )
+
+            st.subheader("🔵 Price vs Mileage")
+            scatter = alt.Chart(points).mark_circle(color="#C0392B", opacity=0.6).encode(
+                x=alt.X('mileage:Q', title='Mileage'),
+                y=alt.Y('price:Q', title='Price'),
+                size=alt.Size('count:Q', title='Listings'),
+                tooltip=['mileage', 'price', 'count']
+            ).properties(
+                width=800,
+                height=500
+            )
+            st.altair_chart(scatter, use_container_width=True)
+
+    @st.fragment
+    def render_top_10_makes(self, filters):
+        with timed_section("Top makes"):
+            # Changing this only reruns this section
+            n_makes = st.slider("Number of makes", 5, 20, 10, key="top_makes_n")
+            top_sales_data, top_makes = self.query_engine.top_makes(filters, n=n_makes)
+
+            st.subheader(f"📊 Top {n_makes} Car Makes (Used vs New)")
+            chart = alt.Chart(top_sales_data).mark_bar().encode(
+                x=alt.X('make:N', sort=top_makes, title='Make'),
+                y=alt.Y('cars_sold:Q', title='Number of Cars Sold'),
+                color=alt.Color('car_type:N', title='Stock Type', scale=alt.Scale(domain=["Used", "New"], range=["#FF6F61", "#C0392B"])),
+                tooltip=['make', 'car_type', 'cars_sold']
+            ).properties(
+                width=800,
+                height=500
+            )
+            st.altair_chart(chart, use_container_width=True)
+
+    def render_debug_panel(self):
+        if st.sidebar.checkbox("Show render timings", key="show_render_timings"):
+            with st.sidebar:
+                self.render_timings()
+
+    @st.fragment(run_every="2s")
+    def render_timings(self):
+        st.subheader("🐞 Render Timings")
+        timings = st.session_state.get("section_timings", {})
+        if not timings:
+            st.caption("No sections rendered yet.")
+            return
+        st.dataframe(pd.DataFrame.from_dict(timings, orient="index"), use_container_width=True)
 
     def run(self):
         st.title("🚗 Dealership and Sales Insights in Edmonton")
+        self.query_engine.refresh(self.incoming_dir)
+        for path, error in self.query_engine.quarantined().items():
+            st.sidebar.warning(f"Skipped listing file {os.path.basename(path)}: {error}")
+        filters = self.render_filters()
         self.render_map()
-        self.render_sales_comparison()
-        df_combined = pd.concat(
-            [pd.read_csv(self.used_cars_file).assign(car_type="Used"),
-             pd.read_csv(self.new_cars_file).assign(car_type="New")],
-            ignore_index=True
-        )
-        self.render_price_vs_year(df_combined)
-        self.render_top_10_makes(df_combined)
+        self.render_sales_comparison(filters)
+        self.render_price_vs_year(filters)
+        self.render_price_vs_mileage(filters)
+        self.render_top_10_makes(filters)
+        self.render_debug_panel()
 
 
 # Run the app
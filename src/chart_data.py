@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+
+# Altair refuses to embed more than 5000 rows, stay well under it
+MAX_POINTS = 2000
+# Upper bound on the JSON payload embedded in a Vega-Lite spec
+MAX_PAYLOAD_BYTES = 500_000
+
+
+def lttb(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets downsampling of a line.
+    Returns the indices of the points to keep (always includes the first and last point).
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    # Bucket edges for the n_out - 2 middle buckets
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    keep = np.empty(n_out, dtype=int)
+    keep[0], keep[-1] = 0, n - 1
+    prev = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        # Average of the next bucket is the third vertex of the triangle
+        next_start, next_end = end, edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+        area = np.abs(
+            (x[prev] - avg_x) * (y[start:end] - y[prev])
+            - (x[prev] - x[start:end]) * (avg_y - y[prev])
+        )
+        prev = start + int(np.argmax(area))
+        keep[i + 1] = prev
+    return keep
+
+
+def bin_scatter(df, x, y, max_points=MAX_POINTS):
+    """
+    Aggregates a scatter into at most `max_points` grid cells.
+    Returns one row per non-empty cell with the cell centre and the number of points in it.
+    """
+    data = df[[x, y]].dropna()
+    n_bins = max(int(np.sqrt(max_points)), 1)
+    x_values = data[x].to_numpy(dtype=float)
+    y_values = data[y].to_numpy(dtype=float)
+    x_edges = np.linspace(x_values.min(), x_values.max(), n_bins + 1)
+    y_edges = np.linspace(y_values.min(), y_values.max(), n_bins + 1)
+
+    x_idx = np.clip(np.searchsorted(x_edges, x_values, side="right") - 1, 0, n_bins - 1)
+    y_idx = np.clip(np.searchsorted(y_edges, y_values, side="right") - 1, 0, n_bins - 1)
+    counts = np.bincount(x_idx * n_bins + y_idx, minlength=n_bins * n_bins)
+    cells = np.flatnonzero(counts)
+
+    x_centres = (x_edges[:-1] + x_edges[1:]) / 2
+    y_centres = (y_edges[:-1] + y_edges[1:]) / 2
+    return pd.DataFrame({
+        x: x_centres[cells // n_bins],
+        y: y_centres[cells % n_bins],
+        "count": counts[cells],
+    })
+
+
+def cap_payload(df, max_bytes=MAX_PAYLOAD_BYTES):
+    """Evenly thins out rows until the estimated JSON payload fits in `max_bytes`."""
+    if df.empty:
+        return df
+    # Estimate the row size from an evenly spaced sample rather than serialising everything
+    sample = df.iloc[::max(len(df) // 100, 1)]
+    bytes_per_row = len(sample.to_json(orient="records")) / len(sample)
+    max_rows = max(int(max_bytes / bytes_per_row), 1)
+    if len(df) <= max_rows:
+        return df
+    step = int(np.ceil(len(df) / max_rows))
+    return df.iloc[::step]
+
+
+def prepare_line_data(df, x, y, max_points=MAX_POINTS, max_bytes=MAX_PAYLOAD_BYTES):
+    """Sorts a line series by `x` and downsamples it with LTTB to the point budget."""
+    data = df.dropna(subset=[x, y]).sort_values(x)
+    if len(data) > max_points:
+        data = data.iloc[lttb(data[x], data[y], max_points)]
+    return cap_payload(data.reset_index(drop=True), max_bytes)
+
+
+def prepare_scatter_data(df, x, y, max_points=MAX_POINTS, max_bytes=MAX_PAYLOAD_BYTES):
+    """Returns the raw points if they fit in the budget, otherwise binned cells with a `count` column."""
+    data = df[[x, y]].dropna()
+    if len(data) <= max_points:
+        data = data.assign(count=1)
+    else:
+        data = bin_scatter(data, x, y, max_points)
+    return cap_payload(data.reset_index(drop=True), max_bytes)
@@ -1,9 +1,17 @@
+import os
+import sys
 import yaml
 import pandas as pd
 import seaborn as sns
 import matplotlib.pyplot as plt
 from opencage.geocoder import OpenCageGeocode
 
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.geocoding import GeocodeCache, GeocodingEngine
+from src.postal_geocoder import PostalCodeGeocoder
+
 # Load configuration
 with open("configs/config.yaml", "r") as f:
     config = yaml.safe_load(f)
@@ -11,6 +19,10 @@ with open("configs/config.yaml", "r") as f:
 # Constants from config
 CSV_FILE = config["paths"]["data"] + "CBB_Listings_LongLat.csv"
 API_KEY = config["api"]["opencage_key"]
+GEOCODE_CACHE_PATH = config["geocoding"]["cache_path"]
+GEOCODING_BACKEND = config["geocoding"]["backend"]
+POSTAL_CODE_TABLE = config["geocoding"]["postal_code_table"]
+GEOCODING_ENGINE_SETTINGS = config["geocoding"]["engine"]
 
 def load_data(file_path):
     """
@@ -35,35 +47,50 @@ def display_basic_stats(df):
     else:
         print("No data available.")
 
-def geocode_addresses(df, column_name, api_key):
+def get_geocoder(api_key, backend=GEOCODING_BACKEND):
+    """
+    Returns the configured geocoder backend: the OpenCage API or the offline postal code table.
+    """
+    if backend == "postal_code":
+        return PostalCodeGeocoder(POSTAL_CODE_TABLE)
+    return OpenCageGeocode(api_key)
+
+def geocode_addresses(df, column_name, api_key, cache_path=GEOCODE_CACHE_PATH, engine_options=None, geocoder=None):
     """
     Geocodes addresses in the specified column of the DataFrame.
-    Requires a valid OpenCage API key.
+    Offline backends with batch lookup resolve the whole column at once. Otherwise each unique
+    address is geocoded once, concurrently and within the API rate limit, and results are kept
+    in a local SQLite cache so only addresses that were never seen before hit the OpenCage API.
+    Requires a valid OpenCage API key for the OpenCage backend.
     """
     if column_name not in df.columns:
         print(f"Column '{column_name}' not found in DataFrame.")
         return df
 
-    geocoder = OpenCageGeocode(api_key)
-    coordinates = []
-
-    for idx, address in enumerate(df[column_name]):
-        try:
-            result = geocoder.geocode(address)
-            if result:
-                lat, lng = result[0]["geometry"]["lat"], result[0]["geometry"]["lng"]
-                coordinates.append((lat, lng))
-            else:
-                coordinates.append((None, None))
-        except Exception as e:
-            print(f"Error geocoding {address}: {e}")
-            coordinates.append((None, None))
-
-        # Progress feedback every 10 rows
-        if idx % 10 == 0:
-            print(f"Processed {idx}/{len(df)} addresses.")
-
-    df["Latitude"], df["Longitude"] = zip(*coordinates)
+    geocoder = geocoder or get_geocoder(api_key)
+    if hasattr(geocoder, "geocode_batch"):
+        matched = geocoder.geocode_batch(df[column_name])
+        df["Latitude"] = matched["Latitude"].to_numpy()
+        df["Longitude"] = matched["Longitude"].to_numpy()
+        print(f"Geocoding completed, {matched['Latitude'].notna().sum()}/{len(df)} rows resolved offline.")
+        return df
+
+    addresses = df[column_name].dropna().astype(str).unique()
+    settings = {**GEOCODING_ENGINE_SETTINGS, **(engine_options or {})}
+    with GeocodeCache(cache_path) as cache:
+        engine = GeocodingEngine(geocoder, cache=cache, **settings)
+        coordinates = engine.geocode_many(addresses)
+
+    lookup = pd.DataFrame(
+        [(address, lat, lng) for address, (lat, lng) in coordinates.items()],
+        columns=["_address", "Latitude", "Longitude"],
+    )
+    matched = (
+        df[[column_name]].astype({column_name: str})
+        .merge(lookup, left_on=column_name, right_on="_address", how="left")
+    )
+    df["Latitude"] = matched["Latitude"].to_numpy()
+    df["Longitude"] = matched["Longitude"].to_numpy()
     print("Geocoding completed.")
     return df
 
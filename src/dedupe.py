@@ -0,0 +1,128 @@
+import numpy as np
+import pandas as pd
+import yaml
+
+# Load configuration
+with open("configs/config.yaml", "r") as f:
+    config = yaml.safe_load(f)
+
+KEY_COLUMNS = config["dedupe"]["key_columns"]
+DATE_COLUMN = config["dedupe"]["date_column"]
+TIME_WINDOW = pd.Timedelta(days=config["dedupe"]["window_days"])
+
+
+def composite_key_codes(df, key_columns=KEY_COLUMNS):
+    """
+    One int64 code per distinct combination of the key columns, replacing the string-concatenated
+    composite_key. Each column is factorized and the codes are combined in mixed radix; when the
+    combined range would overflow int64 the partial key is re-factorized to dense codes first,
+    so keys never collide. Missing values form their own group.
+    """
+    key = np.zeros(len(df), dtype=np.int64)
+    n_keys = 1
+    for column in key_columns:
+        codes, uniques = pd.factorize(df[column], use_na_sentinel=False)
+        size = max(len(uniques), 1)
+        if n_keys * size > np.iinfo(np.int64).max:
+            key, dense = pd.factorize(key)
+            n_keys = len(dense)
+        key = key * size + codes
+        n_keys *= size
+    return key
+
+
+def composite_key_hash(df, key_columns=KEY_COLUMNS):
+    """
+    64-bit hash of the key columns. Unlike composite_key_codes it does not depend on the other
+    rows, so keys computed chunk by chunk stay comparable across chunks and files.
+    """
+    return pd.util.hash_pandas_object(df[list(key_columns)], index=False).to_numpy().view(np.int64)
+
+
+def _chained_keep(dates, valid, window):
+    """
+    Keeps the first listing and then every listing more than `window` after the last kept one.
+    Jumps from kept row to kept row with vectorized searches instead of visiting every row.
+    """
+    keep = np.zeros(len(dates), dtype=bool)
+    keep[0] = True
+    if not valid[0]:
+        return keep
+    last, position = dates[0], 1
+    while position < len(dates):
+        later = valid[position:] & (dates[position:] - last > window)
+        if not later.any():
+            break
+        position += int(np.argmax(later))
+        keep[position] = True
+        last = dates[position]
+        position += 1
+    return keep
+
+
+def filter_recent_duplicates(df, key_columns=KEY_COLUMNS, date_column=DATE_COLUMN, time_window=TIME_WINDOW, codes=None):
+    """
+    Drops relistings of the same vehicle within `time_window` of its last kept listing.
+    Rows are visited in the frame's current order, exactly like the notebook's iterrows version,
+    but groups are resolved with array operations: a group whose later listings all fall within
+    the window of its first listing keeps only that first row, and only the remaining groups
+    (where a kept relisting restarts the window) go through the chained fallback.
+    """
+    n = len(df)
+    if n == 0:
+        return df
+
+    if codes is None:
+        codes = composite_key_codes(df, key_columns)
+    dates = pd.to_datetime(df[date_column]).to_numpy(dtype="datetime64[ns]").view("int64")
+    valid = ~pd.isna(df[date_column]).to_numpy()
+    window = pd.Timedelta(time_window).value
+
+    # Stable sort keeps the frame order within each vehicle
+    order = np.argsort(codes, kind="stable")
+    sorted_codes = codes[order]
+    sorted_dates = dates[order]
+    sorted_valid = valid[order]
+
+    starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+    group_of_row = np.cumsum(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]]) - 1
+    first_date = sorted_dates[starts][group_of_row]
+    first_valid = sorted_valid[starts][group_of_row]
+
+    keep_sorted = np.zeros(n, dtype=bool)
+    keep_sorted[starts] = True
+
+    # Groups where some listing is more than the window after the first need the chained pass
+    exceeds = sorted_valid & first_valid & (sorted_dates - first_date > window)
+    ends = np.r_[starts[1:], n]
+    for group in np.unique(group_of_row[exceeds]):
+        start, end = starts[group], ends[group]
+        keep_sorted[start:end] = _chained_keep(sorted_dates[start:end], sorted_valid[start:end], window)
+
+    keep = np.empty(n, dtype=bool)
+    keep[order] = keep_sorted
+    return df[keep]
+
+
+def dedupe_listings(df, key_columns=KEY_COLUMNS, date_column=DATE_COLUMN, time_window=TIME_WINDOW):
+    """
+    The notebook's dedupe step: order each vehicle's listings active-first (if `listing_Active`
+    exists) and newest-first, then drop relistings within `time_window`.
+    Sorting and grouping run on the integer composite key, no per-row key strings are built.
+    """
+    df = df.assign(**{date_column: pd.to_datetime(df[date_column])})
+    codes = composite_key_codes(df, key_columns)
+    dates = df[date_column].to_numpy(dtype="datetime64[ns]").view("int64")
+    valid = df[date_column].notna().to_numpy()
+
+    # np.lexsort sorts by the last key first; missing dates go last like in sort_values
+    sort_keys = [np.where(valid, -dates, np.iinfo(np.int64).max)]
+    if "listing_Active" in df.columns:
+        sort_keys.append(-df["listing_Active"].to_numpy(dtype=float))
+    sort_keys.append(codes)
+    order = np.lexsort(sort_keys)
+
+    deduped = filter_recent_duplicates(
+        df.iloc[order], key_columns, date_column, time_window, codes=codes[order]
+    )
+    return deduped.reset_index(drop=True)
@@ -0,0 +1,120 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import yaml
+from scipy import sparse
+
+# Load configuration
+with open("configs/config.yaml", "r") as f:
+    config = yaml.safe_load(f)
+
+TOP_MAKES = config["encoding"]["top_makes"]
+ENCODER_PATH = config["encoding"]["encoder_path"]
+
+# (column, prefix) pairs one-hot encoded by the notebook
+CATEGORICAL_COLUMNS = [
+    ("listing_type", "listing"),
+    ("stock_type", "car"),
+    ("make", "make"),
+    ("region", "region"),
+]
+
+
+class ListingEncoder:
+    """
+    One-hot encodes listing_type, stock_type, make (top N, others as "Other") and region
+    in a single pass into a sparse int8 matrix.
+    Vocabularies are fitted once and saved, so prediction reuses the exact training columns;
+    categories unseen during fit encode as all zeros (or "Other" for makes).
+    """
+
+    def __init__(self, top_makes=TOP_MAKES, columns=CATEGORICAL_COLUMNS):
+        self.top_makes = top_makes
+        self.columns = list(columns)
+        self.vocabularies = {}
+        self.counts = {}
+
+    def _values(self, df, column):
+        values = df[column]
+        if column == "make":
+            top = self.vocabularies.get("make", [])
+            return values.where(values.isin([make for make in top if make != "Other"]), "Other")
+        return values
+
+    def partial_fit(self, df):
+        """Accumulates category counts from one chunk, so vocabularies can be fitted out of core."""
+        for column, _ in self.columns:
+            if column not in df.columns:
+                continue
+            counts = df[column].value_counts()
+            counts = counts[counts > 0]
+            if column in self.counts:
+                counts = self.counts[column].add(counts, fill_value=0).sort_values(ascending=False, kind="stable")
+            self.counts[column] = counts
+
+        for column, counts in self.counts.items():
+            if column == "make":
+                top = counts.nlargest(self.top_makes).index
+                self.vocabularies["make"] = sorted(set(top) | {"Other"})
+            else:
+                self.vocabularies[column] = sorted(counts.index.tolist())
+        return self
+
+    def fit(self, df):
+        self.counts = {}
+        self.vocabularies = {}
+        return self.partial_fit(df)
+
+    @property
+    def feature_names(self):
+        return [
+            f"{prefix}_{category}"
+            for column, prefix in self.columns if column in self.vocabularies
+            for category in self.vocabularies[column]
+        ]
+
+    def transform(self, df, dense=False):
+        """Returns a CSR int8 matrix (or a dense int8 array) with one block per encoded column."""
+        rows, cols = [], []
+        offset = 0
+        row_index = np.arange(len(df))
+        for column, _ in self.columns:
+            if column not in self.vocabularies:
+                continue
+            vocabulary = self.vocabularies[column]
+            codes = pd.Categorical(self._values(df, column), categories=vocabulary).codes
+            known = codes >= 0
+            rows.append(row_index[known])
+            cols.append(codes[known].astype(np.int64) + offset)
+            offset += len(vocabulary)
+
+        rows = np.concatenate(rows) if rows else np.empty(0, dtype=np.int64)
+        cols = np.concatenate(cols) if cols else np.empty(0, dtype=np.int64)
+        matrix = sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.int8), (rows, cols)), shape=(len(df), offset), dtype=np.int8
+        )
+        return matrix.toarray() if dense else matrix
+
+    def fit_transform(self, df, dense=False):
+        return self.fit(df).transform(df, dense=dense)
+
+    def to_frame(self, df):
+        """Encoded columns as a sparse-backed DataFrame aligned with `df` (like pd.get_dummies)."""
+        return pd.DataFrame.sparse.from_spmatrix(self.transform(df), index=df.index, columns=self.feature_names)
+
+    def save(self, path=ENCODER_PATH):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"top_makes": self.top_makes, "columns": self.columns, "vocabularies": self.vocabularies}, f, indent=2)
+
+    @classmethod
+    def load(cls, path=ENCODER_PATH):
+        with open(path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        encoder = cls(top_makes=state["top_makes"], columns=[tuple(pair) for pair in state["columns"]])
+        encoder.vocabularies = state["vocabularies"]
+        return encoder
@@ -0,0 +1,192 @@
+import os
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+from opencage.geocoder import (
+    ForbiddenError,
+    NotAuthorizedError,
+    RateLimitExceededError,
+    UnknownError,
+)
+
+# Errors worth retrying with backoff
+TRANSIENT_ERRORS = (RateLimitExceededError, UnknownError, requests.exceptions.RequestException)
+# Errors that will fail for every address, so the whole run stops
+FATAL_ERRORS = (NotAuthorizedError, ForbiddenError)
+
+
+class GeocodeCache:
+    """
+    Persistent address -> (lat, lng) cache stored in SQLite.
+    Addresses are normalised (upper-case, single spaces) so trivially different spellings share an entry.
+    Addresses the provider could not resolve are stored with NULL coordinates.
+    """
+
+    def __init__(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS geocodes (
+                address TEXT PRIMARY KEY,
+                lat REAL,
+                lng REAL,
+                resolved_at REAL
+            )
+            """
+        )
+        self.conn.commit()
+
+    @staticmethod
+    def normalize(address):
+        return " ".join(str(address).upper().split())
+
+    def get_many(self, addresses, chunk_size=500):
+        """Returns {address: (lat, lng)} for the addresses that are already cached."""
+        by_key = {}
+        for address in addresses:
+            by_key.setdefault(self.normalize(address), []).append(address)
+
+        keys = list(by_key)
+        found = {}
+        for start in range(0, len(keys), chunk_size):
+            chunk = keys[start:start + chunk_size]
+            rows = self.conn.execute(
+                f"SELECT address, lat, lng FROM geocodes WHERE address IN ({', '.join('?' for _ in chunk)})",
+                chunk,
+            ).fetchall()
+            for key, lat, lng in rows:
+                for address in by_key[key]:
+                    found[address] = (lat, lng)
+        return found
+
+    def put_many(self, coordinates):
+        """Stores {address: (lat, lng)} in the cache."""
+        now = time.time()
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO geocodes (address, lat, lng, resolved_at) VALUES (?, ?, ?, ?)",
+            [(self.normalize(address), lat, lng, now) for address, (lat, lng) in coordinates.items()],
+        )
+        self.conn.commit()
+
+    def put(self, address, lat, lng):
+        self.put_many({address: (lat, lng)})
+
+    def __len__(self):
+        return self.conn.execute("SELECT count(*) FROM geocodes").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class TokenBucket:
+    """Thread-safe token bucket allowing `rate` requests per second with bursts up to `capacity`."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or max(rate, 1))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class GeocodingEngine:
+    """
+    Geocodes addresses concurrently on a thread pool.
+    Requests are rate limited with a token bucket shared by all workers, transient failures are
+    retried with exponential backoff, and results are checkpointed to the cache as they complete
+    so an interrupted run resumes where it stopped.
+    `geocoder` is anything with an OpenCage-style `geocode(address)` method.
+    """
+
+    def __init__(self, geocoder, cache=None, rate_per_second=1.0, max_workers=4,
+                 max_retries=3, backoff_seconds=1.0, checkpoint_every=25, bucket=None):
+        self.geocoder = geocoder
+        self.cache = cache
+        # Engines can share a bucket so they stay within one rate limit together
+        self.bucket = bucket or TokenBucket(rate_per_second)
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.checkpoint_every = checkpoint_every
+
+    def geocode_one(self, address):
+        """Returns (lat, lng) for an address, or (None, None) if the provider has no result."""
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+            try:
+                result = self.geocoder.geocode(address)
+                break
+            except TRANSIENT_ERRORS:
+                if attempt == self.max_retries:
+                    raise
+                time.sleep(self.backoff_seconds * 2 ** attempt * (1 + random.random()))
+        if result:
+            return result[0]["geometry"]["lat"], result[0]["geometry"]["lng"]
+        return None, None
+
+    def _checkpoint(self, resolved, coordinates):
+        if self.cache is not None and resolved:
+            self.cache.put_many(resolved)
+        coordinates.update(resolved)
+        resolved.clear()
+
+    def geocode_many(self, addresses):
+        """
+        Returns {address: (lat, lng)} for the unique addresses.
+        Addresses that keep failing are logged and left out so they are retried next run.
+        """
+        addresses = list(dict.fromkeys(addresses))
+        coordinates = self.cache.get_many(addresses) if self.cache is not None else {}
+        pending = [address for address in addresses if address not in coordinates]
+        print(f"{len(addresses)} unique addresses, {len(pending)} not in cache.")
+        if not pending:
+            return coordinates
+
+        resolved = {}
+        pool = ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            futures = {pool.submit(self.geocode_one, address): address for address in pending}
+            for done, future in enumerate(as_completed(futures), 1):
+                address = futures[future]
+                try:
+                    resolved[address] = future.result()
+                except FATAL_ERRORS:
+                    raise
+                except Exception as e:
+                    print(f"Error geocoding {address}: {e}")
+
+                if len(resolved) >= self.checkpoint_every:
+                    self._checkpoint(resolved, coordinates)
+                # Progress feedback every 10 addresses
+                if done % 10 == 0:
+                    print(f"Processed {done}/{len(pending)} addresses.")
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+            self._checkpoint(resolved, coordinates)
+        return coordinates
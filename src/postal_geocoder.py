@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+
+# Canadian postal code: forward sortation area (FSA, e.g. "T5J") plus optional local delivery unit ("0N3")
+POSTAL_CODE_PATTERN = r"\b([A-Z]\d[A-Z])\s?(\d[A-Z]\d)?\b"
+
+
+def normalize_postal_codes(values):
+    """Extracts (fsa, full postal code) from free-text addresses, e.g. "... T5J 0N3" -> ("T5J", "T5J0N3")."""
+    parts = pd.Series(values, dtype="object").astype(str).str.upper().str.extract(POSTAL_CODE_PATTERN)
+    fsa = parts[0]
+    full = fsa + parts[1]
+    return fsa.fillna("").to_numpy(dtype=str), full.fillna("").to_numpy(dtype=str)
+
+
+class PostalCodeGeocoder:
+    """
+    Offline geocoder for Canadian postal codes backed by a local lookup table
+    (`postal_code`, `latitude`, `longitude`, e.g. an export of the GeoNames CA postal codes).
+    Full codes are looked up first; unknown codes fall back to their FSA centroid.
+    Can be used in place of OpenCageGeocode: `geocode()` returns OpenCage-shaped results.
+    """
+
+    def __init__(self, table_path):
+        self._build(pd.read_csv(table_path, dtype={"postal_code": str}))
+
+    @classmethod
+    def from_frame(cls, table):
+        geocoder = cls.__new__(cls)
+        geocoder._build(table)
+        return geocoder
+
+    def _build(self, table):
+        codes = table["postal_code"].str.upper().str.replace(r"\s+", "", regex=True)
+        table = table.assign(postal_code=codes).dropna(subset=["latitude", "longitude"])
+
+        full = table[codes.str.len() == 6].groupby("postal_code")[["latitude", "longitude"]].mean()
+        # FSA centroids from the full codes, overridden by any explicit 3-character rows in the table
+        fsa = full.groupby(full.index.str[:3]).mean()
+        explicit_fsa = table[codes.str.len() == 3].groupby("postal_code")[["latitude", "longitude"]].mean()
+        fsa = pd.concat([fsa[~fsa.index.isin(explicit_fsa.index)], explicit_fsa]).sort_index()
+
+        # Sorted key arrays so whole columns can be resolved with one searchsorted call
+        self.codes = full.index.to_numpy(dtype=str)
+        self.coords = full.to_numpy(dtype=float)
+        self.fsa_codes = fsa.index.to_numpy(dtype=str)
+        self.fsa_coords = fsa.to_numpy(dtype=float)
+
+    @staticmethod
+    def _lookup(keys, sorted_keys, coords):
+        result = np.full((len(keys), 2), np.nan)
+        if len(sorted_keys) == 0:
+            return result, np.zeros(len(keys), dtype=bool)
+        idx = np.clip(np.searchsorted(sorted_keys, keys), 0, len(sorted_keys) - 1)
+        hit = (sorted_keys[idx] == keys) & (keys != "")
+        result[hit] = coords[idx[hit]]
+        return result, hit
+
+    def geocode_batch(self, values):
+        """
+        Geocodes a whole column of postal codes / addresses at once.
+        Returns a DataFrame with Latitude, Longitude and geocode_precision ("postal_code", "fsa" or None).
+        """
+        fsa, full = normalize_postal_codes(values)
+        coords, full_hit = self._lookup(full, self.codes, self.coords)
+        fsa_coords, fsa_hit = self._lookup(fsa, self.fsa_codes, self.fsa_coords)
+
+        use_fsa = ~full_hit & fsa_hit
+        coords[use_fsa] = fsa_coords[use_fsa]
+        precision = np.select([full_hit, use_fsa], ["postal_code", "fsa"], default=None)
+        index = values.index if isinstance(values, pd.Series) else None
+        return pd.DataFrame({
+            "Latitude": coords[:, 0],
+            "Longitude": coords[:, 1],
+            "geocode_precision": precision,
+        }, index=index)
+
+    def geocode(self, address):
+        """OpenCage-compatible single lookup: a list with one result, or an empty list."""
+        match = self.geocode_batch([address]).iloc[0]
+        if match["geocode_precision"] is None:
+            return []
+        return [{
+            "geometry": {"lat": float(match["Latitude"]), "lng": float(match["Longitude"])},
+            "confidence": 10 if match["geocode_precision"] == "postal_code" else 5,
+        }]
@@ -0,0 +1,273 @@
+import glob
+import os
+import shutil
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from contextlib import contextmanager
+from functools import partial
+
+import pandas as pd
+import yaml
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.dedupe import composite_key_hash, dedupe_listings, KEY_COLUMNS, DATE_COLUMN
+from src.encoding import ListingEncoder
+from src.regions import label_regions, load_polygon_index
+
+# Load configuration
+with open("configs/config.yaml", "r") as f:
+    config = yaml.safe_load(f)
+
+SOURCE_FILE = os.path.join(config["paths"]["data"], "CBB_Listings_LongLat.csv")
+OUTPUT_DIR = config["preprocessing"]["output_dir"]
+CHUNK_SIZE = config["preprocessing"]["chunk_size"]
+DEDUPED_DIR = config["preprocessing"]["deduped_dir"]
+WORKERS = config["preprocessing"]["workers"]
+
+# Columns read from the source (the notebook's columns_cluster plus the listing date used by
+# dedupe and partitioning, days_on_market for the dealer/region aggregates and the drivetrain
+# and fuel type of the price model).
+# Only these are parsed; listing_Active is kept when the source has it.
+SOURCE_DTYPES = {
+    "dealer_id": "string",
+    "listing_type": "string",
+    "listing_first_date": "string",
+    "days_on_market": "float64",
+    "Latitude": "float64",
+    "Longitude": "float64",
+    "stock_type": "string",
+    "vin": "string",
+    "make": "string",
+    "model": "string",
+    "mileage": "float64",
+    "price": "float64",
+    "model_year": "Int16",
+    "drivetrain_from_vin": "string",
+    "fuel_type_from_vin": "string",
+    "listing_Active": "boolean",
+}
+PARTITION_COLUMN = "listing_month"
+
+
+def read_listing_chunks(source=SOURCE_FILE, chunk_size=CHUNK_SIZE, columns=None):
+    """
+    Yields the source in chunks of `chunk_size` rows, parsing only the projected columns
+    with explicit dtypes (no type inference, no full-file load).
+    """
+    wanted = set(columns or SOURCE_DTYPES)
+    reader = pd.read_csv(
+        source,
+        usecols=lambda column: column in wanted,
+        dtype={column: dtype for column, dtype in SOURCE_DTYPES.items() if column in wanted},
+        chunksize=chunk_size,
+    )
+    with reader:
+        yield from reader
+
+
+def fit_encoder(source=SOURCE_FILE, chunk_size=CHUNK_SIZE, polygon_index=None, encoder=None):
+    """
+    First pass: fits the encoder vocabularies (top makes need global counts) by streaming
+    only the categorical and coordinate columns.
+    """
+    encoder = encoder or ListingEncoder()
+    columns = ["listing_type", "stock_type", "make", "Latitude", "Longitude"]
+    for chunk in read_listing_chunks(source, chunk_size, columns):
+        chunk["region"] = label_regions(chunk, polygon_index=polygon_index)
+        encoder.partial_fit(chunk)
+    return encoder
+
+
+def prepare_chunk(chunk, encoder, polygon_index=None):
+    """
+    Region label, dedupe key, partition month and one-hot columns for one chunk.
+    The original categorical columns are kept next to their encoding.
+    """
+    chunk[DATE_COLUMN] = pd.to_datetime(chunk[DATE_COLUMN], errors="coerce")
+    chunk["region"] = label_regions(chunk, polygon_index=polygon_index).astype("string")
+    chunk["composite_key"] = composite_key_hash(chunk, KEY_COLUMNS)
+    chunk[PARTITION_COLUMN] = chunk[DATE_COLUMN].dt.strftime("%Y-%m").fillna("unknown")
+
+    encoded = pd.DataFrame(encoder.transform(chunk, dense=True), index=chunk.index, columns=encoder.feature_names)
+    return pd.concat([chunk, encoded], axis=1)
+
+
+def resolve_workers(workers=WORKERS):
+    """Number of worker processes; None or 0 means one per CPU core."""
+    return max(1, workers or os.cpu_count() or 1)
+
+
+# Per-process state of the pool workers, set once by _init_worker instead of pickling it with every task
+_worker_state = {}
+
+
+def _init_worker(encoder, polygon_index):
+    _worker_state["encoder"] = encoder
+    _worker_state["polygon_index"] = polygon_index
+
+
+@contextmanager
+def replacing_dir(path):
+    """
+    Yields a fresh temporary directory next to `path` that replaces `path` when the block
+    succeeds, so a rerun never mixes new part files with the previous run's and a failed run
+    leaves the previous output in place.
+    """
+    parent = os.path.dirname(os.path.abspath(path))
+    os.makedirs(parent, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix=f".{os.path.basename(os.path.normpath(path))}-", dir=parent)
+    try:
+        yield staging
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    if os.path.exists(path):
+        shutil.rmtree(path)
+    os.rename(staging, path)
+
+
+def _write_chunk(number, chunk, output_dir, encoder=None, polygon_index=None):
+    """Prepares one chunk and appends it to the dataset as its own file. Returns the row count."""
+    encoder = encoder or _worker_state["encoder"]
+    polygon_index = polygon_index if polygon_index is not None else _worker_state.get("polygon_index")
+    prepared = prepare_chunk(chunk, encoder, polygon_index)
+    prepared.to_parquet(
+        output_dir,
+        engine="pyarrow",
+        index=False,
+        partition_cols=[PARTITION_COLUMN],
+        basename_template=f"part-{number:05d}-{{i}}.parquet",
+    )
+    return len(prepared)
+
+
+def preprocess_listings(source=SOURCE_FILE, output_dir=OUTPUT_DIR, chunk_size=CHUNK_SIZE, encoder=None,
+                        polygon_index=None, workers=WORKERS):
+    """
+    Streams the source through selection, region labelling, dedupe keys and encoding, appending
+    every chunk to a Parquet dataset partitioned by listing month. The encoder is fitted in a first
+    streaming pass unless an already fitted one is given.
+    With `workers` > 1 chunks are prepared in a process pool, each worker writing its own file;
+    at most two chunks per worker are in flight, so peak memory stays bounded by the chunk size.
+    Dedupe runs afterwards on the dataset (see dedupe_dataset): `composite_key` is stable across chunks.
+    The dataset replaces `output_dir` once complete (see replacing_dir).
+    Returns a summary with the number of rows written and the output files.
+    """
+    if polygon_index is None:
+        polygon_index = load_polygon_index()
+    if encoder is None:
+        encoder = fit_encoder(source, chunk_size, polygon_index)
+    workers = resolve_workers(workers)
+
+    rows = 0
+    with replacing_dir(output_dir) as staging:
+        if workers == 1:
+            for number, chunk in enumerate(read_listing_chunks(source, chunk_size)):
+                rows += _write_chunk(number, chunk, staging, encoder, polygon_index)
+        else:
+            with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(encoder, polygon_index)) as pool:
+                pending = set()
+                for number, chunk in enumerate(read_listing_chunks(source, chunk_size)):
+                    if len(pending) >= 2 * workers:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        rows += sum(future.result() for future in done)
+                    pending.add(pool.submit(_write_chunk, number, chunk, staging))
+                rows += sum(future.result() for future in wait(pending).done)
+
+    return {
+        "rows": rows,
+        "files": sorted(glob.glob(os.path.join(output_dir, "**", "*.parquet"), recursive=True)),
+        "encoder": encoder,
+    }
+
+
+def read_processed(output_dir=OUTPUT_DIR, columns=None, months=None):
+    """Reads the processed dataset back, optionally only some columns and listing months."""
+    filters = [(PARTITION_COLUMN, "in", list(months))] if months else None
+    df = pd.read_parquet(output_dir, engine="pyarrow", columns=columns, filters=filters)
+    if PARTITION_COLUMN in df.columns:
+        df[PARTITION_COLUMN] = df[PARTITION_COLUMN].astype(str)
+    return df
+
+
+def listing_months(output_dir=OUTPUT_DIR):
+    """Listing month partitions present in the dataset."""
+    prefix = f"{PARTITION_COLUMN}="
+    return sorted(name[len(prefix):] for name in os.listdir(output_dir) if name.startswith(prefix))
+
+
+def boundary_keys(output_dir=OUTPUT_DIR):
+    """Composite keys of vehicles listed in more than one month partition (only two columns are read)."""
+    keys = read_processed(output_dir, columns=["composite_key", PARTITION_COLUMN]).drop_duplicates()
+    months_per_key = keys["composite_key"].value_counts()
+    return months_per_key.index[months_per_key > 1].to_numpy()
+
+
+def _write_partition(df, deduped_dir, basename):
+    df.to_parquet(
+        deduped_dir,
+        engine="pyarrow",
+        index=False,
+        partition_cols=[PARTITION_COLUMN],
+        basename_template=f"{basename}-{{i}}.parquet",
+    )
+
+
+def _dedupe_month(month, output_dir, deduped_dir, boundary):
+    """
+    Dedupes one month partition and writes it out. Vehicles that are also listed in other months
+    are not deduped here; their rows are returned for the cross-partition pass.
+    """
+    df = read_processed(output_dir, months=[month])
+    crosses = df["composite_key"].isin(boundary).to_numpy()
+    deduped = dedupe_listings(df[~crosses])
+    if len(deduped):
+        _write_partition(deduped, deduped_dir, f"part-{month}")
+    return len(df), len(deduped), df[crosses]
+
+
+def dedupe_dataset(output_dir=OUTPUT_DIR, deduped_dir=DEDUPED_DIR, workers=WORKERS):
+    """
+    Dedupes the processed dataset one month partition at a time in a process pool, writing the
+    result to `deduped_dir` with the same partitioning. Only vehicles listed in several months
+    need rows from other partitions: they are collected from the workers and deduped together
+    at the end, so the result is the same as deduping the whole dataset at once.
+    The result replaces `deduped_dir` once complete (see replacing_dir).
+    """
+    boundary = boundary_keys(output_dir)
+    months = listing_months(output_dir)
+
+    workers = resolve_workers(workers)
+    with replacing_dir(deduped_dir) as staging:
+        if workers == 1:
+            results = [_dedupe_month(month, output_dir, staging, boundary) for month in months]
+        else:
+            with ProcessPoolExecutor(workers) as pool:
+                dedupe_month = partial(_dedupe_month, output_dir=output_dir, deduped_dir=staging, boundary=boundary)
+                results = list(pool.map(dedupe_month, months))
+
+        crossing = [rows for _, _, rows in results if len(rows)]
+        merged = dedupe_listings(pd.concat(crossing, ignore_index=True)) if crossing else pd.DataFrame()
+        if len(merged):
+            _write_partition(merged, staging, "boundary")
+
+    return {
+        "rows_in": sum(rows_in for rows_in, _, _ in results),
+        "rows_out": sum(rows_out for _, rows_out, _ in results) + len(merged),
+        "boundary_rows": sum(len(rows) for rows in crossing),
+        "partitions": len(months),
+    }
+
+
+if __name__ == "__main__":
+    summary = preprocess_listings()
+    summary["encoder"].save()
+    print(f"Wrote {summary['rows']} rows to {len(summary['files'])} files under {OUTPUT_DIR}")
+    deduped = dedupe_dataset()
+    print(
+        f"Deduped {deduped['rows_in']} -> {deduped['rows_out']} rows across {deduped['partitions']} partitions "
+        f"({deduped['boundary_rows']} rows needed the cross-partition pass) into {DEDUPED_DIR}"
+    )
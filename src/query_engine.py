@@ -0,0 +1,299 @@
+import glob
+import logging
+import os
+import threading
+from dataclasses import dataclass
+
+import duckdb
+
+logger = logging.getLogger(__name__)
+
+# Dimensions of the pre-aggregated `listing_cells` table; every dashboard filter is on one of them
+CELL_KEYS = ("region_label", "make", "model_year", "car_type")
+
+
+@dataclass(frozen=True)
+class ListingFilters:
+    """Dashboard filter selection. Empty tuples / None mean "no filter"."""
+    regions: tuple = ()
+    makes: tuple = ()
+    year_range: tuple = None
+    stock_types: tuple = ()
+
+
+class ListingsQueryEngine:
+    """
+    Holds the used/new listings in an in-process DuckDB database and serves the
+    filtered aggregates used by the dashboard. Aggregates are read from `listing_cells`
+    (one row per region x make x year x car type), which new listing partitions update
+    incrementally. Results are cached per filter combination.
+    One engine is shared by every Streamlit session thread: a DuckDB connection is not
+    thread-safe, so reads run on their own cursor and writes and the cache hold `_lock`.
+    """
+
+    def __init__(self, used_cars_file, new_cars_file, max_cached_results=256):
+        self.used_cars_file = used_cars_file
+        self.new_cars_file = new_cars_file
+        self.max_cached_results = max_cached_results
+        self.con = duckdb.connect(database=":memory:")
+        self._cache = {}
+        self._generation = 0
+        self._lock = threading.RLock()
+        self.load()
+
+    def load(self):
+        """(Re)loads both listing files into the columnar `listings` table."""
+        with self._lock:
+            self.con.execute(
+                """
+                CREATE OR REPLACE TABLE listings AS
+                SELECT *, 'Used' AS car_type FROM read_csv_auto(?)
+                UNION ALL BY NAME
+                SELECT *, 'New' AS car_type FROM read_csv_auto(?)
+                """,
+                [self.used_cars_file, self.new_cars_file],
+            )
+            self.con.execute("CREATE OR REPLACE TABLE ingested_files (path VARCHAR PRIMARY KEY)")
+            self.con.execute("CREATE OR REPLACE TABLE quarantined_files (path VARCHAR PRIMARY KEY, error VARCHAR)")
+            self.con.execute(f"CREATE OR REPLACE TABLE listing_cells AS {self._cells_sql('listings')}")
+            self.clear_cache()
+
+    @staticmethod
+    def _cells_sql(source):
+        keys = ", ".join(CELL_KEYS)
+        return f"""
+            SELECT {keys},
+                   count(*) AS cars_sold,
+                   count(vin) AS vin_count,
+                   coalesce(sum(price), 0) AS price_sum,
+                   count(price) AS price_count
+            FROM {source}
+            GROUP BY {keys}
+        """
+
+    def _conform_sql(self, file_path):
+        """
+        SELECT over a listing file cast to the schema of `listings`: columns the table lacks are
+        dropped, missing ones are left to the BY NAME insert (NULL).
+        """
+        table = {name: dtype for name, dtype, *_ in self.con.execute("DESCRIBE listings").fetchall()}
+        incoming = [row[0] for row in self.con.execute("DESCRIBE SELECT * FROM read_csv_auto(?)", [file_path]).fetchall()]
+        columns = [f'CAST("{name}" AS {table[name]}) AS "{name}"' for name in incoming
+                   if name in table and name != "car_type"]
+        if not columns:
+            raise ValueError(f"{file_path} has none of the listings columns")
+        return f"SELECT {', '.join(columns)}, ? AS car_type FROM read_csv_auto(?)"
+
+    def append_listings(self, file_path, car_type):
+        """
+        Appends a new partition of listings and merges its aggregates into `listing_cells`.
+        Only the cells touched by the partition are updated.
+        """
+        match = " AND ".join(f"listing_cells.{key} IS NOT DISTINCT FROM delta.{key}" for key in CELL_KEYS)
+        with self._lock:
+            self.con.begin()
+            try:
+                self.con.execute(
+                    f"CREATE OR REPLACE TEMP TABLE new_listings AS {self._conform_sql(file_path)}",
+                    [car_type, file_path],
+                )
+                self.con.execute("INSERT INTO listings BY NAME SELECT * FROM new_listings")
+                self.con.execute(f"CREATE OR REPLACE TEMP TABLE delta AS {self._cells_sql('new_listings')}")
+                self.con.execute(
+                    f"""
+                    UPDATE listing_cells SET
+                        cars_sold = listing_cells.cars_sold + delta.cars_sold,
+                        vin_count = listing_cells.vin_count + delta.vin_count,
+                        price_sum = listing_cells.price_sum + delta.price_sum,
+                        price_count = listing_cells.price_count + delta.price_count
+                    FROM delta WHERE {match}
+                    """
+                )
+                self.con.execute(
+                    f"""
+                    INSERT INTO listing_cells BY NAME
+                    SELECT * FROM delta
+                    WHERE NOT EXISTS (SELECT 1 FROM listing_cells WHERE {match})
+                    """
+                )
+                self.con.execute("INSERT INTO ingested_files VALUES (?)", [file_path])
+                self.con.execute("DROP TABLE new_listings")
+                self.con.execute("DROP TABLE delta")
+                self.con.commit()
+            except Exception:
+                self.con.rollback()
+                raise
+            self.clear_cache()
+
+    def refresh(self, incoming_dir):
+        """
+        Appends listing files dropped in `incoming_dir/used/` and `incoming_dir/new/`
+        that have not been ingested yet. Returns the paths that were appended.
+        The check and the appends hold the engine lock, so sessions refreshing at the same
+        time never ingest a file twice (ingested_files.path is also a primary key).
+        A file that cannot be appended (unreadable, or values that do not cast to the table's
+        types) is logged and quarantined, so it is not retried on every rerun; see quarantined.
+        """
+        appended = []
+        with self._lock:
+            seen = {row[0] for row in self.con.execute(
+                "SELECT path FROM ingested_files UNION ALL SELECT path FROM quarantined_files"
+            ).fetchall()}
+            for car_type in ("Used", "New"):
+                for path in sorted(glob.glob(os.path.join(incoming_dir, car_type.lower(), "*.csv"))):
+                    if path in seen:
+                        continue
+                    try:
+                        self.append_listings(path, car_type)
+                    except (duckdb.Error, ValueError) as e:
+                        logger.warning("Quarantined listing file %s: %s", path, e)
+                        self.con.execute("INSERT INTO quarantined_files VALUES (?, ?)", [path, str(e)])
+                        continue
+                    appended.append(path)
+        return appended
+
+    def quarantined(self):
+        """Listing files refresh could not append, with the error (path -> message)."""
+        return dict(self._fetchall("SELECT path, error FROM quarantined_files ORDER BY path"))
+
+    def clear_cache(self):
+        with self._lock:
+            self._cache.clear()
+            self._generation += 1
+
+    def _df(self, sql, params=None):
+        """Runs a read query on a cursor of its own, so concurrent sessions never share a connection."""
+        with self.con.cursor() as cursor:
+            return cursor.execute(sql, params or []).df()
+
+    def _fetchall(self, sql, params=None):
+        with self.con.cursor() as cursor:
+            return cursor.execute(sql, params or []).fetchall()
+
+    def _where(self, filters):
+        """Builds the WHERE clause and parameters for a filter selection."""
+        clauses, params = [], []
+        for column, values in (
+            ("region_label", filters.regions),
+            ("make", filters.makes),
+            ("car_type", filters.stock_types),
+        ):
+            if values:
+                clauses.append(f"{column} IN ({', '.join('?' for _ in values)})")
+                params.extend(values)
+        if filters.year_range is not None:
+            clauses.append("model_year BETWEEN ? AND ?")
+            params.extend(filters.year_range)
+        where = "WHERE " + " AND ".join(clauses) if clauses else ""
+        return where, params
+
+    def cached(self, name, filters, compute):
+        """
+        Returns `compute()` memoised under (name, filters). The query runs outside the lock;
+        if two sessions miss at once both compute it and the first result is kept. A result
+        computed while the cache was cleared (an append landed) is returned but not stored.
+        """
+        key = (name, filters)
+        with self._lock:
+            if key in self._cache:
+                return self._cache[key]
+            generation = self._generation
+        value = compute()
+        with self._lock:
+            if generation != self._generation:
+                return value
+            if key not in self._cache:
+                if len(self._cache) >= self.max_cached_results:
+                    # Evict the oldest entry (dicts keep insertion order)
+                    self._cache.pop(next(iter(self._cache)))
+                self._cache[key] = value
+            return self._cache[key]
+
+    def query(self, sql, filters):
+        """Runs `sql` with `{where}` substituted for the filter clause and returns a DataFrame."""
+        where, params = self._where(filters)
+        return self._df(sql.format(where=where), params)
+
+    @property
+    def columns(self):
+        return [row[0] for row in self._fetchall("DESCRIBE listings")]
+
+    def filter_options(self):
+        """Distinct regions, makes, stock types and the model year range for the filter widgets."""
+        def values(column):
+            return [
+                row[0] for row in self._fetchall(
+                    f"SELECT DISTINCT {column} FROM listings WHERE {column} IS NOT NULL ORDER BY 1"
+                )
+            ]
+
+        def compute():
+            min_year, max_year = self._fetchall("SELECT min(model_year), max(model_year) FROM listings")[0]
+            return {
+                "regions": values("region_label"),
+                "makes": values("make"),
+                "stock_types": values("car_type"),
+                "year_range": (int(min_year), int(max_year)),
+            }
+        return self.cached("filter_options", None, compute)
+
+    def sales_by_region(self, filters=ListingFilters()):
+        """Number of cars sold per region and car type."""
+        return self.cached("sales_by_region", filters, lambda: self.query(
+            """
+            SELECT region_label, car_type, sum(cars_sold)::BIGINT AS cars_sold
+            FROM listing_cells {where}
+            GROUP BY region_label, car_type
+            ORDER BY region_label, car_type
+            """,
+            filters,
+        ))
+
+    def price_by_year(self, filters=ListingFilters()):
+        """Average price per model year."""
+        return self.cached("price_by_year", filters, lambda: self.query(
+            """
+            SELECT model_year, sum(price_sum) / nullif(sum(price_count), 0) AS price
+            FROM listing_cells {where}
+            GROUP BY model_year
+            ORDER BY model_year
+            """,
+            filters,
+        ))
+
+    def top_makes(self, filters=ListingFilters(), n=10):
+        """
+        Cars sold per make and car type for the `n` best-selling makes.
+        Returns the sales rows and the makes ordered by total sales.
+        """
+        def compute():
+            sales = self.query(
+                f"""
+                WITH sales AS (
+                    SELECT make, car_type, sum(vin_count)::BIGINT AS cars_sold
+                    FROM listing_cells {{where}}
+                    GROUP BY make, car_type
+                ),
+                top AS (
+                    SELECT make, sum(cars_sold) AS total_cars_sold
+                    FROM sales GROUP BY make
+                    ORDER BY total_cars_sold DESC, make
+                    LIMIT {int(n)}
+                )
+                SELECT sales.make, sales.car_type, sales.cars_sold, top.total_cars_sold
+                FROM sales JOIN top USING (make)
+                ORDER BY top.total_cars_sold DESC, sales.make, sales.car_type
+                """,
+                filters,
+            )
+            ordered_makes = sales["make"].drop_duplicates().tolist()
+            return sales.drop(columns="total_cars_sold"), ordered_makes
+        return self.cached(f"top_makes_{n}", filters, compute)
+
+    def listing_points(self, columns, filters=ListingFilters()):
+        """Listing-level values of `columns` for the filter selection (not cached, can be large)."""
+        select = ", ".join(columns)
+        not_null = " AND ".join(f"{column} IS NOT NULL" for column in columns)
+        where, params = self._where(filters)
+        where = f"{where} AND {not_null}" if where else f"WHERE {not_null}"
+        return self._df(f"SELECT {select} FROM listings {where}", params)
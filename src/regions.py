@@ -0,0 +1,190 @@
+import json
+
+import numpy as np
+import pandas as pd
+import yaml
+
+# Load configuration
+with open("configs/config.yaml", "r") as f:
+    config = yaml.safe_load(f)
+
+REGION_RULES = config["regions"]["rules"]
+DEFAULT_REGION = config["regions"]["default"]
+REGION_POLYGONS = config["regions"]["polygons"]
+
+
+def rule_mask(rule, latitude, longitude):
+    """Boolean mask of the points matching one region rule from the config."""
+    mask = np.ones(latitude.shape, dtype=bool)
+    bounds = {
+        "lat_min": (latitude, np.greater_equal),
+        "lat_max": (latitude, np.less_equal),
+        "lat_above": (latitude, np.greater),
+        "lat_below": (latitude, np.less),
+        "lng_min": (longitude, np.greater_equal),
+        "lng_max": (longitude, np.less_equal),
+        "lng_above": (longitude, np.greater),
+        "lng_below": (longitude, np.less),
+    }
+    for key, (values, compare) in bounds.items():
+        if key in rule:
+            mask &= compare(values, rule[key])
+    return mask
+
+
+def assign_regions(latitude, longitude, rules=REGION_RULES, default=DEFAULT_REGION):
+    """
+    Labels every (latitude, longitude) pair at once. Rules are checked in order and the first
+    match wins; points matching no rule (including missing coordinates) get `default`.
+    """
+    latitude = np.asarray(latitude, dtype=float)
+    longitude = np.asarray(longitude, dtype=float)
+    conditions = [rule_mask(rule, latitude, longitude) for rule in rules]
+    names = [rule["name"] for rule in rules]
+    return np.select(conditions, names, default=default).astype(object)
+
+
+def points_in_polygon(x, y, edges, max_cells=2_000_000):
+    """
+    Even-odd ray casting for many points against one polygon given as an (n_edges, 4) array of
+    x1, y1, x2, y2 (holes included). Points are processed in chunks to bound memory.
+    """
+    inside = np.zeros(len(x), dtype=bool)
+    x1, y1, x2, y2 = (edges[:, i] for i in range(4))
+    chunk = max(max_cells // max(len(edges), 1), 1)
+    for start in range(0, len(x), chunk):
+        px = x[start:start + chunk, None]
+        py = y[start:start + chunk, None]
+        straddles = (y1 > py) != (y2 > py)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            x_cross = x1 + (py - y1) * (x2 - x1) / (y2 - y1)
+        crossings = np.count_nonzero(straddles & (px < x_cross), axis=1)
+        inside[start:start + chunk] = crossings % 2 == 1
+    return inside
+
+
+class PolygonRegionIndex:
+    """
+    Region lookup against polygon boundaries (GeoJSON Polygon / MultiPolygon features).
+    A uniform grid over the polygons' extent maps every cell to its candidate polygons; cells
+    that lie entirely inside a polygon are labelled without any point-in-polygon test, and only
+    points in boundary cells go through the vectorized ray casting.
+    Features are checked in file order, so the first polygon containing a point wins.
+    """
+
+    def __init__(self, features, name_property="name", grid_size=64, default=DEFAULT_REGION):
+        self.default = default
+        self.grid_size = grid_size
+        self.names = []
+        self.polygon_names = []
+        self.polygon_edges = []
+        for feature in features:
+            name = str(feature["properties"][name_property])
+            if name not in self.names:
+                self.names.append(name)
+            geometry = feature["geometry"]
+            polygons = [geometry["coordinates"]] if geometry["type"] == "Polygon" else geometry["coordinates"]
+            for rings in polygons:
+                edges = np.concatenate([
+                    np.column_stack([ring[:-1], ring[1:]]) for ring in (np.asarray(r, dtype=float)[:, :2] for r in rings)
+                ])
+                self.polygon_names.append(self.names.index(name))
+                self.polygon_edges.append(edges)
+        self._build_grid()
+
+    @classmethod
+    def from_geojson(cls, path, **kwargs):
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f)["features"], **kwargs)
+
+    def _build_grid(self):
+        all_edges = np.concatenate(self.polygon_edges)
+        xs = np.concatenate([all_edges[:, 0], all_edges[:, 2]])
+        ys = np.concatenate([all_edges[:, 1], all_edges[:, 3]])
+        self.min_x, self.max_x, self.min_y, self.max_y = xs.min(), xs.max(), ys.min(), ys.max()
+        n = self.grid_size
+        self.cell_w = (self.max_x - self.min_x) / n or 1.0
+        self.cell_h = (self.max_y - self.min_y) / n or 1.0
+
+        # cell -> [(polygon id, fully_inside)] in feature order
+        self.cell_candidates = [[] for _ in range(n * n)]
+        for pid, edges in enumerate(self.polygon_edges):
+            ex0, ex1 = np.minimum(edges[:, 0], edges[:, 2]), np.maximum(edges[:, 0], edges[:, 2])
+            ey0, ey1 = np.minimum(edges[:, 1], edges[:, 3]), np.maximum(edges[:, 1], edges[:, 3])
+            ix0, ix1 = self._cell_x(ex0.min()), self._cell_x(ex1.max())
+            iy0, iy1 = self._cell_y(ey0.min()), self._cell_y(ey1.max())
+            for iy in range(iy0, iy1 + 1):
+                cy0 = self.min_y + iy * self.cell_h
+                cy1 = cy0 + self.cell_h
+                rows_edges = (ey1 >= cy0) & (ey0 <= cy1)
+                for ix in range(ix0, ix1 + 1):
+                    cx0 = self.min_x + ix * self.cell_w
+                    cx1 = cx0 + self.cell_w
+                    boundary = np.any(rows_edges & (ex1 >= cx0) & (ex0 <= cx1))
+                    if boundary:
+                        self.cell_candidates[iy * n + ix].append((pid, False))
+                    elif points_in_polygon(np.array([(cx0 + cx1) / 2]), np.array([(cy0 + cy1) / 2]), edges)[0]:
+                        self.cell_candidates[iy * n + ix].append((pid, True))
+
+    def _cell_x(self, x):
+        return np.clip(((np.asarray(x) - self.min_x) / self.cell_w).astype(int), 0, self.grid_size - 1)
+
+    def _cell_y(self, y):
+        return np.clip(((np.asarray(y) - self.min_y) / self.cell_h).astype(int), 0, self.grid_size - 1)
+
+    def label(self, latitude, longitude):
+        """Labels all points at once; returns a Categorical of region names (plus the default)."""
+        y = np.asarray(latitude, dtype=float)
+        x = np.asarray(longitude, dtype=float)
+        codes = np.full(len(x), -1)
+        valid = (
+            np.isfinite(x) & np.isfinite(y)
+            & (x >= self.min_x) & (x <= self.max_x) & (y >= self.min_y) & (y <= self.max_y)
+        )
+        cell = np.where(valid, self._cell_y(np.where(valid, y, self.min_y)) * self.grid_size
+                        + self._cell_x(np.where(valid, x, self.min_x)), -1)
+
+        # Group points by grid cell so each cell's candidates are tested once per batch
+        order = np.argsort(cell, kind="stable")
+        cells, starts = np.unique(cell[order], return_index=True)
+        ends = np.append(starts[1:], len(order))
+        for c, start, end in zip(cells, starts, ends):
+            if c < 0:
+                continue
+            idx = order[start:end]
+            for pid, fully_inside in self.cell_candidates[c]:
+                idx = idx[codes[idx] == -1]
+                if len(idx) == 0:
+                    break
+                if fully_inside:
+                    codes[idx] = self.polygon_names[pid]
+                else:
+                    hit = points_in_polygon(x[idx], y[idx], self.polygon_edges[pid])
+                    codes[idx[hit]] = self.polygon_names[pid]
+
+        categories = self.names + ([self.default] if self.default not in self.names else [])
+        codes[codes == -1] = categories.index(self.default)
+        return pd.Categorical.from_codes(codes, categories=categories)
+
+
+def label_regions(df, lat_column="Latitude", lng_column="Longitude", rules=REGION_RULES,
+                  default=DEFAULT_REGION, polygon_index=None):
+    """
+    Returns the region of every row of `df` as a categorical Series aligned with its index.
+    Uses `polygon_index` (a PolygonRegionIndex) when given, otherwise the rectangular rules.
+    """
+    latitude = df[lat_column].to_numpy()
+    longitude = df[lng_column].to_numpy()
+    if polygon_index is not None:
+        regions = polygon_index.label(latitude, longitude)
+    else:
+        names = list(dict.fromkeys([rule["name"] for rule in rules] + [default]))
+        regions = pd.Categorical(assign_regions(latitude, longitude, rules, default), categories=names)
+    return pd.Series(regions, index=df.index, name="region")
+
+
+def load_polygon_index(path=REGION_POLYGONS, **kwargs):
+    """Loads the configured region polygons, or returns None when no GeoJSON is configured."""
+    if not path:
+        return None
+    return PolygonRegionIndex.from_geojson(path, **kwargs)
@@ -6,13 +6,29 @@ import numpy as np
 from opencage.geocoder import OpenCageGeocode
 from pprint import pprint
 import yaml
+import os
+import sys
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.geocoding import GeocodeCache, GeocodingEngine
+from src.postal_geocoder import PostalCodeGeocoder
 
 # Load YAML configuration
 with open("configs/config.yaml", "r") as f:
     config = yaml.safe_load(f)
 
 API_KEY = config["api"]["opencage_key"]
-geocoder = OpenCageGeocode(API_KEY)
+if config["geocoding"]["backend"] == "postal_code":
+    geocoder = PostalCodeGeocoder(config["geocoding"]["postal_code_table"])
+else:
+    geocoder = OpenCageGeocode(API_KEY)
+# Shared engine so every OpenCage call goes through the same rate limiter; offline
+# backends with batch lookup are called directly (no throttling, no cache)
+geocoding_engine = None
+if not hasattr(geocoder, "geocode_batch"):
+    geocoding_engine = GeocodingEngine(geocoder, **config["geocoding"]["engine"])
 
 # ✅ Function to Load Data
 def load_csv(file_path):
@@ -29,16 +45,30 @@ def load_csv(file_path):
 def geocode_address(address):
     """Converts an address into latitude and longitude."""
     try:
-        result = geocoder.geocode(address)
-        if result:
-            lat, lon = result[0]["geometry"]["lat"], result[0]["geometry"]["lng"]
-            return lat, lon
-        else:
-            return None, None
+        if geocoding_engine is None:
+            return geocode_many([address])[address]
+        return geocoding_engine.geocode_one(address)
     except Exception as e:
         print(f"❌ Geocoding error: {e}")
         return None, None
 
+# ✅ Function to Geocode Many Addresses
+def geocode_many(addresses):
+    """
+    Geocodes addresses concurrently through the local cache; returns {address: (lat, lon)}.
+    Offline backends resolve all of them with one batch lookup, unresolved ones as (None, None).
+    """
+    if geocoding_engine is None:
+        addresses = list(dict.fromkeys(addresses))
+        matched = geocoder.geocode_batch(addresses)
+        return {
+            address: (lat, lng) if pd.notna(lat) else (None, None)
+            for address, lat, lng in zip(addresses, matched["Latitude"].tolist(), matched["Longitude"].tolist())
+        }
+    with GeocodeCache(config["geocoding"]["cache_path"]) as cache:
+        engine = GeocodingEngine(geocoder, cache=cache, bucket=geocoding_engine.bucket, **config["geocoding"]["engine"])
+        return engine.geocode_many(addresses)
+
 # ✅ Function to Plot Data Distribution
 def plot_distribution(df, column):
     """Plots the distribution of a numerical column."""
@@ -1,23 +1,92 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
 import pydeck as pdk
-import random
+
+# Palettes and layer data kept per cache, least recently used dropped first
+CACHE_SIZE = 32
+
+# Layer records and map centre keyed on the mapped rows, so Streamlit reruns skip the DataFrame
+# to records conversion. Sessions run in threads: the cache is locked and every call builds its
+# own Deck around the shared (read-only) records.
+_DECK_CACHE = OrderedDict()
+_DECK_CACHE_LOCK = threading.Lock()
+
+
+def dealer_color(dealer):
+    """Returns a stable RGB colour derived from a hash of the dealer name."""
+    digest = hashlib.md5(str(dealer).encode("utf-8")).digest()
+    return [digest[0], digest[1], digest[2]]
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def build_palette(dealer_set):
+    """Builds the dealer -> RGB palette once per (sorted) tuple of dealer names."""
+    return {dealer: dealer_color(dealer) for dealer in dealer_set}
+
+
+def deck_key(dealerships):
+    """
+    Digest of the rows the deck draws (dealer name and coordinates, in order), so a deck is
+    reused only for the same points and refreshed coordinates build a new one.
+    """
+    hashes = pd.util.hash_pandas_object(dealerships[["dealer_name", "Latitude", "Longitude"]], index=False)
+    return hashlib.sha256(hashes.to_numpy().tobytes()).hexdigest()
+
 
 def assign_colors(dealerships):
-    colors = {dealer: [random.randint(0, 255) for _ in range(3)] for dealer in dealerships["dealer_name"].unique()}
-    dealerships["color"] = dealerships["dealer_name"].map(colors)
+    codes, uniques = pd.factorize(dealerships["dealer_name"].astype(str), sort=True)
+    colors = build_palette(tuple(uniques))
+    # Gather per-row colours from a small (n_dealers x 3) table instead of mapping every row
+    rgb = np.array([colors[dealer] for dealer in uniques], dtype=np.uint8).reshape(-1, 3)
+    dealerships["color"] = rgb[codes].tolist()
     return dealerships, colors
 
+
+def layer_data(dealerships):
+    """Returns the layer records and the map centre, built once per set of mapped rows."""
+    key = deck_key(dealerships)
+    with _DECK_CACHE_LOCK:
+        cached = _DECK_CACHE.get(key)
+        if cached is not None:
+            _DECK_CACHE.move_to_end(key)
+            return cached
+
+    if "color" not in dealerships.columns:
+        # Coloured on a copy, the caller's frame is left as it is
+        dealerships, _ = assign_colors(dealerships.copy())
+    cached = (
+        dealerships.to_dict(orient="records"),
+        dealerships["Latitude"].mean(),
+        dealerships["Longitude"].mean(),
+    )
+    with _DECK_CACHE_LOCK:
+        _DECK_CACHE[key] = cached
+        _DECK_CACHE.move_to_end(key)
+        if len(_DECK_CACHE) > CACHE_SIZE:
+            _DECK_CACHE.popitem(last=False)
+    return cached
+
+
 def create_pydeck_map(dealerships):
+    records, latitude, longitude = layer_data(dealerships)
     layer = pdk.Layer(
         "ScatterplotLayer",
-        data=dealerships,
+        data=records,
         get_position="[Longitude, Latitude]",
         get_fill_color="[color[0], color[1], color[2], 160]",
         get_radius=300,
         pickable=True,
     )
-    view_state = pdk.ViewState(
-        latitude=dealerships["Latitude"].mean(),
-        longitude=dealerships["Longitude"].mean(),
-        zoom=10,
-    )
+    view_state = pdk.ViewState(latitude=latitude, longitude=longitude, zoom=10)
     return pdk.Deck(layers=[layer], initial_view_state=view_state)
+
+
+def clear_map_cache():
+    """Drops cached layer data, e.g. after the dealership coordinates are refreshed."""
+    with _DECK_CACHE_LOCK:
+        _DECK_CACHE.clear()
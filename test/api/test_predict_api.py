@@ -34,16 +34,10 @@ def test_home_endpoint():
 
 def test_predict_v1_endpoint():
     """
-    Test the V1 prediction endpoint
+    Test the V1 prediction endpoint (6 clusters)
     """
-    payload = {
-        "make": "Toyota",
-        "model": "Camry",
-        "year": 2018,
-        "mileage": 35000,
-        "condition": "Excellent"
-    }
-    
+    payload = {"avg_price": 10000, "mileage": 200000}
+
     response = requests.post(
         f"{BASE_URL}/v1/predict", 
         json=payload,
@@ -53,24 +47,16 @@ def test_predict_v1_endpoint():
     assert response.status_code == 200
     
     data = response.json()
-    assert "model_version" in data
-    assert data["model_version"] == "v1"
-    assert "prediction" in data
-    assert "input_data" in data
-    assert isinstance(data["prediction"], float)
+    assert data["model_version"] == "V1"
+    assert isinstance(data["predicted_cluster"], int)
+    assert 0 <= data["predicted_cluster"] < 6
 
 def test_predict_v2_endpoint():
     """
-    Test the V2 prediction endpoint
+    Test the V2 prediction endpoint (8 clusters)
     """
-    payload = {
-        "make": "Honda",
-        "model": "Accord",
-        "year": 2020,
-        "mileage": 15000,
-        "condition": "Excellent"
-    }
-    
+    payload = {"avg_price": 30000, "mileage": 50000}
+
     response = requests.post(
         f"{BASE_URL}/v2/predict", 
         json=payload,
@@ -80,11 +66,24 @@ def test_predict_v2_endpoint():
     assert response.status_code == 200
     
     data = response.json()
-    assert "model_version" in data
-    assert data["model_version"] == "v2"
-    assert "prediction" in data
-    assert "input_data" in data
-    assert isinstance(data["prediction"], float)
+    assert data["model_version"] == "V2"
+    assert isinstance(data["predicted_cluster"], int)
+    assert 0 <= data["predicted_cluster"] < 8
+
+def test_predict_batch():
+    """
+    Test that a batch returns one cluster per listing, the same as single requests
+    """
+    payload = {"avg_price": [10000, 30000, 75000], "mileage": [200000, 50000, 5000]}
+
+    response = requests.post(f"{BASE_URL}/v2/predict", json=payload)
+    assert response.status_code == 200
+
+    clusters = response.json()["predicted_cluster"]
+    assert len(clusters) == 3
+    for price, mileage, cluster in zip(payload["avg_price"], payload["mileage"], clusters):
+        single = requests.post(f"{BASE_URL}/v2/predict", json={"avg_price": price, "mileage": mileage})
+        assert single.json()["predicted_cluster"] == cluster
 
 def test_predict_invalid_payload():
     """
@@ -92,7 +91,7 @@ def test_predict_invalid_payload():
     """
     # Missing required fields
     payload = {
-        "make": "Toyota"
+        "avg_price": 10000
     }
     
     response = requests.post(
@@ -101,8 +100,14 @@ def test_predict_invalid_payload():
         headers={"Content-Type": "application/json"}
     )
     
-    # Expect a 500 or 400 error for invalid input
-    assert response.status_code in [400, 500]
+    assert response.status_code == 400
+    assert response.json() == {"error": "Missing avg_price or mileage"}
+
+    # Booleans and numeric strings are not numbers
+    for payload in ({"avg_price": True, "mileage": 20000}, {"avg_price": [10000, 20000], "mileage": [False, 5000]},
+                    {"avg_price": "10000", "mileage": 20000}):
+        response = requests.post(f"{BASE_URL}/v1/predict", json=payload)
+        assert response.status_code == 400
 
 def test_predict_empty_payload():
     """
@@ -115,4 +120,16 @@ def test_predict_empty_payload():
     )
     
     # Expect a 400 error for empty payload
-    assert response.status_code == 400
\ No newline at end of file
+    assert response.status_code == 400
+
+def test_price_predict_invalid_payload():
+    """
+    Test price prediction with a field of the wrong type and with an unknown field
+    """
+    response = requests.post(f"{BASE_URL}/price/predict", json={"make": "Toyota", "mileage": "a lot"})
+    assert response.status_code == 400
+    assert response.json() == {"error": "mileage must be a finite number"}
+
+    response = requests.post(f"{BASE_URL}/price/predict", json=[{"make": "Toyota", "year": 2018}])
+    assert response.status_code == 400
+    assert "year" in response.json()["error"]
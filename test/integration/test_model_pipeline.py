@@ -55,7 +55,7 @@ def generate_synthetic_car_data(n_samples=1000):
     
     return pd.DataFrame(data)
 
-def test_model_training_and_prediction():
+def test_model_training_and_prediction(tmp_path):
     """
     Integration test for model training and prediction pipeline
     """
@@ -92,7 +92,7 @@ def test_model_training_and_prediction():
     r2 = r2_score(y_test, y_pred)
     
     # Save the model
-    with open('models/test_model.pkl', 'wb') as f:
+    with open(tmp_path / 'test_model.pkl', 'wb') as f:
         pickle.dump(model, f)
     
     # Assertions
@@ -100,7 +100,7 @@ def test_model_training_and_prediction():
     assert r2 > 0.5     # R-squared should indicate decent model performance
     
     # Test model loading and prediction
-    with open('models/test_model.pkl', 'rb') as f:
+    with open(tmp_path / 'test_model.pkl', 'rb') as f:
         loaded_model = pickle.load(f)
     
     # Make a single prediction
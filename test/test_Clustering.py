@@ -1,11 +1,12 @@
 import sys
 import os
 import pytest
+import numpy as np
 import pandas as pd
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from model.clustering import ClusteringModel
+from model.clustering import ClusteringModel, iter_feature_chunks, reservoir_sample, run_artifact_paths
 
 def test_preprocess_used_cars():
     # Test data with at least 3 rows (for 3 clusters)
@@ -19,3 +20,103 @@ def test_preprocess_used_cars():
     
     assert len(agg_data) == 4  # Ensure all rows are clustered
     assert "cluster" in agg_data.columns  # Check if 'cluster' column is added
+
+
+def make_blobs(n_per_cluster=300):
+    rng = np.random.default_rng(0)
+    centres = [(8000, 180000), (25000, 60000), (60000, 10000)]
+    return pd.DataFrame(np.vstack([
+        rng.normal(centre, (1500, 8000), size=(n_per_cluster, 2)) for centre in centres
+    ]), columns=["avg_price", "mileage"])
+
+
+@pytest.mark.parametrize("backend", ["kmeans", "minibatch", "streaming"])
+def test_backends_recover_separated_clusters(backend):
+    data = make_blobs()
+    clustering = ClusteringModel(n_clusters=3, random_state=42, backend=backend, batch_size=128)
+    clustered = clustering.train(data, ["avg_price", "mileage"])
+
+    # Every blob ends up in a single cluster of its own
+    blob = np.repeat([0, 1, 2], 300)
+    assert clustered.groupby(blob)["cluster"].nunique().tolist() == [1, 1, 1]
+    assert clustered["cluster"].nunique() == 3
+
+
+def test_streaming_from_disk_matches_in_memory_assignments(tmp_path):
+    data = make_blobs()
+    path = str(tmp_path / "features.csv")
+    data.sample(frac=1, random_state=1).to_csv(path, index=False)
+
+    streamed = ClusteringModel(n_clusters=3, random_state=42, backend="streaming", batch_size=128)
+    streamed.train_stream(lambda: iter_feature_chunks(path, ["avg_price", "mileage"], chunk_size=100), ["avg_price", "mileage"])
+    full = ClusteringModel(n_clusters=3, random_state=42).train(data, ["avg_price", "mileage"])
+
+    # Same partition of the points, up to cluster numbering
+    pairs = pd.crosstab(streamed.predict(data), full["cluster"])
+    assert ((pairs > 0).sum(axis=1) == 1).all()
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        ClusteringModel(n_clusters=3, backend="dbscan")
+
+
+def test_streaming_needs_a_minibatch_backend(tmp_path):
+    path = str(tmp_path / "features.csv")
+    make_blobs().to_csv(path, index=False)
+
+    clustering = ClusteringModel(n_clusters=3, random_state=42, backend="kmeans")
+    with pytest.raises(ValueError):
+        clustering.train_stream(lambda: iter_feature_chunks(path, ["avg_price", "mileage"]), ["avg_price", "mileage"])
+
+
+def test_warm_start_from_previous_centroids_reports_drift():
+    data = make_blobs()
+    clustering = ClusteringModel(n_clusters=3, random_state=42)
+    clustering.train(data, ["avg_price", "mileage"])
+    previous = clustering.model.cluster_centers_.copy()
+
+    # Next week's listings: the same market, prices up by 1000
+    shifted = make_blobs().assign(avg_price=lambda df: df["avg_price"] + 1000)
+    drift = clustering.warm_start(shifted, max_iter=5)
+
+    # Cluster numbers keep their meaning; as many new rows as previous ones, so every
+    # centroid moved halfway to the new prices
+    assert drift["cluster"].tolist() == [0, 1, 2]
+    assert np.allclose(drift["avg_price_after"] - drift["avg_price_before"], 500, atol=150)
+    assert (drift["shift"] > 0).all()
+    assert clustering.model.n_iter_ <= 5
+    np.testing.assert_allclose(clustering.scaler.inverse_transform(previous)[:, 0], drift["avg_price_before"])
+
+
+def test_warm_start_on_data_covering_some_clusters_keeps_the_others():
+    data = make_blobs()
+    clustering = ClusteringModel(n_clusters=3, random_state=42)
+    clustered = clustering.train(data, ["avg_price", "mileage"])
+    middle = clustered["cluster"].iloc[300]
+
+    # Only listings of the middle blob, prices up by 500
+    new = make_blobs().iloc[300:600].assign(avg_price=lambda df: df["avg_price"] + 500)
+    drift = clustering.warm_start(new, max_iter=10).set_index("cluster")
+
+    others = drift.index != middle
+    np.testing.assert_allclose(drift.loc[others, "mileage_after"], drift.loc[others, "mileage_before"], rtol=1e-6)
+    np.testing.assert_allclose(drift.loc[others, "avg_price_after"], drift.loc[others, "avg_price_before"], rtol=1e-6)
+    # The middle cluster moves toward the new prices, weighted against its 300 previous rows
+    assert 200 < drift.loc[middle, "avg_price_after"] - drift.loc[middle, "avg_price_before"] < 300
+    assert clustering.cluster_sizes.sum() == pytest.approx(1200)
+
+
+def test_warm_start_from_logged_artifacts(tmp_path):
+    clustering = ClusteringModel(n_clusters=3, random_state=42)
+    clustering.train(make_blobs(), ["avg_price", "mileage"])
+    artifacts = tmp_path / "1" / "run123" / "artifacts"
+    clustering.save(str(artifacts / "kmeans_model_3.pkl"), str(artifacts / "scaler_3.pkl"))
+
+    previous = ClusteringModel.from_checkpoint(*run_artifact_paths("run123", artifact_root=str(tmp_path)))
+    sample = reservoir_sample((chunk for chunk in np.array_split(make_blobs(), 7)), size=200)
+    drift = previous.warm_start(sample, max_iter=3)
+
+    assert len(sample) == 200
+    assert previous.n_clusters == 3
+    assert drift["shift"].max() < 0.05
@@ -0,0 +1,61 @@
+import sys
+import os
+import pytest
+import numpy as np
+from sklearn.cluster import KMeans
+from sklearn.metrics import silhouette_score
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from model.evaluation import sampled_silhouette, simplified_silhouette, silhouette, evaluate_clustering
+
+
+@pytest.fixture
+def clustered():
+    rng = np.random.default_rng(0)
+    X = np.vstack([rng.normal(centre, 0.08, size=(400, 2)) for centre in [(0.2, 0.8), (0.5, 0.3), (0.8, 0.7)]])
+    kmeans = KMeans(n_clusters=3, random_state=42, n_init=10).fit(X)
+    return X, kmeans.labels_, kmeans.cluster_centers_
+
+
+def test_sampled_silhouette_on_every_point_is_exact(clustered):
+    X, labels, _ = clustered
+    estimate = sampled_silhouette(X, labels, sample_size=None)
+
+    assert estimate["value"] == pytest.approx(silhouette_score(X, labels))
+    assert estimate["sample_size"] == len(X)
+
+
+def test_sampled_silhouette_interval_covers_exact_value(clustered):
+    X, labels, _ = clustered
+    estimate = sampled_silhouette(X, labels, sample_size=200, random_state=1)
+
+    assert estimate["estimator"] == "sampled"
+    assert estimate["ci_low"] <= silhouette_score(X, labels) <= estimate["ci_high"]
+    assert estimate["ci_high"] - estimate["ci_low"] < 0.1
+
+
+def test_simplified_silhouette_tracks_exact_value(clustered):
+    X, labels, centers = clustered
+    estimate = simplified_silhouette(X, labels, centers)
+
+    assert estimate["estimator"] == "simplified"
+    assert estimate["value"] == pytest.approx(silhouette_score(X, labels), abs=0.1)
+
+
+def test_auto_method_switches_to_sampling_above_sample_size(clustered):
+    X, labels, centers = clustered
+
+    assert silhouette(X, labels, centers, method="auto", sample_size=5000)["estimator"] == "exact"
+    assert silhouette(X, labels, centers, method="auto", sample_size=300)["estimator"] == "sampled"
+    with pytest.raises(ValueError):
+        silhouette(X, labels, centers, method="fast")
+
+
+def test_report_names_the_estimator_of_each_metric(clustered):
+    X, labels, centers = clustered
+    metrics, report = evaluate_clustering(X, labels, centers, method="simplified")
+
+    assert set(report) == {"silhouette_score", "davies_bouldin_index"}
+    assert report["silhouette_score"].startswith("simplified (n=1200")
+    assert metrics["silhouette_ci_low"] <= metrics["silhouette_score"] <= metrics["silhouette_ci_high"]
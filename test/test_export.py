@@ -0,0 +1,61 @@
+import sys
+import os
+import json
+import pytest
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from model.clustering import ClusteringModel
+from model.export import SlimClusteringModel, cluster_region_table
+
+
+@pytest.fixture
+def trained():
+    rng = np.random.default_rng(0)
+    data = pd.DataFrame({
+        "avg_price": rng.uniform(1000, 90000, 5000),
+        "mileage": rng.uniform(0, 300000, 5000),
+    })
+    clustering = ClusteringModel(n_clusters=6, random_state=42)
+    return clustering, clustering.train(data, ["avg_price", "mileage"])
+
+
+def test_slim_export_predicts_like_the_estimator(trained, tmp_path):
+    clustering, data = trained
+    path = clustering.export(str(tmp_path / "kmeans.json"))
+    slim = SlimClusteringModel.load(path)
+
+    # Only centroids and scaler parameters are stored, not the 5000 training labels
+    assert os.path.getsize(path) < 2000
+    assert slim.features == ["avg_price", "mileage"]
+    np.testing.assert_array_equal(slim.predict(data[["avg_price", "mileage"]].to_numpy()), data["cluster"])
+
+
+def test_cluster_region_table_ranks_regions_by_sales(trained, tmp_path):
+    clustering, _ = trained
+    agg_data = pd.DataFrame({
+        "cluster": [0, 0, 0, 1, 0],
+        "region_label": ["North", "South", "West", "East", "South"],
+        "total_sales": [100, 80, 120, 50, 70],
+    })
+    path = clustering.export(str(tmp_path / "kmeans.json"), cluster_regions=cluster_region_table(agg_data))
+    slim = SlimClusteringModel.load(path)
+
+    assert slim.regions(0)["region_label"].tolist() == ["South", "West", "North"]
+    assert slim.regions(0)["total_sales"].tolist() == [150, 120, 100]
+    assert slim.regions(5).empty
+
+
+def test_unknown_export_format_is_rejected(trained, tmp_path):
+    clustering, _ = trained
+    path = clustering.export(str(tmp_path / "kmeans.json"))
+    with open(path) as f:
+        state = json.load(f)
+    state["format_version"] = 99
+    with open(path, "w") as f:
+        json.dump(state, f)
+
+    with pytest.raises(ValueError):
+        SlimClusteringModel.load(path)
@@ -0,0 +1,101 @@
+import sys
+import os
+import pytest
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from model.price import PriceModel, search_price_model
+
+search_params = {"n_candidates": 6, "factor": 2, "cv": 2, "n_estimators": 10, "n_jobs": 2}
+
+
+@pytest.fixture(scope="module")
+def listings():
+    rng = np.random.default_rng(0)
+    n = 1500
+    base = {"Toyota": 30000, "Ford": 35000, "Kia": 22000}
+    df = pd.DataFrame({
+        "make": rng.choice(list(base), n),
+        "model": rng.choice(["A", "B", "C"], n),
+        "model_year": rng.integers(2010, 2024, n),
+        "mileage": rng.uniform(0, 250000, n),
+        "drivetrain_from_vin": rng.choice(["FWD", "AWD", None], n),
+        "fuel_type_from_vin": rng.choice(["Gasoline", "Diesel"], n),
+        "region": rng.choice(["North", "South"], n),
+    })
+    df["price"] = (
+        df["make"].map(base) + (df["model_year"] - 2010) * 1500 - df["mileage"] * 0.08
+        + np.where(df["drivetrain_from_vin"] == "AWD", 3000, 0) + rng.normal(0, 1000, n)
+    )
+    df.loc[rng.random(n) < 0.05, "mileage"] = np.nan
+    return df
+
+
+@pytest.fixture(scope="module")
+def searched(listings):
+    return search_price_model(listings, **search_params)
+
+
+def test_successive_halving_search(searched, listings):
+    model, search, metrics = searched
+    # Several rounds, each on more rows than the previous one
+    assert search.n_iterations_ > 1
+    assert list(search.n_resources_) == sorted(search.n_resources_)
+    # Far better than predicting the mean price
+    assert metrics["test_mae"] < 0.3 * np.abs(listings["price"] - listings["price"].mean()).mean()
+    assert model.metadata["n_features"] == len(model.feature_names)
+
+
+def test_export_round_trip(searched, listings, tmp_path):
+    model, _, _ = searched
+    loaded = PriceModel.load(model.save(str(tmp_path / "price_model.pkl")))
+
+    np.testing.assert_array_equal(loaded.predict(listings.head(200)), model.predict(listings.head(200)))
+    assert loaded.fill_values == model.fill_values
+    assert loaded.metadata["best_params"] == model.metadata["best_params"]
+
+
+def test_unseen_categories_and_missing_values(searched):
+    model, _, _ = searched
+    unseen = pd.DataFrame({"make": ["Lada"], "model": [None], "model_year": [None], "mileage": [np.nan],
+                           "drivetrain_from_vin": ["RWD"], "fuel_type_from_vin": [None], "region": ["Unknown"]})
+    assert np.isfinite(model.predict(unseen)).all()
+
+
+def test_search_is_logged(searched, tmp_path):
+    from mlflow.tracking import MlflowClient
+    from model.price import log_price_search
+
+    model, search, metrics = searched
+    path = model.save(str(tmp_path / "price_model.pkl"))
+    tracking_uri = (tmp_path / "mlruns").as_uri()
+    run_id = log_price_search(model, search, metrics, path, "price_test", tracking_uri)
+
+    client = MlflowClient(tracking_uri=tracking_uri)
+    run = client.get_run(run_id)
+    assert run.data.metrics["test_mae"] == pytest.approx(metrics["test_mae"])
+    assert set(search.best_params_) <= set(run.data.params)
+    assert {artifact.path for artifact in client.list_artifacts(run_id)} == {"cv_results.csv", "price_model.pkl"}
+
+
+def test_price_cleaning_keeps_new_and_unlocated_listings():
+    from model.price import clean_price_listings
+
+    listings = pd.DataFrame({
+        "vin": ["V1", "V2", "V3", "V4"],
+        "make": "Ford",
+        "model_year": 2020,
+        "mileage": [30000.0, 10.0, 50000.0, 10.0],
+        "listing_first_date": pd.to_datetime(["2024-01-01", "2024-02-01", "2024-03-01", "2024-04-01"]),
+        "stock_type": ["Used", "New", "Used", "New"],
+        "price": [20000, 45000, np.nan, 0],
+        "Latitude": [53.5, np.nan, 53.5, 53.5],
+        "Longitude": [-113.5, np.nan, -113.5, -113.5],
+    })
+    cleaned = clean_price_listings(listings)
+    assert sorted(cleaned["vin"]) == ["V1", "V2"]
+    assert cleaned["region"].notna().all()
+
+    assert clean_price_listings(listings, stock_type="Used")["vin"].tolist() == ["V1"]
@@ -0,0 +1,79 @@
+import sys
+import os
+import pytest
+import joblib
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from model.export import SlimClusteringModel, export_model, cluster_region_table
+
+ARTIFACTS = {
+    6: "mlartifacts/1/80a37f2c53ea4dd98f323fdfa2f6ef78/artifacts",
+    8: "mlartifacts/1/be705235c8bb4b06888f522408baff22/artifacts",
+}
+
+
+@pytest.fixture
+def listings():
+    rng = np.random.default_rng(0)
+    return np.column_stack([rng.uniform(500, 500000, 20000), rng.uniform(0, 750000, 20000)])
+
+
+@pytest.mark.parametrize("k", [6, 8])
+def test_folded_kernel_matches_kmeans_predict(k, listings, tmp_path):
+    model_path = f"{ARTIFACTS[k]}/kmeans_model_{k}.pkl"
+    scaler_path = f"{ARTIFACTS[k]}/scaler_{k}.pkl"
+    kmeans, scaler = joblib.load(model_path), joblib.load(scaler_path)
+    expected = kmeans.predict(scaler.transform(pd.DataFrame(listings, columns=["avg_price", "mileage"])))
+
+    from_checkpoint = SlimClusteringModel.from_checkpoint(model_path, scaler_path, region_table_path=None)
+    from_export = SlimClusteringModel.load(export_model(kmeans, scaler, str(tmp_path / "kmeans.json")))
+
+    np.testing.assert_array_equal(from_checkpoint.predict(listings), expected)
+    np.testing.assert_array_equal(from_export.assign(listings[:, 0], listings[:, 1]), expected)
+
+
+def test_region_tables_are_ranked_per_cluster(tmp_path):
+    kmeans = joblib.load(f"{ARTIFACTS[6]}/kmeans_model_6.pkl")
+    scaler = joblib.load(f"{ARTIFACTS[6]}/scaler_6.pkl")
+    agg_data = pd.DataFrame({
+        "region_label": ["North", "South", "East", "North"],
+        "total_sales": [500, 600, 700, 100],
+        "cluster": [0, 0, 0, 1],
+    })
+    agg_data.to_csv(tmp_path / "cluster_regions.csv", index=False)
+    predictor = SlimClusteringModel.from_checkpoint(
+        f"{ARTIFACTS[6]}/kmeans_model_6.pkl", f"{ARTIFACTS[6]}/scaler_6.pkl", str(tmp_path / "cluster_regions.csv")
+    )
+
+    assert predictor.regions(0)["region_label"].tolist() == ["East", "South", "North"]
+    assert predictor.regions(1)["total_sales"].tolist() == [100]
+    assert list(predictor.regions(5).columns) == ["region_label", "total_sales"]
+    assert predictor.regions(5).empty
+
+    exported = SlimClusteringModel.load(
+        export_model(kmeans, scaler, str(tmp_path / "kmeans.json"), cluster_regions=cluster_region_table(agg_data))
+    )
+    pd.testing.assert_frame_equal(exported.regions(0), predictor.regions(0))
+
+
+@pytest.mark.parametrize("k", [6, 8])
+def test_served_runs_load_from_their_slim_export(k, listings, tmp_path):
+    import shutil
+    from model.prediction import load_run_predictor
+
+    run_id = ARTIFACTS[k].split("/")[2]
+    kmeans = joblib.load(f"{ARTIFACTS[k]}/kmeans_model_{k}.pkl")
+    scaler = joblib.load(f"{ARTIFACTS[k]}/scaler_{k}.pkl")
+    expected = kmeans.predict(scaler.transform(pd.DataFrame(listings, columns=["avg_price", "mileage"])))
+    np.testing.assert_array_equal(load_run_predictor(run_id).predict(listings), expected)
+
+    # Pickles only: no silent fallback
+    artifacts = tmp_path / "1" / run_id / "artifacts"
+    artifacts.mkdir(parents=True)
+    shutil.copy(f"{ARTIFACTS[k]}/kmeans_model_{k}.pkl", artifacts)
+    shutil.copy(f"{ARTIFACTS[k]}/scaler_{k}.pkl", artifacts)
+    with pytest.raises(FileNotFoundError, match="model.export"):
+        load_run_predictor(run_id, artifact_root=str(tmp_path))
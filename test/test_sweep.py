@@ -0,0 +1,96 @@
+import sys
+import os
+import pytest
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from model.sweep import run_sweep
+
+
+@pytest.fixture
+def listings():
+    rng = np.random.default_rng(0)
+    centres = [(8000, 180000), (25000, 60000), (60000, 10000), (40000, 120000)]
+    return pd.DataFrame(np.vstack([
+        rng.normal(centre, (2000, 9000), size=(150, 2)) for centre in centres
+    ]), columns=["avg_price", "mileage"])
+
+
+def test_parallel_sweep_matches_sequential(listings):
+    parallel, _ = run_sweep(listings, n_clusters_values=[2, 3, 4], workers=2, log=False)
+    sequential, _ = run_sweep(listings, n_clusters_values=[2, 3, 4], workers=1, log=False)
+
+    assert [result["n_clusters"] for result in parallel] == [2, 3, 4]
+    for a, b in zip(parallel, sequential):
+        assert a["metrics"]["inertia"] == pytest.approx(b["metrics"]["inertia"])
+        assert a["metrics"]["silhouette_score"] == pytest.approx(b["metrics"]["silhouette_score"])
+    # Four well separated groups: k=4 has the best Davies-Bouldin index
+    best = min(parallel, key=lambda result: result["metrics"]["davies_bouldin_index"])
+    assert best["n_clusters"] == 4
+
+
+@pytest.mark.parametrize("backend", ["kmeans", "minibatch"])
+def test_candidates_fit_on_the_read_only_shared_matrix(listings, tmp_path, backend):
+    from model.sweep import fit_candidate, share_matrix
+
+    X = listings.to_numpy() / listings.to_numpy().max(axis=0)
+    path = share_matrix(X, str(tmp_path))
+    result = fit_candidate(3, path, backend=backend)
+    assert result["metrics"]["inertia"] > 0
+    # The shared file is left as written
+    np.testing.assert_array_equal(np.load(path), X)
+
+
+def test_sweep_logs_one_run_per_candidate(listings, tmp_path):
+    from mlflow.tracking import MlflowClient
+
+    tracking_uri = (tmp_path / "mlruns").as_uri()
+    results, _ = run_sweep(listings, n_clusters_values=[3, 4], workers=1,
+                           experiment_name="sweep_test", tracking_uri=tracking_uri)
+
+    client = MlflowClient(tracking_uri=tracking_uri)
+    for result in results:
+        run = client.get_run(result["run_id"])
+        assert run.info.run_name == f"KMeans_Run_{result['n_clusters']}clusters"
+        assert set(run.data.metrics) >= {"inertia", "silhouette_score", "davies_bouldin_index"}
+        assert run.data.params["n_clusters"] == str(result["n_clusters"])
+        assert run.data.tags["estimator.silhouette_score"].startswith("exact")
+        artifacts = {artifact.path for artifact in client.list_artifacts(result["run_id"])}
+        k = result['n_clusters']
+        assert artifacts == {f"kmeans_model_{k}.pkl", f"scaler_{k}.pkl", f"kmeans_model_{k}.json"}
+
+
+def test_sweep_logs_server_experiment_artifacts_locally(listings, tmp_path):
+    from mlflow.tracking import MlflowClient
+
+    # Like mlflow.db: an experiment created through the MLflow server, logged to from the database
+    tracking_uri = f"sqlite:///{tmp_path / 'mlflow.db'}"
+    client = MlflowClient(tracking_uri=tracking_uri)
+    experiment_id = client.create_experiment("server_experiment", artifact_location="mlflow-artifacts:/1")
+    results, _ = run_sweep(listings, n_clusters_values=[3], workers=1, experiment_name="server_experiment",
+                           tracking_uri=tracking_uri, artifact_root=str(tmp_path / "mlartifacts"))
+
+    run_id = results[0]["run_id"]
+    assert client.get_run(run_id).info.status == "FINISHED"
+    artifacts = tmp_path / "mlartifacts" / "1" / run_id / "artifacts"
+    assert sorted(os.listdir(artifacts)) == ["kmeans_model_3.json", "kmeans_model_3.pkl", "scaler_3.pkl"]
+    assert client.search_runs([experiment_id])[0].info.run_id == run_id
+
+
+def test_failed_logging_marks_the_run_failed(listings, tmp_path, monkeypatch):
+    from mlflow.tracking import MlflowClient
+    import model.sweep
+
+    def broken(*args, **kwargs):
+        raise RuntimeError("artifact store unavailable")
+
+    monkeypatch.setattr(model.sweep, "log_artifacts", broken)
+    tracking_uri = (tmp_path / "mlruns").as_uri()
+    with pytest.raises(RuntimeError):
+        run_sweep(listings, n_clusters_values=[3], workers=1, experiment_name="sweep_test", tracking_uri=tracking_uri)
+
+    client = MlflowClient(tracking_uri=tracking_uri)
+    runs = client.search_runs([client.get_experiment_by_name("sweep_test").experiment_id])
+    assert [run.info.status for run in runs] == ["FAILED"]
@@ -18,3 +18,205 @@ def test_train_model():
     assert scaler is not None
 
     print("✅ Model training test passed!")
+
+
+@pytest.fixture
+def listings_csv(tmp_path):
+    import numpy as np
+    import pandas as pd
+
+    rng = np.random.default_rng(0)
+    n = 600
+    dealers = rng.integers(0, 40, n)
+    listings = pd.DataFrame({
+        "dealer_id": dealers.astype(str),
+        "stock_type": np.where(rng.random(n) < 0.8, "Used", "New"),
+        "listing_first_date": pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 300, n), unit="D"),
+        "Latitude": 53.4 + (dealers % 5) * 0.06,
+        "Longitude": -113.6 + (dealers % 7) * 0.04,
+        "vin": [f"VIN{i}" for i in range(n)],
+        "make": "Ford",
+        "model": "F-150",
+        "model_year": 2018,
+        "mileage": rng.normal(20000 + dealers * 4000, 5000),
+        "price": rng.normal(60000 - dealers * 1000, 3000),
+    })
+    path = tmp_path / "listings.csv"
+    listings.to_csv(path, index=False)
+    return str(path)
+
+
+def _run(listings_csv, tmp_path, **params):
+    from model.train import run_pipeline
+
+    checkpoints = tmp_path / "checkpoints"
+    checkpoints.mkdir(exist_ok=True)
+    return run_pipeline(
+        listings_csv, str(tmp_path / "cache"), log_to_mlflow=False,
+        model_path=str(checkpoints / "kmeans_model.pkl"), scaler_path=str(checkpoints / "scaler.pkl"),
+        export_path=str(checkpoints / "kmeans_model.json"), region_table_path=str(checkpoints / "cluster_regions.csv"),
+        **params,
+    )
+
+
+def test_pipeline_recomputes_only_downstream_stages(listings_csv, tmp_path):
+    first = _run(listings_csv, tmp_path, n_clusters=3)
+    assert all(status.startswith("computed") for status in first["stages"].values())
+
+    # Nothing changed: only the last stage is read back, earlier outputs are not even loaded
+    again = _run(listings_csv, tmp_path, n_clusters=3)
+    assert again["stages"]["evaluate"] == "cached"
+    assert again["stages"]["load"] == again["stages"]["clean"] == "skipped"
+    assert again["metrics"] == first["metrics"]
+
+    changed = _run(listings_csv, tmp_path, n_clusters=4)
+    assert changed["stages"]["load"] == changed["stages"]["clean"] == "skipped"
+    assert changed["stages"]["scale"] == "cached"
+    assert changed["stages"]["fit"].startswith("computed")
+    assert changed["stages"]["evaluate"].startswith("computed")
+
+
+def test_pipeline_registers_checkpoints(listings_csv, tmp_path):
+    import pandas as pd
+    from model.export import SlimClusteringModel
+
+    _run(listings_csv, tmp_path, n_clusters=3)
+    checkpoints = tmp_path / "checkpoints"
+    kmeans = joblib.load(checkpoints / "kmeans_model.pkl")
+    assert kmeans.n_clusters == 3
+    assert not hasattr(kmeans, "labels_")
+
+    table = pd.read_csv(checkpoints / "cluster_regions.csv")
+    # Only used listings are aggregated
+    assert table["total_sales"].sum() == (pd.read_csv(listings_csv)["stock_type"] == "Used").sum()
+
+    predictor = SlimClusteringModel.load(str(checkpoints / "kmeans_model.json"))
+    cluster = predictor.assign(30000, 80000)[0]
+    assert list(predictor.regions(cluster).columns) == ["region_label", "total_sales"]
+
+
+def test_training_run_logs_to_a_server_experiment(listings_csv, tmp_path):
+    from mlflow.tracking import MlflowClient
+    from model.train import log_training_run
+
+    _run(listings_csv, tmp_path, n_clusters=3)
+    checkpoints = tmp_path / "checkpoints"
+    tracking_uri = f"sqlite:///{tmp_path / 'mlflow.db'}"
+    client = MlflowClient(tracking_uri=tracking_uri)
+    client.create_experiment("server_experiment", artifact_location="mlflow-artifacts:/1")
+    kmeans = joblib.load(checkpoints / "kmeans_model.pkl")
+
+    run_id = log_training_run(
+        kmeans, [str(checkpoints / "kmeans_model.pkl"), str(checkpoints / "scaler.pkl")], {"inertia": 1.0}, {}, {},
+        experiment_name="server_experiment", tracking_uri=tracking_uri, artifact_root=str(tmp_path / "mlartifacts"),
+    )
+    assert client.get_run(run_id).info.status == "FINISHED"
+    artifacts = tmp_path / "mlartifacts" / "1" / run_id / "artifacts"
+    assert sorted(os.listdir(artifacts)) == ["kmeans_model.pkl", "scaler.pkl"]
+
+
+def test_register_run_rebuilds_the_region_table(listings_csv, tmp_path):
+    import shutil
+    from model.prediction import load_predictor
+    from model.train import register_run
+
+    # A logged run: model and scaler pickles only, no region metadata
+    _run(listings_csv, tmp_path, n_clusters=3)
+    artifacts = tmp_path / "mlartifacts" / "1" / "run" / "artifacts"
+    artifacts.mkdir(parents=True)
+    shutil.copy(tmp_path / "checkpoints" / "kmeans_model.pkl", artifacts / "kmeans_model_3.pkl")
+    shutil.copy(tmp_path / "checkpoints" / "scaler.pkl", artifacts / "scaler_3.pkl")
+
+    registered = tmp_path / "registered"
+    paths = {name: str(registered / name) for name in ("kmeans_model.pkl", "scaler.pkl", "kmeans_model.json",
+                                                       "cluster_regions.csv")}
+    register_run("run", listings_csv, str(tmp_path / "cache"), model_path=paths["kmeans_model.pkl"],
+                 scaler_path=paths["scaler.pkl"], export_path=paths["kmeans_model.json"],
+                 region_table_path=paths["cluster_regions.csv"], artifact_root=str(tmp_path / "mlartifacts"))
+
+    predictor = load_predictor(paths["kmeans_model.json"])
+    regions = predictor.regions(predictor.assign(30000, 80000)[0])
+    assert not regions.empty
+    assert regions["total_sales"].is_monotonic_decreasing
+
+
+def test_predictor_without_region_metadata_is_rejected(tmp_path):
+    from model.clustering import ClusteringModel
+    from model.prediction import load_predictor
+
+    checkpoint = ClusteringModel.from_checkpoint()
+    export_path = checkpoint.export(str(tmp_path / "kmeans_model.json"))
+    with pytest.raises(ValueError, match="region"):
+        load_predictor(export_path)
+
+
+def test_stage_cache_keys_on_code_and_prunes_old_entries(tmp_path):
+    from model.train import StageCache
+
+    def compute():
+        return 1
+
+    def changed():
+        return 2
+
+    cache = StageCache(str(tmp_path), keep=2)
+    first = cache.stage("load", compute, {}, code=[compute])
+    assert first.output == 1
+    # Same parameters, different code: a new entry instead of the stale output
+    edited = cache.stage("load", changed, {}, code=[changed])
+    assert edited.key != first.key
+    assert edited.output == 2
+
+    for version in range(3):
+        assert cache.stage("load", compute, {"version": version}, code=[compute]).output == 1
+    assert len(list(tmp_path.glob("load-*.joblib"))) == 2
+
+
+def test_register_returns_a_predictor_without_touching_the_module_model(listings_csv, tmp_path):
+    from model import train
+
+    before = train.clustering.model
+    result = train.run_pipeline(
+        listings_csv, str(tmp_path / "cache"), log_to_mlflow=False, n_clusters=3,
+        model_path=str(tmp_path / "checkpoints" / "kmeans_model.pkl"),
+        scaler_path=str(tmp_path / "checkpoints" / "scaler.pkl"),
+        export_path=str(tmp_path / "checkpoints" / "kmeans_model.json"),
+        region_table_path=str(tmp_path / "regions" / "cluster_regions.csv"),
+    )
+    assert train.clustering.model is before
+    assert (tmp_path / "regions" / "cluster_regions.csv").exists()
+    assert not result["predictor"].regions(result["predictor"].assign(30000, 80000)[0]).empty
+
+
+def test_warm_start_run_logs_the_centroid_drift(listings_csv, tmp_path, monkeypatch):
+    import shutil
+    import pandas as pd
+    from model import train
+
+    _run(listings_csv, tmp_path, n_clusters=3)
+    artifacts = tmp_path / "mlartifacts" / "1" / "run" / "artifacts"
+    artifacts.mkdir(parents=True)
+    shutil.copy(tmp_path / "checkpoints" / "kmeans_model.pkl", artifacts / "kmeans_model_3.pkl")
+    shutil.copy(tmp_path / "checkpoints" / "scaler.pkl", artifacts / "scaler_3.pkl")
+
+    logged = {}
+
+    def log_training_run(model, artifacts, metrics, report, params):
+        logged.update(artifacts=artifacts, metrics=metrics, params=params)
+        return "new-run"
+
+    monkeypatch.setattr(train, "log_training_run", log_training_run)
+    warm = tmp_path / "warm"
+    result = train.warm_start_run(
+        "run", listings_csv, str(tmp_path / "cache"), log_to_mlflow=True,
+        model_path=str(warm / "kmeans_model.pkl"), scaler_path=str(warm / "scaler.pkl"),
+        export_path=str(warm / "kmeans_model.json"), region_table_path=str(warm / "cluster_regions.csv"),
+        drift_path=str(warm / "centroid_drift.csv"), artifact_root=str(tmp_path / "mlartifacts"),
+    )
+    assert result["run_id"] == "new-run"
+    assert str(warm / "centroid_drift.csv") in logged["artifacts"]
+    assert logged["params"]["warm_start_from"] == "run"
+    drift = pd.read_csv(warm / "centroid_drift.csv")
+    assert list(drift["cluster"]) == [0, 1, 2]
+    assert logged["metrics"]["max_centroid_shift"] == pytest.approx(drift["shift"].max())
+    assert result["predictor"].metadata["warm_start_from"] == "run"
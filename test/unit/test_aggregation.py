@@ -0,0 +1,87 @@
+import sys
+import os
+import pytest
+import numpy as np
+import pandas as pd
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from src.aggregation import ListingAggregator, aggregate_listings, merge_by_group, sort_by_group
+
+percentiles = [0.1, 0.25, 0.75, 0.9]
+columns = ['price', 'mileage', 'days_on_market']
+
+
+def make_listings(n=5000, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'dealer_id': rng.choice([f'D{i}' for i in range(60)], n),
+        'region': rng.choice(['North', 'South', 'Central', None], n, p=[0.3, 0.3, 0.35, 0.05]),
+        'price': rng.lognormal(10, 0.5, n),
+        'mileage': rng.integers(0, 300000, n).astype(float),
+        'days_on_market': rng.integers(1, 200, n).astype(float),
+    })
+    df.loc[rng.random(n) < 0.1, 'mileage'] = np.nan
+    # One dealer never reports days on market
+    df.loc[df['dealer_id'] == 'D0', 'days_on_market'] = np.nan
+    return df
+
+
+# pandas version, used as the reference
+def aggregate_pandas(df, by):
+    named = {'listings': (columns[0], 'size')}
+    for column in columns:
+        named[f'{column}_count'] = (column, 'count')
+        named[f'{column}_mean'] = (column, 'mean')
+        named[f'{column}_median'] = (column, 'median')
+        for q in percentiles:
+            named[f'{column}_p{q * 100:g}'] = (column, lambda s, q=q: s.quantile(q))
+    return df.groupby(by).agg(**named).reset_index()
+
+
+@pytest.mark.parametrize('by', [['dealer_id'], ['region'], ['region', 'dealer_id']])
+def test_matches_pandas(by):
+    df = make_listings()
+    result = aggregate_listings(df, by, columns, percentiles)
+    expected = aggregate_pandas(df, by)
+
+    assert list(result.columns) == list(expected.columns)
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False, check_exact=False, rtol=1e-9)
+
+
+def test_incremental_updates_match_one_pass():
+    df = make_listings()
+    aggregator = ListingAggregator(['dealer_id'], columns, percentiles)
+    for chunk in np.array_split(df.sample(frac=1, random_state=1), 7):
+        aggregator.update(chunk)
+
+    pd.testing.assert_frame_equal(aggregator.result(), aggregate_listings(df, ['dealer_id'], columns, percentiles),
+                                  check_exact=False, rtol=1e-9)
+
+
+def test_new_groups_in_later_batches():
+    aggregator = ListingAggregator(['dealer_id'], ['price'], [0.5])
+    aggregator.update(pd.DataFrame({'dealer_id': ['A', 'A'], 'price': [1.0, 3.0]}))
+    aggregator.update(pd.DataFrame({'dealer_id': ['B', 'A'], 'price': [10.0, 5.0]}))
+    result = aggregator.result()
+
+    assert result['dealer_id'].tolist() == ['A', 'B']
+    assert result['listings'].tolist() == [3, 1]
+    assert result['price_mean'].tolist() == [3.0, 10.0]
+    assert result['price_median'].tolist() == [3.0, 10.0]
+
+
+def test_merge_by_group_matches_a_full_sort():
+    rng = np.random.default_rng(0)
+    # Few distinct values so there are ties; the batch has a group the history does not
+    codes, values = rng.integers(0, 20, 3000), rng.integers(0, 50, 3000).astype(float)
+    new_codes, new_values = rng.integers(0, 25, 400), rng.integers(0, 50, 400).astype(float)
+    order = sort_by_group(codes, values, 25)
+
+    merged_codes, merged_values = merge_by_group(codes[order], values[order], new_codes, new_values, 25)
+    all_codes, all_values = np.concatenate([codes, new_codes]), np.concatenate([values, new_values])
+    expected = sort_by_group(all_codes, all_values, 25)
+
+    np.testing.assert_array_equal(merged_codes, all_codes[expected])
+    np.testing.assert_array_equal(merged_values, all_values[expected])
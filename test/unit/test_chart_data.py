@@ -0,0 +1,64 @@
+import sys
+import os
+import pytest
+import numpy as np
+import pandas as pd
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from src.chart_data import lttb, prepare_line_data, prepare_scatter_data, cap_payload
+
+
+def test_lttb_keeps_endpoints_and_peaks():
+    """
+    Test LTTB returns the requested number of points and keeps extremes
+    """
+    x = np.arange(1000)
+    y = np.zeros(1000)
+    y[500] = 100
+
+    keep = lttb(x, y, 50)
+
+    assert len(keep) == 50
+    assert keep[0] == 0 and keep[-1] == 999
+    assert 500 in keep
+    assert np.all(np.diff(keep) > 0)
+
+
+def test_prepare_line_data_within_budget():
+    """
+    Test line data is downsampled to the point budget
+    """
+    df = pd.DataFrame({'model_year': np.arange(10000), 'price': np.random.rand(10000)})
+
+    small = prepare_line_data(df.head(20), 'model_year', 'price', max_points=100)
+    large = prepare_line_data(df, 'model_year', 'price', max_points=100)
+
+    assert len(small) == 20
+    assert len(large) == 100
+
+
+def test_prepare_scatter_data_bins_large_inputs():
+    """
+    Test scatter data is binned and counts are preserved
+    """
+    rng = np.random.default_rng(42)
+    df = pd.DataFrame({'mileage': rng.integers(0, 250000, 20000), 'price': rng.integers(1000, 80000, 20000)})
+
+    points = prepare_scatter_data(df, 'mileage', 'price', max_points=400)
+
+    assert len(points) <= 400
+    assert points['count'].sum() == 20000
+
+
+def test_cap_payload_limits_bytes():
+    """
+    Test the payload cap thins out rows
+    """
+    df = pd.DataFrame({'x': np.arange(5000), 'y': np.arange(5000)})
+
+    capped = cap_payload(df, max_bytes=10000)
+
+    assert len(capped.to_json(orient='records')) <= 10000 * 1.1
+    assert len(capped) < len(df)
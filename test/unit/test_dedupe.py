@@ -0,0 +1,122 @@
+import sys
+import os
+import pytest
+import numpy as np
+import pandas as pd
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from src.dedupe import filter_recent_duplicates, composite_key_codes, dedupe_listings
+
+
+time_window = pd.Timedelta(days=30)
+
+
+# Notebook version, used as the reference
+def filter_recent_duplicates_iterrows(df):
+    unique_listings = []
+    last_seen = {}
+
+    for idx, row in df.iterrows():
+        key = row['composite_key']
+        listing_date = row['listing_first_date']
+
+        if key not in last_seen or (listing_date - last_seen[key]) > time_window:
+            unique_listings.append(idx)
+            last_seen[key] = listing_date
+
+    return df.loc[unique_listings]
+
+
+def make_listings(n=3000, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'vin': rng.choice([f'VIN{i}' for i in range(300)], n),
+        'model_year': rng.choice([2018, 2019], n),
+        'make': rng.choice(['Toyota', 'Ford'], n),
+        'mileage': rng.choice([10000, 20000], n),
+        'listing_first_date': pd.Timestamp('2023-01-01') + pd.to_timedelta(rng.integers(0, 365, n), unit='D')
+    })
+    df.loc[rng.choice(n, 20, replace=False), 'listing_first_date'] = pd.NaT
+    df['composite_key'] = df['vin'].astype(str) + '_' + df['model_year'].astype(str) + '_' + df['make'] + '_' + df['mileage'].astype(str)
+    return df
+
+
+@pytest.mark.parametrize("ascending", [None, True, False])
+def test_matches_iterrows_version(ascending):
+    """
+    Test the vectorized dedupe gives the same rows as the notebook function, for unsorted data,
+    ascending dates (chained windows) and the notebook's newest-first sort
+    """
+    df = make_listings()
+    if ascending is not None:
+        df = df.sort_values(by=['composite_key', 'listing_first_date'], ascending=[True, ascending])
+
+    expected = filter_recent_duplicates_iterrows(df)
+    result = filter_recent_duplicates(df)
+
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_configurable_window_and_keys():
+    """
+    Test a custom window and key columns
+    """
+    df = pd.DataFrame({
+        'vin': ['A', 'A', 'A', 'B'],
+        'listing_first_date': pd.to_datetime(['2023-01-01', '2023-01-05', '2023-01-12', '2023-01-02'])
+    })
+
+    result = filter_recent_duplicates(df, key_columns=['vin'], time_window=pd.Timedelta(days=7))
+
+    assert result.index.tolist() == [0, 2, 3]
+
+
+def test_composite_key_codes_match_string_keys():
+    """
+    Test integer keys group rows exactly like the string composite_key
+    """
+    df = make_listings()
+
+    codes = composite_key_codes(df)
+    string_codes, _ = pd.factorize(df['composite_key'])
+
+    assert codes.dtype == np.int64
+    # Same partition of rows: the pairs of codes map one-to-one
+    pairs = pd.DataFrame({'int': codes, 'str': string_codes}).drop_duplicates()
+    assert len(pairs) == pairs['int'].nunique() == pairs['str'].nunique()
+
+    df.loc[:10, 'make'] = np.nan
+    assert composite_key_codes(df)[df['make'].isna()].min() >= 0
+
+
+def test_composite_key_codes_refactorize_instead_of_overflowing():
+    """
+    Test high-cardinality keys are compressed instead of overflowing int64
+    """
+    n = 50000
+    df = pd.DataFrame({f'c{i}': np.arange(n) + i for i in range(6)})
+    df = pd.concat([df, df.head(10)], ignore_index=True)
+
+    codes = composite_key_codes(df, key_columns=list(df.columns))
+
+    assert len(np.unique(codes)) == n
+    assert (codes[n:] == codes[:10]).all()
+
+
+def test_dedupe_listings_matches_notebook_steps():
+    """
+    Test the integer-key pipeline keeps the same rows as the notebook's string-key steps
+    """
+    df = make_listings()
+    notebook = df.sort_values(by=['composite_key', 'listing_first_date'], ascending=[True, False])
+    expected = filter_recent_duplicates_iterrows(notebook).drop(columns=['composite_key'])
+
+    result = dedupe_listings(df.drop(columns=['composite_key']))
+
+    key = ['vin', 'model_year', 'make', 'mileage', 'listing_first_date']
+    pd.testing.assert_frame_equal(
+        result.sort_values(key).reset_index(drop=True),
+        expected.sort_values(key).reset_index(drop=True)
+    )
@@ -0,0 +1,73 @@
+import sys
+import os
+import pytest
+import numpy as np
+import pandas as pd
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from src.encoding import ListingEncoder
+
+
+def make_listings(n=500, seed=0):
+    rng = np.random.default_rng(seed)
+    makes = [f'Make{i}' for i in range(15)]
+    return pd.DataFrame({
+        'listing_type': rng.choice(['dealer', 'private'], n),
+        'stock_type': rng.choice(['Used', 'New'], n),
+        'make': rng.choice(makes, n, p=np.linspace(2, 0.1, 15) / np.linspace(2, 0.1, 15).sum()),
+        'region': rng.choice(['Central', 'North', 'South', 'East', 'West'], n),
+        'price': rng.integers(5000, 60000, n)
+    })
+
+
+# Notebook encoding steps, used as the reference
+def notebook_encoding(cluster_df):
+    cluster_df = pd.get_dummies(cluster_df, columns=['listing_type'], prefix="listing", dtype=int)
+    cluster_df = pd.get_dummies(cluster_df, columns=['stock_type'], prefix="car", dtype=int)
+    top_makes = cluster_df['make'].value_counts().nlargest(10).index
+    cluster_df['make_filtered'] = cluster_df['make'].apply(lambda x: x if x in top_makes else 'Other')
+    cluster_df = pd.get_dummies(cluster_df, columns=['make_filtered'], prefix='make', dtype=int)
+    cluster_df.drop(columns=['make'], inplace=True, errors='ignore')
+    cluster_df = pd.get_dummies(cluster_df, columns=['region'], prefix='region', dtype=int)
+    return cluster_df
+
+
+def test_encoding_matches_get_dummies():
+    """
+    Test the one-pass sparse encoding gives the same columns and values as the notebook
+    """
+    df = make_listings()
+    expected = notebook_encoding(df.copy()).drop(columns=['price'])
+
+    encoder = ListingEncoder(top_makes=10)
+    matrix = encoder.fit_transform(df)
+
+    assert matrix.dtype == np.int8
+    assert matrix.shape == expected.shape
+    encoded = pd.DataFrame(matrix.toarray(), columns=encoder.feature_names)
+    pd.testing.assert_frame_equal(encoded[expected.columns].astype(int), expected.reset_index(drop=True))
+
+
+def test_saved_encoder_is_reused_for_prediction(tmp_path):
+    """
+    Test a saved encoder reproduces the training columns on new data, including unseen categories
+    """
+    encoder = ListingEncoder(top_makes=3).fit(make_listings())
+    path = str(tmp_path / 'encoder.json')
+    encoder.save(path)
+
+    loaded = ListingEncoder.load(path)
+    new = pd.DataFrame({
+        'listing_type': ['dealer', 'auction'],
+        'stock_type': ['Used', 'New'],
+        'make': ['Make0', 'Tesla'],
+        'region': ['North', 'Nowhere']
+    })
+    encoded = pd.DataFrame(loaded.transform(new, dense=True), columns=loaded.feature_names)
+
+    assert loaded.feature_names == encoder.feature_names
+    assert encoded.loc[0, ['listing_dealer', 'car_Used', 'make_Make0', 'region_North']].tolist() == [1, 1, 1, 1]
+    assert encoded.loc[1, 'make_Other'] == 1
+    assert encoded.loc[1].sum() == 2
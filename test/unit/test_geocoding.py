@@ -0,0 +1,159 @@
+import sys
+import os
+import json
+import threading
+import time
+import pytest
+import pandas as pd
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import urlparse, parse_qs
+from opencage.geocoder import OpenCageGeocode
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import src.data_analysis as data_analysis
+from src.geocoding import GeocodeCache, GeocodingEngine, TokenBucket
+
+
+class FakeGeocoder:
+    """
+    Stands in for OpenCageGeocode and counts calls
+    """
+    calls = []
+
+    def __init__(self, api_key):
+        pass
+
+    def geocode(self, address):
+        FakeGeocoder.calls.append(address)
+        if address == 'Unknown Place':
+            return []
+        return [{"geometry": {"lat": 53.0 + len(address) / 100, "lng": -113.0}}]
+
+
+FAST = {'rate_per_second': 1000, 'backoff_seconds': 0.01}
+
+
+@pytest.fixture
+def fake_geocoder(monkeypatch):
+    FakeGeocoder.calls = []
+    monkeypatch.setattr(data_analysis, "OpenCageGeocode", FakeGeocoder)
+    return FakeGeocoder
+
+
+def test_geocode_cache_roundtrip(tmp_path):
+    """
+    Test the cache normalises addresses and persists entries
+    """
+    path = str(tmp_path / 'cache.sqlite')
+    with GeocodeCache(path) as cache:
+        cache.put('t5j 0n3', 53.54, -113.49)
+        cache.put('Unknown Place', None, None)
+
+    with GeocodeCache(path) as cache:
+        found = cache.get_many(['T5J  0N3', 'Unknown Place', 'T6E 1A1'])
+
+    assert found == {'T5J  0N3': (53.54, -113.49), 'Unknown Place': (None, None)}
+
+
+def test_geocode_addresses_dedupes_and_uses_cache(tmp_path, fake_geocoder):
+    """
+    Test each unique address is geocoded once and reruns only geocode new addresses
+    """
+    path = str(tmp_path / 'cache.sqlite')
+    df = pd.DataFrame({'dealer_postal_code': ['T5J 0N3', 'T6E 1A1', 'T5J 0N3', 'Unknown Place', None]})
+
+    result = data_analysis.geocode_addresses(df, 'dealer_postal_code', 'key', cache_path=path, engine_options=FAST)
+
+    assert sorted(fake_geocoder.calls) == ['T5J 0N3', 'T6E 1A1', 'Unknown Place']
+    assert result.loc[0, 'Latitude'] == result.loc[2, 'Latitude']
+    assert pd.isna(result.loc[3, 'Latitude']) and pd.isna(result.loc[4, 'Latitude'])
+
+    fake_geocoder.calls = []
+    refreshed = pd.DataFrame({'dealer_postal_code': ['T6E 1A1', 'T5K 2J1']})
+    data_analysis.geocode_addresses(refreshed, 'dealer_postal_code', 'key', cache_path=path, engine_options=FAST)
+
+    assert fake_geocoder.calls == ['T5K 2J1']
+    assert refreshed['Latitude'].notna().all()
+
+
+class StubOpenCageHandler(BaseHTTPRequestHandler):
+    """
+    Local stand-in for the OpenCage API: the first request for each address fails with a 500
+    """
+    seen = set()
+    requests = []
+    lock = threading.Lock()
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)['q'][0]
+        with self.lock:
+            first_attempt = query not in self.seen
+            self.requests.append(query)
+            self.seen.add(query)
+        if first_attempt:
+            status, body = 500, {'status': {'code': 500}}
+        elif query == 'Nowhere':
+            status, body = 200, {'results': []}
+        else:
+            status, body = 200, {'results': [{'geometry': {'lat': 53.5, 'lng': -113.5}}]}
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    StubOpenCageHandler.seen = set()
+    StubOpenCageHandler.requests = []
+    server = HTTPServer(('localhost', 0), StubOpenCageHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"localhost:{server.server_port}"
+    server.shutdown()
+
+
+def test_token_bucket_limits_rate():
+    """
+    Test the token bucket spaces requests out once the burst is used
+    """
+    bucket = TokenBucket(rate=20, capacity=1)
+    start = time.monotonic()
+    for _ in range(5):
+        bucket.acquire()
+
+    assert time.monotonic() - start >= 0.15
+
+
+def test_engine_retries_and_checkpoints_against_stub_server(tmp_path, stub_server):
+    """
+    Test concurrent geocoding with retries against a local stub server, then resuming from the cache
+    """
+    geocoder = OpenCageGeocode('test-key', protocol='http', domain=stub_server)
+    addresses = [f'Address {i}' for i in range(12)] + ['Nowhere']
+
+    with GeocodeCache(str(tmp_path / 'cache.sqlite')) as cache:
+        engine = GeocodingEngine(geocoder, cache=cache, rate_per_second=200, max_workers=4,
+                                 backoff_seconds=0.01, checkpoint_every=5)
+        coordinates = engine.geocode_many(addresses)
+
+        assert len(coordinates) == 13
+        assert coordinates['Address 3'] == (53.5, -113.5)
+        assert coordinates['Nowhere'] == (None, None)
+        assert len(cache) == 13
+
+        # Every address failed once and was retried
+        assert len(StubOpenCageHandler.requests) == 26
+
+        StubOpenCageHandler.requests = []
+        resumed = engine.geocode_many(addresses + ['Address 99'])
+
+        assert len(resumed) == 14
+        assert StubOpenCageHandler.requests == ['Address 99', 'Address 99']
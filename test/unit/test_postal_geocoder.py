@@ -0,0 +1,74 @@
+import sys
+import os
+import pytest
+import numpy as np
+import pandas as pd
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from src.postal_geocoder import PostalCodeGeocoder
+from src.data_analysis import geocode_addresses
+
+
+@pytest.fixture
+def geocoder():
+    table = pd.DataFrame({
+        'postal_code': ['T5J 0N3', 'T5J 1A1', 'T6E 1A1', 'T8N'],
+        'latitude': [53.54, 53.56, 53.50, 53.63],
+        'longitude': [-113.49, -113.51, -113.48, -113.62]
+    })
+    return PostalCodeGeocoder.from_frame(table)
+
+
+def test_geocode_batch_full_code_and_fsa_fallback(geocoder):
+    """
+    Test full postal codes, FSA fallback, free-text addresses and misses
+    """
+    values = pd.Series(['T5J 0N3', 't6e1a1', '10235 101 St, Edmonton T5J 9Z9', 'T8N 5B2', 'X0A 0A0', None])
+
+    result = geocoder.geocode_batch(values)
+
+    assert result['geocode_precision'].tolist() == ['postal_code', 'postal_code', 'fsa', 'fsa', None, None]
+    assert result.loc[0, 'Latitude'] == 53.54
+    # FSA centroid is the mean of the known codes in that FSA
+    assert np.isclose(result.loc[2, 'Latitude'], 53.55)
+    assert result.loc[3, 'Longitude'] == -113.62
+    assert result.loc[4:, 'Latitude'].isna().all()
+
+
+def test_geocode_matches_opencage_shape(geocoder):
+    """
+    Test the single-address lookup returns OpenCage-style results
+    """
+    assert geocoder.geocode('T6E 1A1')[0]['geometry'] == {'lat': 53.50, 'lng': -113.48}
+    assert geocoder.geocode('not a postal code') == []
+
+
+def test_geocode_addresses_uses_batch_lookup(geocoder, tmp_path):
+    """
+    Test geocode_addresses resolves a whole column offline
+    """
+    df = pd.DataFrame({'dealer_postal_code': ['T5J 0N3', 'T6E 1A1', 'T5J 0N3']})
+
+    result = geocode_addresses(df, 'dealer_postal_code', None, cache_path=str(tmp_path / 'cache.sqlite'), geocoder=geocoder)
+
+    assert result['Latitude'].tolist() == [53.54, 53.50, 53.54]
+    assert not (tmp_path / 'cache.sqlite').exists()
+
+
+def test_utilities_call_the_offline_geocoder_directly(geocoder, monkeypatch, tmp_path):
+    """
+    Test the postal backend bypasses the rate-limited engine and its cache
+    """
+    from src import utilities
+
+    monkeypatch.setattr(utilities, 'geocoder', geocoder)
+    monkeypatch.setattr(utilities, 'geocoding_engine', None)
+    monkeypatch.setitem(utilities.config['geocoding'], 'cache_path', str(tmp_path / 'cache.sqlite'))
+
+    coordinates = utilities.geocode_many(['T5J 0N3', 'T6E 1A1', 'T5J 0N3', 'nowhere'])
+
+    assert coordinates == {'T5J 0N3': (53.54, -113.49), 'T6E 1A1': (53.50, -113.48), 'nowhere': (None, None)}
+    assert utilities.geocode_address('T6E 1A1') == (53.50, -113.48)
+    assert not (tmp_path / 'cache.sqlite').exists()
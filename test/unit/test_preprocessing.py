@@ -0,0 +1,132 @@
+import sys
+import os
+import pytest
+import numpy as np
+import pandas as pd
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from src.preprocessing import preprocess_listings, read_processed, dedupe_dataset
+from src.dedupe import dedupe_listings
+from src.encoding import ListingEncoder
+from src.regions import label_regions
+
+
+@pytest.fixture
+def source_csv(tmp_path):
+    rng = np.random.default_rng(7)
+    n = 500
+    makes = np.array(['Toyota', 'Honda', 'Ford', 'Kia', 'BMW'])
+    # 300 vehicles, most of them listed more than once
+    vehicle = np.arange(n) % 300
+    df = pd.DataFrame({
+        'listing_id': np.arange(n),
+        'dealer_id': rng.integers(1, 20, n),
+        'listing_type': rng.choice(['Dealer', 'Private'], n),
+        'listing_first_date': pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 120, n), unit='D'),
+        'Latitude': rng.uniform(53.40, 53.70, n),
+        'Longitude': rng.uniform(-113.70, -113.30, n),
+        'stock_type': rng.choice(['Used', 'New'], n),
+        'vin': [f'VIN{v}' for v in vehicle],
+        'make': makes[vehicle % len(makes)],
+        'model': 'Model',
+        'mileage': (vehicle * 500).astype(float),
+        'price': rng.uniform(5000, 60000, n),
+        'model_year': 2005 + vehicle % 19,
+        'style': 'unused',
+    })
+    path = tmp_path / 'listings.csv'
+    df.to_csv(path, index=False)
+    return path, df
+
+
+def test_chunked_output_matches_in_memory_preprocessing(source_csv, tmp_path):
+    """
+    Test that the streamed, partitioned output equals processing the whole file at once
+    """
+    path, df = source_csv
+    summary = preprocess_listings(str(path), str(tmp_path / 'out'), chunk_size=64)
+
+    assert summary['rows'] == len(df)
+    processed = read_processed(str(tmp_path / 'out'))
+    assert 'style' not in processed.columns
+    assert set(processed['listing_month']) == {'2024-01', '2024-02', '2024-03', '2024-04'}
+
+    # Same region labels and one-hot columns as the in-memory path
+    df = df.assign(region=label_regions(df).astype(str))
+    expected = ListingEncoder().fit(df)
+    assert summary['encoder'].vocabularies == expected.vocabularies
+    order = ['vin', 'listing_first_date', 'price']
+    processed = processed.sort_values(order).reset_index(drop=True)
+    df = df.sort_values(order).reset_index(drop=True)
+    assert processed['region'].astype(str).tolist() == df['region'].tolist()
+    np.testing.assert_array_equal(
+        processed[expected.feature_names].to_numpy(), expected.transform(df, dense=True)
+    )
+
+
+def test_rerun_replaces_the_previous_output(source_csv, tmp_path):
+    """
+    Test that preprocessing the same input twice leaves one copy of every row
+    """
+    path, df = source_csv
+    preprocess_listings(str(path), str(tmp_path / 'out'), chunk_size=64)
+    summary = preprocess_listings(str(path), str(tmp_path / 'out'), chunk_size=128)
+
+    assert len(read_processed(str(tmp_path / 'out'))) == len(df)
+    assert all(os.path.basename(file).startswith('part-') for file in summary['files'])
+    # No staging directory is left behind
+    assert sorted(os.listdir(tmp_path)) == ['listings.csv', 'out']
+
+
+def test_composite_key_is_stable_across_chunks(source_csv, tmp_path):
+    """
+    Test that the same vehicle gets the same key whichever chunk it was read in
+    """
+    path, _ = source_csv
+    preprocess_listings(str(path), str(tmp_path / 'out'), chunk_size=50)
+    processed = read_processed(str(tmp_path / 'out'), columns=['vin', 'model_year', 'make', 'mileage', 'composite_key'])
+
+    keys_per_vehicle = processed.groupby(['vin', 'model_year', 'make', 'mileage'])['composite_key'].nunique()
+    assert (keys_per_vehicle == 1).all()
+    assert processed['composite_key'].nunique() == len(keys_per_vehicle)
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_parallel_pipeline_matches_single_pass_dedupe(source_csv, tmp_path, workers):
+    """
+    Test that per-month dedupe plus the cross-partition pass equals deduping everything at once
+    """
+    path, df = source_csv
+    preprocess_listings(str(path), str(tmp_path / 'out'), chunk_size=64, workers=workers)
+    summary = dedupe_dataset(str(tmp_path / 'out'), str(tmp_path / 'deduped'), workers=workers)
+
+    processed = read_processed(str(tmp_path / 'out'))
+    expected = dedupe_listings(processed)
+    deduped = read_processed(str(tmp_path / 'deduped'))
+
+    assert summary['rows_in'] == len(df)
+    assert summary['rows_out'] == len(deduped) == len(expected)
+    assert 0 < summary['boundary_rows'] < len(df)
+    order = ['vin', 'listing_first_date', 'price']
+    pd.testing.assert_frame_equal(
+        deduped[expected.columns].sort_values(order).reset_index(drop=True),
+        expected.sort_values(order).reset_index(drop=True),
+        check_dtype=False,
+        check_categorical=False,
+    )
+
+
+def test_dedupe_rerun_replaces_the_previous_output(source_csv, tmp_path):
+    """
+    Test that deduping again does not read back the previous run's partitions
+    """
+    path, _ = source_csv
+    preprocess_listings(str(path), str(tmp_path / 'out'), chunk_size=64)
+    first = dedupe_dataset(str(tmp_path / 'out'), str(tmp_path / 'deduped'))
+    dedupe_dataset(str(tmp_path / 'out'), str(tmp_path / 'deduped'))
+
+    deduped = read_processed(str(tmp_path / 'deduped'))
+    assert len(deduped) == first['rows_out']
+    assert not deduped.duplicated(['composite_key', 'listing_first_date']).any()
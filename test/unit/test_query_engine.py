@@ -0,0 +1,187 @@
+import sys
+import os
+import pytest
+import pandas as pd
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from src.query_engine import ListingsQueryEngine, ListingFilters
+
+
+@pytest.fixture
+def engine(tmp_path):
+    used = pd.DataFrame({
+        'region_label': ['North', 'South', 'North', 'East'],
+        'make': ['Toyota', 'Honda', 'Ford', 'Toyota'],
+        'model_year': [2015, 2018, 2020, 2019],
+        'price': [15000, 20000, 30000, 25000],
+        'vin': ['V1', 'V2', 'V3', 'V4']
+    })
+    new = pd.DataFrame({
+        'region_label': ['North', 'South'],
+        'make': ['Toyota', 'Ford'],
+        'model_year': [2023, 2023],
+        'price': [40000, 45000],
+        'vin': ['V5', 'V6']
+    })
+    used.to_csv(tmp_path / 'used_cars.csv', index=False)
+    new.to_csv(tmp_path / 'new_cars.csv', index=False)
+    return ListingsQueryEngine(str(tmp_path / 'used_cars.csv'), str(tmp_path / 'new_cars.csv'))
+
+
+def test_sales_by_region_unfiltered(engine):
+    """
+    Test the region aggregate over all listings
+    """
+    sales = engine.sales_by_region()
+
+    assert sales['cars_sold'].sum() == 6
+    north_used = sales[(sales['region_label'] == 'North') & (sales['car_type'] == 'Used')]
+    assert north_used['cars_sold'].iloc[0] == 2
+
+
+def test_filters_are_pushed_down(engine):
+    """
+    Test region, make, year and stock type filters
+    """
+    filters = ListingFilters(makes=('Toyota',), year_range=(2016, 2023), stock_types=('Used',))
+    price_by_year = engine.price_by_year(filters)
+
+    assert price_by_year['model_year'].tolist() == [2019]
+    assert price_by_year['price'].tolist() == [25000]
+
+    sales = engine.sales_by_region(ListingFilters(regions=('South',)))
+    assert sorted(sales['car_type']) == ['New', 'Used']
+
+
+def test_top_makes_order(engine):
+    """
+    Test that top makes are ordered by total cars sold
+    """
+    top_sales, makes = engine.top_makes(n=2)
+
+    assert makes == ['Toyota', 'Ford']
+    assert set(top_sales['make']) == {'Toyota', 'Ford'}
+
+
+def test_results_are_cached_per_filter_combination(engine):
+    """
+    Test that repeated filter combinations reuse the cached result
+    """
+    filters = ListingFilters(regions=('North',))
+
+    assert engine.sales_by_region(filters) is engine.sales_by_region(ListingFilters(regions=('North',)))
+    assert engine.sales_by_region(filters) is not engine.sales_by_region()
+
+
+def test_append_listings_matches_full_rebuild(engine, tmp_path):
+    """
+    Test that an incremental refresh gives the same aggregates as a full reload
+    """
+    incoming = tmp_path / 'incoming' / 'used'
+    incoming.mkdir(parents=True)
+    partition = pd.DataFrame({
+        'region_label': ['North', 'West'],
+        'make': ['Toyota', 'Kia'],
+        'model_year': [2015, 2021],
+        'price': [17000, 22000],
+        'vin': ['V7', 'V8']
+    })
+    partition.to_csv(incoming / 'listings_day2.csv', index=False)
+    stale = engine.sales_by_region()
+
+    appended = engine.refresh(str(tmp_path / 'incoming'))
+    assert appended == [str(incoming / 'listings_day2.csv')]
+    assert engine.refresh(str(tmp_path / 'incoming')) == []
+
+    used = pd.concat([pd.read_csv(tmp_path / 'used_cars.csv'), partition])
+    used.to_csv(tmp_path / 'used_full.csv', index=False)
+    rebuilt = ListingsQueryEngine(str(tmp_path / 'used_full.csv'), str(tmp_path / 'new_cars.csv'))
+
+    assert engine.sales_by_region() is not stale
+    pd.testing.assert_frame_equal(engine.sales_by_region(), rebuilt.sales_by_region())
+    pd.testing.assert_frame_equal(engine.price_by_year(), rebuilt.price_by_year())
+    assert engine.top_makes()[1] == rebuilt.top_makes()[1]
+
+
+def test_concurrent_sessions_share_one_engine(engine):
+    """
+    Test that queries from several threads (Streamlit sessions) all get correct results
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    def session(i):
+        filters = ListingFilters(year_range=(2000, 2000 + i))
+        return engine.price_by_year(filters), engine.listing_points(['price'], filters)
+
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(session, range(16, 32)))
+
+    for price_by_year, points in results:
+        assert price_by_year is not None and points is not None
+    assert results[-1][1]['price'].sum() == 175000
+
+
+def test_concurrent_refreshes_ingest_each_file_once(engine, tmp_path):
+    """
+    Test that sessions refreshing at the same time append a new file only once
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    incoming = tmp_path / 'incoming' / 'used'
+    incoming.mkdir(parents=True)
+    for day in range(3):
+        pd.DataFrame({
+            'region_label': ['North'], 'make': ['Kia'], 'model_year': [2021], 'price': [22000], 'vin': [f'D{day}']
+        }).to_csv(incoming / f'listings_day{day}.csv', index=False)
+
+    with ThreadPoolExecutor(8) as pool:
+        appended = list(pool.map(lambda _: engine.refresh(str(tmp_path / 'incoming')), range(8)))
+
+    assert sum(len(paths) for paths in appended) == 3
+    assert engine.sales_by_region()['cars_sold'].sum() == 9
+
+
+def test_refresh_conforms_extra_columns_and_quarantines_bad_files(engine, tmp_path):
+    """
+    Test that an incoming file with a column the table lacks is appended, and a file that
+    cannot be cast is quarantined instead of failing every refresh
+    """
+    incoming = tmp_path / 'incoming' / 'used'
+    incoming.mkdir(parents=True)
+    pd.DataFrame({
+        'region_label': ['North'], 'make': ['Kia'], 'model_year': [2021], 'price': [22000], 'vin': ['E1'],
+        'trim': ['LX']
+    }).to_csv(incoming / 'extra_column.csv', index=False)
+    pd.DataFrame({
+        'region_label': ['North'], 'make': ['Kia'], 'model_year': ['twenty'], 'price': [22000], 'vin': ['B1']
+    }).to_csv(incoming / 'bad_year.csv', index=False)
+
+    appended = engine.refresh(str(tmp_path / 'incoming'))
+
+    assert appended == [str(incoming / 'extra_column.csv')]
+    assert list(engine.quarantined()) == [str(incoming / 'bad_year.csv')]
+    assert 'trim' not in engine.columns
+    assert engine.sales_by_region()['cars_sold'].sum() == 7
+    # Neither file is tried again
+    assert engine.refresh(str(tmp_path / 'incoming')) == []
+
+
+def test_result_computed_during_an_append_is_not_cached(engine, tmp_path):
+    """
+    Test that a query racing an append does not leave its pre-append result in the cache
+    """
+    pd.DataFrame({
+        'region_label': ['North'], 'make': ['Kia'], 'model_year': [2021], 'price': [22000], 'vin': ['R1']
+    }).to_csv(tmp_path / 'racing.csv', index=False)
+
+    def compute():
+        stale = engine.query("SELECT sum(cars_sold) AS cars_sold FROM listing_cells {where}", ListingFilters())
+        engine.append_listings(str(tmp_path / 'racing.csv'), 'Used')
+        return stale
+
+    assert engine.cached('total', ListingFilters(), compute)['cars_sold'][0] == 6
+    fresh = engine.cached('total', ListingFilters(), lambda: engine.query(
+        "SELECT sum(cars_sold) AS cars_sold FROM listing_cells {where}", ListingFilters()))
+    assert fresh['cars_sold'][0] == 7
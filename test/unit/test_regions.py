@@ -0,0 +1,89 @@
+import sys
+import os
+import pytest
+import numpy as np
+import pandas as pd
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from src.regions import assign_regions, label_regions, points_in_polygon, PolygonRegionIndex
+from benchmarks.region_assignment import assign_region
+
+
+def test_label_regions_matches_rowwise_version():
+    """
+    Test vectorized labels against the notebook's row-wise assign_region, including boundaries
+    """
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        'Latitude': np.concatenate([rng.uniform(53.4, 53.7, 2000), [53.53, 53.58, 53.55, 53.55, np.nan]]),
+        'Longitude': np.concatenate([rng.uniform(-113.7, -113.3, 2000), [-113.52, -113.45, -113.45, -113.60, -113.5]])
+    })
+
+    expected = df.apply(lambda row: assign_region(row['Latitude'], row['Longitude']), axis=1)
+
+    assert (label_regions(df) == expected).all()
+    assert label_regions(df).iloc[-1] == 'Unknown'
+
+
+def test_assign_regions_with_custom_rules():
+    """
+    Test region rules can be swapped without code changes
+    """
+    rules = [{'name': 'Downtown', 'lat_min': 53.5, 'lat_max': 53.6}]
+
+    labels = assign_regions([53.55, 53.7], [-113.5, -113.5], rules=rules, default='Elsewhere')
+
+    assert labels.tolist() == ['Downtown', 'Elsewhere']
+
+
+def square(x0, y0, x1, y1):
+    return [[x0, y0], [x1, y0], [x1, y1], [x0, y1], [x0, y0]]
+
+
+@pytest.fixture
+def polygon_index():
+    features = [
+        # Downtown has a hole (a park) that should not be labelled
+        {'type': 'Feature', 'properties': {'name': 'Downtown'},
+         'geometry': {'type': 'Polygon', 'coordinates': [square(-113.52, 53.53, -113.45, 53.58), square(-113.50, 53.55, -113.48, 53.56)]}},
+        {'type': 'Feature', 'properties': {'name': 'Riverside'},
+         'geometry': {'type': 'MultiPolygon', 'coordinates': [
+             [square(-113.60, 53.50, -113.55, 53.52)],
+             [[[-113.44, 53.53], [-113.40, 53.53], [-113.42, 53.57], [-113.44, 53.53]]]
+         ]}},
+    ]
+    return PolygonRegionIndex(features, grid_size=16)
+
+
+def test_polygon_index_labels_points(polygon_index):
+    """
+    Test polygon labels including holes, multipolygons, triangles and points outside every polygon
+    """
+    lat = [53.54, 53.555, 53.51, 53.54, 53.60, np.nan]
+    lng = [-113.50, -113.49, -113.58, -113.42, -113.50, -113.50]
+
+    labels = polygon_index.label(lat, lng)
+
+    assert isinstance(labels, pd.Categorical)
+    assert list(labels) == ['Downtown', 'Unknown', 'Riverside', 'Riverside', 'Unknown', 'Unknown']
+
+
+def test_polygon_index_matches_brute_force(polygon_index):
+    """
+    Test the grid index gives the same labels as testing every polygon for every point
+    """
+    rng = np.random.default_rng(1)
+    lat = rng.uniform(53.48, 53.60, 20000)
+    lng = rng.uniform(-113.62, -113.38, 20000)
+
+    expected = np.full(len(lat), 'Unknown', dtype=object)
+    for pid in reversed(range(len(polygon_index.polygon_edges))):
+        inside = points_in_polygon(lng, lat, polygon_index.polygon_edges[pid])
+        expected[inside] = polygon_index.names[polygon_index.polygon_names[pid]]
+
+    labels = label_regions(pd.DataFrame({'Latitude': lat, 'Longitude': lng}), polygon_index=polygon_index)
+
+    assert labels.dtype == 'category'
+    assert (labels.astype(object).to_numpy() == expected).all()
@@ -0,0 +1,91 @@
+import sys
+import os
+import pytest
+import pandas as pd
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from src.visualization import assign_colors, create_pydeck_map, clear_map_cache, dealer_color, CACHE_SIZE
+
+
+def make_dealerships():
+    return pd.DataFrame({
+        'dealer_name': ['Dealer A', 'Dealer B', 'Dealer A', 'Dealer C'],
+        'Latitude': [53.54, 53.60, 53.55, 53.50],
+        'Longitude': [-113.49, -113.40, -113.50, -113.55]
+    })
+
+
+def test_assign_colors_is_deterministic():
+    """
+    Test that dealer colours are stable across calls
+    """
+    first, colors_first = assign_colors(make_dealerships())
+    second, colors_second = assign_colors(make_dealerships())
+
+    assert colors_first == colors_second
+    assert first['color'].tolist() == second['color'].tolist()
+    assert first.loc[0, 'color'] == first.loc[2, 'color'] == dealer_color('Dealer A')
+    assert all(0 <= channel <= 255 for color in colors_first.values() for channel in color)
+
+
+def test_create_pydeck_map_reuses_layer_data_for_same_dealers():
+    """
+    Test that the layer data is cached on the dealers and their coordinates, in a new deck per call
+    """
+    clear_map_cache()
+    dealerships, _ = assign_colors(make_dealerships())
+
+    deck = create_pydeck_map(dealerships)
+    again = create_pydeck_map(dealerships.copy())
+    assert again is not deck
+    assert again.layers[0].data is deck.layers[0].data
+
+    fewer_dealers = dealerships[dealerships['dealer_name'] != 'Dealer C']
+    assert create_pydeck_map(fewer_dealers).layers[0].data is not deck.layers[0].data
+
+    # Same dealers, refreshed coordinates
+    moved = dealerships.assign(Latitude=dealerships['Latitude'] + 0.01)
+    assert create_pydeck_map(moved).layers[0].data is not deck.layers[0].data
+
+
+def test_create_pydeck_map_leaves_the_caller_frame_unchanged():
+    """
+    Test that colouring for the map does not add a column to the caller's DataFrame
+    """
+    clear_map_cache()
+    dealerships = make_dealerships()
+    deck = create_pydeck_map(dealerships)
+
+    assert 'color' not in dealerships.columns
+    assert deck.layers[0].data[0]['color'] == dealer_color('Dealer A')
+
+
+def test_create_pydeck_map_is_safe_across_sessions():
+    """
+    Test concurrent calls (Streamlit sessions run in threads) on a small cache
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    clear_map_cache()
+    dealerships, _ = assign_colors(make_dealerships())
+    frames = [dealerships.assign(Latitude=dealerships['Latitude'] + i % (CACHE_SIZE * 2)) for i in range(400)]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        decks = list(pool.map(create_pydeck_map, frames))
+
+    for frame, deck in zip(frames, decks):
+        assert deck.initial_view_state.latitude == pytest.approx(frame['Latitude'].mean())
+
+
+def test_deck_cache_is_bounded():
+    """
+    Test that the least recently used layer data is dropped once the cache is full
+    """
+    clear_map_cache()
+    dealerships, _ = assign_colors(make_dealerships())
+    first = create_pydeck_map(dealerships)
+    for i in range(1, CACHE_SIZE + 1):
+        create_pydeck_map(dealerships.assign(Latitude=dealerships['Latitude'] + i))
+
+    assert create_pydeck_map(dealerships).layers[0].data is not first.layers[0].data